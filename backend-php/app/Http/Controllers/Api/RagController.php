@@ -6,6 +6,7 @@
 use Illuminate\Http\Request;
 use Illuminate\Http\JsonResponse;
 use Illuminate\Support\Facades\Http;
+use Symfony\Component\HttpFoundation\StreamedResponse;
 
 class RagController extends Controller
 {
@@ -50,6 +51,89 @@ public function query(Request $request): JsonResponse
         }
     }
 
+    /**
+     * POST /api/rag/query/batch
+     * Realiza varias consultas al sistema RAG en una sola llamada
+     */
+    public function queryBatch(Request $request): JsonResponse
+    {
+        set_time_limit(300);
+
+        $validated = $request->validate([
+            'preguntas' => 'required|array|min:1|max:50',
+            'preguntas.*' => 'required|string|min:3',
+            'modelo' => 'nullable|string|in:llama3,llama3-70b,mixtral,gemma'
+        ]);
+
+        try {
+            $response = Http::timeout(180)->post("{$this->ragApiUrl}/api/rag/query/batch", [
+                'preguntas' => $validated['preguntas'],
+                'modelo' => $validated['modelo'] ?? 'llama3'
+            ]);
+
+            if ($response->failed()) {
+                return response()->json([
+                    'success' => false,
+                    'error' => 'Error al conectar con el servicio RAG'
+                ], 503);
+            }
+
+            return response()->json($response->json());
+
+        } catch (\Exception $e) {
+            return response()->json([
+                'success' => false,
+                'error' => 'El servicio RAG no está disponible. Asegúrate de que el servidor Python esté corriendo.',
+                'details' => $e->getMessage()
+            ], 503);
+        }
+    }
+
+    /**
+     * POST /api/rag/query/stream
+     * Reenvía en streaming (Server-Sent Events) la respuesta del sistema RAG
+     */
+    public function queryStream(Request $request): StreamedResponse
+    {
+        set_time_limit(300);
+
+        $validated = $request->validate([
+            'pregunta' => 'required|string|min:3',
+            'modelo' => 'nullable|string|in:llama3,llama3-70b,mixtral,gemma'
+        ]);
+
+        return response()->stream(function () use ($validated) {
+            try {
+                $response = Http::withOptions(['stream' => true])
+                    ->timeout(180)
+                    ->post("{$this->ragApiUrl}/api/rag/query/stream", [
+                        'pregunta' => $validated['pregunta'],
+                        'modelo' => $validated['modelo'] ?? 'llama3'
+                    ]);
+
+                $body = $response->toPsrResponse()->getBody();
+                while (!$body->eof()) {
+                    echo $body->read(1024);
+                    if (ob_get_level() > 0) {
+                        ob_flush();
+                    }
+                    flush();
+                }
+            } catch (\Exception $e) {
+                echo "event: error\ndata: " . json_encode([
+                    'success' => false,
+                    'error' => 'El servicio RAG no está disponible. Asegúrate de que el servidor Python esté corriendo.',
+                    'details' => $e->getMessage()
+                ]) . "\n\n";
+                flush();
+            }
+        }, 200, [
+            'Content-Type' => 'text/event-stream',
+            'Cache-Control' => 'no-cache',
+            'X-Accel-Buffering' => 'no'
+        ]);
+    }
+
     /**
      * GET /api/rag/health
      * Verifica el estado del servicio RAG
@@ -112,12 +196,14 @@ public function insights(Request $request): JsonResponse
         set_time_limit(300);
 
         $validated = $request->validate([
-            'modelo' => 'nullable|string|in:llama3,llama3-70b,mixtral,gemma'
+            'modelo' => 'nullable|string|in:llama3,llama3-70b,mixtral,gemma',
+            'refrescar' => 'nullable|boolean'
         ]);
 
         try {
             $response = Http::timeout(180)->post("{$this->ragApiUrl}/api/rag/insights", [
-                'modelo' => $validated['modelo'] ?? 'llama3'
+                'modelo' => $validated['modelo'] ?? 'llama3',
+                'refrescar' => $validated['refrescar'] ?? false
             ]);
 
             if ($response->failed()) {
@@ -17,9 +17,16 @@ public function __construct(PythonRunnerService $pythonService)
 
     /**
      * Obtener datos generales de rendimiento
+     * Primero del worker de analítica (datos en memoria); si no está corriendo,
+     * de los JSON que deja analisis_rendimiento.py en backend-python/output
      */
     public function general(): JsonResponse
     {
+        $resultado = $this->pythonService->runAnalytics('general');
+        if ($resultado['success'] && isset($resultado['output']['data'])) {
+            return response()->json($resultado['output']);
+        }
+
         try {
             $outputPath = dirname(base_path()) . '/backend-python/output/';
 
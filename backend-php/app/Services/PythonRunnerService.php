@@ -2,6 +2,7 @@
 
 namespace App\Services;
 
+use Illuminate\Support\Facades\Http;
 use Symfony\Component\Process\Process;
 use Symfony\Component\Process\Exception\ProcessFailedException;
 
@@ -86,6 +87,43 @@ public function runScript(string $scriptPath, array $arguments = []): array
         }
     }
 
+    /**
+     * Obtiene un análisis del worker de analítica (proceso Python persistente),
+     * sin lanzar un intérprete por petición
+     *
+     * @param string $analisis general, materias, clicks o evaluaciones
+     * @return array Resultado con 'success', 'output' (JSON decodificado), 'error'
+     */
+    public function runAnalytics(string $analisis = 'general'): array
+    {
+        $url = rtrim(config('services.analytics.url'), '/') . '/api/rendimiento/' . $analisis;
+
+        try {
+            $response = Http::timeout((int) config('services.analytics.timeout', 30))->get($url);
+
+            if ($response->successful()) {
+                return [
+                    'success' => true,
+                    'output' => $response->json(),
+                    'error' => null
+                ];
+            }
+
+            return [
+                'success' => false,
+                'output' => $response->json(),
+                'error' => 'Analytics worker respondió HTTP ' . $response->status()
+            ];
+
+        } catch (\Exception $e) {
+            return [
+                'success' => false,
+                'output' => null,
+                'error' => 'Analytics worker no disponible: ' . $e->getMessage()
+            ];
+        }
+    }
+
     /**
      * Ejecuta un script simple de Python
      *
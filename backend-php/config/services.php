@@ -28,6 +28,11 @@
         'region' => env('AWS_DEFAULT_REGION', 'us-east-1'),
     ],
 
+    'analytics' => [
+        'url' => env('ANALYTICS_WORKER_URL', 'http://127.0.0.1:5001'),
+        'timeout' => env('ANALYTICS_WORKER_TIMEOUT', 30),
+    ],
+
     'slack' => [
         'notifications' => [
             'bot_user_oauth_token' => env('SLACK_BOT_USER_OAUTH_TOKEN'),
@@ -21,6 +21,8 @@
 // Rutas de RAG
 Route::prefix('rag')->group(function () {
     Route::post('/query', [RagController::class, 'query']);
+    Route::post('/query/stream', [RagController::class, 'queryStream']);
+    Route::post('/query/batch', [RagController::class, 'queryBatch']);
     Route::post('/insights', [RagController::class, 'insights']);
     Route::get('/stats', [RagController::class, 'stats']);
     Route::get('/health', [RagController::class, 'health']);
@@ -2,8 +2,6 @@ import os
 import sys
 
 os.environ["MPLBACKEND"] = "Agg"
-sys.stdout.reconfigure(encoding="utf-8")
-sys.stderr.reconfigure(encoding="utf-8")
 
 import pandas as pd
 import matplotlib.pyplot as plt
@@ -12,30 +10,13 @@ SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 DATA_PATH = os.path.join(SCRIPT_DIR, "data")
 OUTPUT_PATH = os.path.join(SCRIPT_DIR, "output")
 
-if not os.path.exists(DATA_PATH):
-    raise FileNotFoundError(f"No existe la carpeta data: {DATA_PATH}")
-
-os.makedirs(OUTPUT_PATH, exist_ok=True)
-
-student_info = pd.read_csv(os.path.join(DATA_PATH, "studentInfo.csv"), encoding="latin1")
-student_assessment = pd.read_csv(os.path.join(DATA_PATH, "studentAssessment.csv"), encoding="latin1")
-assessments = pd.read_csv(os.path.join(DATA_PATH, "assessments.csv"), encoding="latin1")
-student_vle = pd.read_csv(os.path.join(DATA_PATH, "vle.csv"), encoding="latin1")
-
-student_info = student_info.dropna(subset=["final_result"])
-
-student_assessment["score"] = pd.to_numeric(
-    student_assessment["score"],
-    errors="coerce"
-)
-
-student_assessment = student_assessment.dropna(subset=["score"])
-student_assessment = student_assessment[
-    (student_assessment["score"] >= 0) &
-    (student_assessment["score"] <= 100)
-]
-
-student_vle = student_vle.dropna(subset=["sum_click"])
+# Tablas OULAD que usa el análisis
+ARCHIVOS = {
+    "student_info": "studentInfo.csv",
+    "student_assessment": "studentAssessment.csv",
+    "assessments": "assessments.csv",
+    "student_vle": "vle.csv"
+}
 
 final_result_map = {
     "Fail": 40,
@@ -44,111 +25,168 @@ final_result_map = {
     "Distinction": 85
 }
 
-student_info["final_score"] = student_info["final_result"].map(final_result_map)
-
-assessment_full = student_assessment.merge(
-    assessments,
-    on="id_assessment",
-    how="inner"
-)
-
-avg_scores = (
-    assessment_full
-    .groupby("code_module")["score"]
-    .mean()
-    .reset_index()
-    .rename(columns={"score": "average_score"})
-)
-
-avg_scores.to_json(
-    os.path.join(OUTPUT_PATH, "rendimiento_por_materia.json"),
-    orient="records",
-    indent=2,
-    force_ascii=False
-)
-
-plt.figure()
-plt.bar(avg_scores["code_module"], avg_scores["average_score"])
-plt.xlabel("Materia")
-plt.ylabel("Promedio de notas")
-plt.title("Promedio de notas por materia")
-plt.tight_layout()
-plt.savefig(os.path.join(OUTPUT_PATH, "promedio_notas_por_materia.png"))
-plt.close()
-
-clicks_per_student = (
-    student_vle
-    .groupby("id_student")["sum_click"]
-    .sum()
-    .reset_index()
-)
-
-performance_clicks = student_info.merge(
-    clicks_per_student,
-    on="id_student",
-    how="inner"
-)
-
-performance_clicks[[
-    "id_student",
-    "sum_click",
-    "final_score"
-]].to_json(
-    os.path.join(OUTPUT_PATH, "clicks_vs_nota.json"),
-    orient="records",
-    indent=2,
-    force_ascii=False
-)
-
-plt.figure()
-plt.scatter(
-    performance_clicks["sum_click"],
-    performance_clicks["final_score"],
-    alpha=0.6
-)
-plt.xlabel("Total de clicks en la plataforma")
-plt.ylabel("Nota final")
-plt.title("Relacion entre interaccion en plataforma y nota final")
-plt.tight_layout()
-plt.savefig(os.path.join(OUTPUT_PATH, "clicks_vs_nota.png"))
-plt.close()
-
-assessments_per_student = (
-    student_assessment
-    .groupby("id_student")["id_assessment"]
-    .count()
-    .reset_index()
-    .rename(columns={"id_assessment": "num_assessments"})
-)
-
-performance_assessments = student_info.merge(
-    assessments_per_student,
-    on="id_student",
-    how="inner"
-)
-
-performance_assessments[[
-    "id_student",
-    "num_assessments",
-    "final_score"
-]].to_json(
-    os.path.join(OUTPUT_PATH, "evaluaciones_vs_nota.json"),
-    orient="records",
-    indent=2,
-    force_ascii=False
-)
-
-plt.figure()
-plt.scatter(
-    performance_assessments["num_assessments"],
-    performance_assessments["final_score"],
-    alpha=0.6
-)
-plt.xlabel("Numero de evaluaciones rendidas")
-plt.ylabel("Nota final")
-plt.title("Relacion entre evaluaciones rendidas y nota final")
-plt.tight_layout()
-plt.savefig(os.path.join(OUTPUT_PATH, "evaluaciones_vs_nota.png"))
-plt.close()
-
-print("Analisis de rendimiento academico completado.")
+def cargar_tablas(data_path=DATA_PATH):
+    """Lee y limpia las tablas OULAD; devuelve dict nombre -> DataFrame"""
+    if not os.path.exists(data_path):
+        raise FileNotFoundError(f"No existe la carpeta data: {data_path}")
+
+    student_info = pd.read_csv(os.path.join(data_path, ARCHIVOS["student_info"]), encoding="latin1")
+    student_assessment = pd.read_csv(os.path.join(data_path, ARCHIVOS["student_assessment"]), encoding="latin1")
+    assessments = pd.read_csv(os.path.join(data_path, ARCHIVOS["assessments"]), encoding="latin1")
+    student_vle = pd.read_csv(os.path.join(data_path, ARCHIVOS["student_vle"]), encoding="latin1")
+
+    student_info = student_info.dropna(subset=["final_result"])
+
+    student_assessment["score"] = pd.to_numeric(
+        student_assessment["score"],
+        errors="coerce"
+    )
+
+    student_assessment = student_assessment.dropna(subset=["score"])
+    student_assessment = student_assessment[
+        (student_assessment["score"] >= 0) &
+        (student_assessment["score"] <= 100)
+    ]
+
+    student_vle = student_vle.dropna(subset=["sum_click"])
+
+    student_info["final_score"] = student_info["final_result"].map(final_result_map)
+
+    return {
+        "student_info": student_info,
+        "student_assessment": student_assessment,
+        "assessments": assessments,
+        "student_vle": student_vle
+    }
+
+def promedio_por_materia(tablas):
+    """Promedio de notas de las evaluaciones por materia (code_module)"""
+    assessment_full = tablas["student_assessment"].merge(
+        tablas["assessments"],
+        on="id_assessment",
+        how="inner"
+    )
+
+    return (
+        assessment_full
+        .groupby("code_module")["score"]
+        .mean()
+        .reset_index()
+        .rename(columns={"score": "average_score"})
+    )
+
+def clicks_vs_nota(tablas):
+    """Total de clicks en la plataforma y nota final de cada estudiante"""
+    clicks_per_student = (
+        tablas["student_vle"]
+        .groupby("id_student")["sum_click"]
+        .sum()
+        .reset_index()
+    )
+
+    performance_clicks = tablas["student_info"].merge(
+        clicks_per_student,
+        on="id_student",
+        how="inner"
+    )
+
+    return performance_clicks[[
+        "id_student",
+        "sum_click",
+        "final_score"
+    ]]
+
+def evaluaciones_vs_nota(tablas):
+    """Número de evaluaciones rendidas y nota final de cada estudiante"""
+    assessments_per_student = (
+        tablas["student_assessment"]
+        .groupby("id_student")["id_assessment"]
+        .count()
+        .reset_index()
+        .rename(columns={"id_assessment": "num_assessments"})
+    )
+
+    performance_assessments = tablas["student_info"].merge(
+        assessments_per_student,
+        on="id_student",
+        how="inner"
+    )
+
+    return performance_assessments[[
+        "id_student",
+        "num_assessments",
+        "final_score"
+    ]]
+
+# Nombre del resultado (y de su archivo JSON en output/) -> función de análisis
+ANALISIS = {
+    "rendimiento_por_materia": promedio_por_materia,
+    "clicks_vs_nota": clicks_vs_nota,
+    "evaluaciones_vs_nota": evaluaciones_vs_nota
+}
+
+def _grafico_materias(avg_scores, ruta):
+    plt.figure()
+    plt.bar(avg_scores["code_module"], avg_scores["average_score"])
+    plt.xlabel("Materia")
+    plt.ylabel("Promedio de notas")
+    plt.title("Promedio de notas por materia")
+    plt.tight_layout()
+    plt.savefig(ruta)
+    plt.close()
+
+def _grafico_dispersion(datos, columna, xlabel, titulo, ruta):
+    plt.figure()
+    plt.scatter(
+        datos[columna],
+        datos["final_score"],
+        alpha=0.6
+    )
+    plt.xlabel(xlabel)
+    plt.ylabel("Nota final")
+    plt.title(titulo)
+    plt.tight_layout()
+    plt.savefig(ruta)
+    plt.close()
+
+def guardar_resultados(resultados, output_path=OUTPUT_PATH):
+    """Escribe los JSON y los gráficos de output/ a partir de los resultados de ANALISIS"""
+    os.makedirs(output_path, exist_ok=True)
+
+    for nombre, datos in resultados.items():
+        datos.to_json(
+            os.path.join(output_path, f"{nombre}.json"),
+            orient="records",
+            indent=2,
+            force_ascii=False
+        )
+
+    _grafico_materias(
+        resultados["rendimiento_por_materia"],
+        os.path.join(output_path, "promedio_notas_por_materia.png")
+    )
+    _grafico_dispersion(
+        resultados["clicks_vs_nota"], "sum_click",
+        "Total de clicks en la plataforma",
+        "Relacion entre interaccion en plataforma y nota final",
+        os.path.join(output_path, "clicks_vs_nota.png")
+    )
+    _grafico_dispersion(
+        resultados["evaluaciones_vs_nota"], "num_assessments",
+        "Numero de evaluaciones rendidas",
+        "Relacion entre evaluaciones rendidas y nota final",
+        os.path.join(output_path, "evaluaciones_vs_nota.png")
+    )
+
+def main():
+    sys.stdout.reconfigure(encoding="utf-8")
+    sys.stderr.reconfigure(encoding="utf-8")
+
+    tablas = cargar_tablas(DATA_PATH)
+    resultados = {nombre: analisis(tablas) for nombre, analisis in ANALISIS.items()}
+    guardar_resultados(resultados, OUTPUT_PATH)
+
+    print("Analisis de rendimiento academico completado.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""
+Worker de analítica de rendimiento académico
+
+Proceso persistente (Flask, junto a rag_api) que mantiene en memoria las tablas OULAD
+y los resultados de analisis_rendimiento.py, para que Laravel no lance un intérprete
+nuevo (ni vuelva a importar pandas y leer los CSV) en cada petición. Los análisis se
+recalculan solo cuando cambian los CSV de entrada (mtime o tamaño).
+
+Uso (desde backend-python):
+    python analytics_worker.py            # puerto ANALYTICS_PORT, 5001 por defecto
+"""
+import json
+import os
+import threading
+import time
+
+from flask import Flask, Response, jsonify
+
+import analisis_rendimiento
+from analisis_rendimiento import ANALISIS, ARCHIVOS, DATA_PATH, OUTPUT_PATH
+
+# Ruta del endpoint -> nombre del resultado en ANALISIS
+RUTAS = {
+    "materias": "rendimiento_por_materia",
+    "clicks": "clicks_vs_nota",
+    "evaluaciones": "evaluaciones_vs_nota"
+}
+
+class EstadoAnalitica:
+    """
+    Tablas y resultados en memoria, invalidados por la firma (mtime y tamaño) de los CSV.
+    Cada resultado se guarda ya serializado a JSON.
+    """
+
+    def __init__(self, data_path=DATA_PATH):
+        self.data_path = data_path
+        self._lock = threading.RLock()
+        self._firma = None
+        self._tablas = None
+        self._error = None
+        self._frames = {}
+        self._json = {}
+        self.recalculos = 0
+        self.ultimo_calculo_ms = None
+
+    def firma(self):
+        """(archivo, mtime_ns, tamaño) de cada CSV de entrada; None si falta"""
+        partes = []
+        for archivo in ARCHIVOS.values():
+            try:
+                stat = os.stat(os.path.join(self.data_path, archivo))
+                partes.append((archivo, stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                partes.append((archivo, None, None))
+        return tuple(partes)
+
+    def _vigente(self):
+        """Recarga las tablas si cambió algún CSV (con el lock tomado)"""
+        firma = self.firma()
+        if firma == self._firma:
+            return
+        inicio = time.perf_counter()
+        self._frames = {}
+        self._json = {}
+        try:
+            self._tablas = analisis_rendimiento.cargar_tablas(self.data_path)
+            self._error = None
+        except (OSError, ValueError, KeyError) as e:
+            self._tablas = None
+            self._error = str(e)
+        self._firma = firma
+        self.recalculos += 1
+        self.ultimo_calculo_ms = round(1000 * (time.perf_counter() - inicio), 1)
+
+    def frame(self, nombre):
+        """DataFrame del análisis `nombre` (lanza RuntimeError si no se pudieron leer los CSV)"""
+        with self._lock:
+            self._vigente()
+            if self._tablas is None:
+                raise RuntimeError(self._error)
+            if nombre not in self._frames:
+                self._frames[nombre] = ANALISIS[nombre](self._tablas)
+            return self._frames[nombre]
+
+    def json(self, nombre):
+        """Resultado del análisis `nombre` serializado como lista de registros JSON"""
+        with self._lock:
+            datos = self.frame(nombre)
+            if nombre not in self._json:
+                self._json[nombre] = datos.to_json(orient="records", force_ascii=False)
+            return self._json[nombre]
+
+    def precalcular(self):
+        for nombre in ANALISIS:
+            self.json(nombre)
+
+    def estado(self):
+        return {
+            "tablas_cargadas": self._tablas is not None,
+            "error": self._error,
+            "recalculos": self.recalculos,
+            "ultimo_calculo_ms": self.ultimo_calculo_ms,
+            "resultados_en_memoria": sorted(self._json)
+        }
+
+app = Flask(__name__)
+estado_analitica = EstadoAnalitica()
+# pyplot no es seguro entre hilos
+_exportar_lock = threading.Lock()
+
+def _respuesta_json(cuerpo, estado=200):
+    return Response(cuerpo, status=estado, mimetype='application/json')
+
+def _error(e):
+    return jsonify({'success': False, 'error': str(e)}), 503
+
+@app.route('/health', methods=['GET'])
+def health():
+    return jsonify({'status': 'ok', 'service': 'analytics-worker', **estado_analitica.estado()})
+
+@app.route('/api/rendimiento/general', methods=['GET'])
+def general():
+    """Los tres análisis juntos, con la misma forma que RendimientoController::general"""
+    try:
+        partes = [f'"{nombre}": {estado_analitica.json(nombre)}' for nombre in ANALISIS]
+    except RuntimeError as e:
+        return _error(e)
+    return _respuesta_json('{"success": true, "data": {' + ", ".join(partes) + '}}')
+
+@app.route('/api/rendimiento/<ruta>', methods=['GET'])
+def analisis(ruta):
+    """Un análisis: materias, clicks o evaluaciones"""
+    nombre = RUTAS.get(ruta)
+    if nombre is None:
+        return jsonify({'success': False, 'error': f'Análisis desconocido: {ruta}'}), 404
+    try:
+        return _respuesta_json(estado_analitica.json(nombre))
+    except RuntimeError as e:
+        return _error(e)
+
+@app.route('/api/rendimiento/exportar', methods=['POST'])
+def exportar():
+    """Escribe los JSON y gráficos de output/ (lo que hacía analisis_rendimiento.py)"""
+    try:
+        resultados = {nombre: estado_analitica.frame(nombre) for nombre in ANALISIS}
+        with _exportar_lock:
+            analisis_rendimiento.guardar_resultados(resultados, OUTPUT_PATH)
+    except RuntimeError as e:
+        return _error(e)
+    return jsonify({'success': True, 'output': OUTPUT_PATH})
+
+if __name__ == '__main__':
+    port = int(os.getenv('ANALYTICS_PORT', 5001))
+
+    # Leer los CSV y calcular los análisis antes de aceptar peticiones
+    inicio = time.perf_counter()
+    try:
+        estado_analitica.precalcular()
+        print(f"Análisis precalculados en {1000 * (time.perf_counter() - inicio):.0f} ms")
+    except RuntimeError as e:
+        print(f"No se pudieron precalcular los análisis: {e}")
+
+    print(f"\nWorker de analítica en http://localhost:{port}")
+    print(json.dumps(estado_analitica.estado(), ensure_ascii=False))
+    app.run(host='127.0.0.1', port=port, debug=False, threaded=True)
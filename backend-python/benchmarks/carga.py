@@ -0,0 +1,254 @@
+'''
+Generador de carga para la API del RAG
+Envía una mezcla reproducible (por semilla) de peticiones a /api/rag/query,
+/api/rag/insights y /api/rag/stats con N clientes concurrentes y resume
+throughput y percentiles de latencia por endpoint, en JSON y markdown.
+'''
+import argparse
+import http.client
+import json
+import platform
+import random
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from urllib.parse import urlparse
+
+from sembrar_chroma import TEMAS
+
+PLANTILLAS_PREGUNTA = [
+    "¿Cómo influye {a} en la deserción estudiantil?",
+    "¿Qué relación hay entre {a} y {b} en el abandono universitario?",
+    "¿Qué dicen los estudios sobre {a} y la permanencia de los estudiantes?",
+    "Explica el efecto de {a} sobre el abandono en el primer año"
+]
+PREGUNTAS_ESTADISTICAS = [
+    "¿Cuál es la tasa de deserción en Ecuador?",
+    "¿Cuántos estudiantes abandonaron en 2022?",
+    "Deserción por sexo en Ecuador"
+]
+MEZCLA_POR_DEFECTO = "query=8,insights=1,stats=1"
+PERCENTILES = (50, 90, 95, 99)
+
+def parsear_mezcla(texto):
+    """'query=8,insights=1' -> {"query": 8, "insights": 1}"""
+    mezcla = {}
+    for parte in texto.split(','):
+        if parte.strip():
+            nombre, peso = parte.split('=')
+            mezcla[nombre.strip()] = float(peso)
+    return mezcla
+
+def generar_peticiones(cantidad, mezcla, semilla=42, modelo="llama3", proporcion_estadisticas=0.1):
+    """
+    Lista reproducible de peticiones (endpoint, método, ruta, cuerpo)
+    """
+    rnd = random.Random(semilla)
+    nombres = list(mezcla)
+    pesos = [mezcla[n] for n in nombres]
+    palabras = [p for lista in TEMAS.values() for p in lista]
+    peticiones = []
+    for _ in range(cantidad):
+        endpoint = rnd.choices(nombres, pesos)[0]
+        if endpoint == "query":
+            if rnd.random() < proporcion_estadisticas:
+                pregunta = rnd.choice(PREGUNTAS_ESTADISTICAS)
+            else:
+                a, b = rnd.sample(palabras, 2)
+                pregunta = rnd.choice(PLANTILLAS_PREGUNTA).format(a=a, b=b)
+            peticiones.append(("query", "POST", "/api/rag/query", {"pregunta": pregunta, "modelo": modelo}))
+        elif endpoint == "insights":
+            peticiones.append(("insights", "POST", "/api/rag/insights", {"modelo": modelo}))
+        elif endpoint == "stats":
+            peticiones.append(("stats", "GET", "/api/rag/stats", None))
+        else:
+            raise ValueError(f"Endpoint desconocido en la mezcla: {endpoint}")
+    return peticiones
+
+class Cliente:
+    """Conexión HTTP keep-alive por hilo"""
+
+    def __init__(self, url, timeout=120):
+        destino = urlparse(url)
+        self.host = destino.hostname
+        self.puerto = destino.port or 80
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _conexion(self):
+        conexion = getattr(self._local, 'conexion', None)
+        if conexion is None:
+            conexion = self._local.conexion = http.client.HTTPConnection(self.host, self.puerto, timeout=self.timeout)
+        return conexion
+
+    def enviar(self, metodo, ruta, cuerpo=None):
+        """
+        Returns:
+            (estado HTTP, segundos); estado 0 si falló la conexión
+        """
+        datos = json.dumps(cuerpo).encode('utf-8') if cuerpo is not None else None
+        cabeceras = {"Content-Type": "application/json"} if datos is not None else {}
+        inicio = time.perf_counter()
+        try:
+            conexion = self._conexion()
+            conexion.request(metodo, ruta, body=datos, headers=cabeceras)
+            respuesta = conexion.getresponse()
+            respuesta.read()
+            estado = respuesta.status
+        except (OSError, http.client.HTTPException):
+            self._local.conexion = None
+            estado = 0
+        return estado, time.perf_counter() - inicio
+
+def ejecutar_carga(url, peticiones, concurrencia=8, timeout=120):
+    """
+    Envía las peticiones con `concurrencia` clientes simultáneos
+
+    Returns:
+        (mediciones, segundos_totales); mediciones = [(endpoint, estado, segundos)]
+    """
+    cliente = Cliente(url, timeout)
+
+    def enviar(peticion):
+        endpoint, metodo, ruta, cuerpo = peticion
+        estado, segundos = cliente.enviar(metodo, ruta, cuerpo)
+        return endpoint, estado, segundos
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, concurrencia)) as executor:
+        mediciones = list(executor.map(enviar, peticiones))
+    return mediciones, time.perf_counter() - inicio
+
+def percentil(valores, p):
+    """Percentil por interpolación lineal sobre valores ordenados"""
+    if not valores:
+        return None
+    valores = sorted(valores)
+    posicion = (len(valores) - 1) * p / 100
+    inferior = int(posicion)
+    superior = min(inferior + 1, len(valores) - 1)
+    return valores[inferior] + (valores[superior] - valores[inferior]) * (posicion - inferior)
+
+def _resumen_de(mediciones, duracion):
+    latencias = [s for _, estado, s in mediciones if 200 <= estado < 300]
+    resumen = {
+        "peticiones": len(mediciones),
+        "errores": len(mediciones) - len(latencias),
+        "throughput_rps": round(len(latencias) / duracion, 3) if duracion else None,
+        "media_ms": round(1000 * sum(latencias) / len(latencias), 2) if latencias else None,
+        "max_ms": round(1000 * max(latencias), 2) if latencias else None
+    }
+    for p in PERCENTILES:
+        valor = percentil(latencias, p)
+        resumen[f"p{p}_ms"] = round(1000 * valor, 2) if valor is not None else None
+    return resumen
+
+def resumir(mediciones, duracion):
+    """Resumen total y por endpoint"""
+    por_endpoint = {}
+    for medicion in mediciones:
+        por_endpoint.setdefault(medicion[0], []).append(medicion)
+    return {
+        "duracion_s": round(duracion, 3),
+        "total": _resumen_de(mediciones, duracion),
+        "endpoints": {nombre: _resumen_de(lista, duracion) for nombre, lista in sorted(por_endpoint.items())}
+    }
+
+def commit_actual():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def armar_reporte(resumen, configuracion, baseline=None):
+    reporte = {
+        "fecha": datetime.now().isoformat(timespec='seconds'),
+        "commit": commit_actual(),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "configuracion": configuracion,
+        "resultados": resumen
+    }
+    if baseline is not None:
+        reporte["baseline"] = {"commit": baseline.get("commit"), "resultados": baseline.get("resultados")}
+    return reporte
+
+def _delta(actual, anterior):
+    if actual is None or not anterior:
+        return ""
+    return f" ({100 * (actual - anterior) / anterior:+.1f}%)"
+
+def reporte_markdown(reporte):
+    resultados = reporte["resultados"]
+    anterior = (reporte.get("baseline") or {}).get("resultados") or {}
+    lineas = [
+        f"# Benchmark RAG ({reporte['fecha']}, commit {reporte.get('commit') or '?'})",
+        "",
+        "Configuración: " + ", ".join(f"{k}={v}" for k, v in reporte["configuracion"].items()),
+        "",
+        "| endpoint | peticiones | errores | rps | p50 ms | p90 ms | p95 ms | p99 ms | max ms |",
+        "|---|---|---|---|---|---|---|---|---|"
+    ]
+    filas = [("total", resultados["total"], anterior.get("total"))]
+    filas += [
+        (nombre, datos, (anterior.get("endpoints") or {}).get(nombre))
+        for nombre, datos in resultados["endpoints"].items()
+    ]
+    for nombre, datos, base in filas:
+        base = base or {}
+        lineas.append(
+            f"| {nombre} | {datos['peticiones']} | {datos['errores']} "
+            f"| {datos['throughput_rps']}{_delta(datos['throughput_rps'], base.get('throughput_rps'))} "
+            + " ".join(
+                f"| {datos[f'p{p}_ms']}{_delta(datos[f'p{p}_ms'], base.get(f'p{p}_ms'))}"
+                for p in PERCENTILES
+            )
+            + f" | {datos['max_ms']} |"
+        )
+    if anterior:
+        lineas += ["", f"Entre paréntesis: variación respecto al baseline (commit {reporte['baseline'].get('commit') or '?'})."]
+    return "\n".join(lineas) + "\n"
+
+def guardar_reporte(reporte, ruta_base):
+    """Escribe <ruta_base>.json y <ruta_base>.md"""
+    with open(f"{ruta_base}.json", 'w', encoding='utf-8') as f:
+        json.dump(reporte, f, ensure_ascii=False, indent=2)
+    with open(f"{ruta_base}.md", 'w', encoding='utf-8') as f:
+        f.write(reporte_markdown(reporte))
+
+def main():
+    parser = argparse.ArgumentParser(description="Generador de carga para la API del RAG")
+    parser.add_argument("--url", type=str, default="http://127.0.0.1:5000")
+    parser.add_argument("--peticiones", type=int, default=200)
+    parser.add_argument("--concurrencia", type=int, default=8)
+    parser.add_argument("--mezcla", type=str, default=MEZCLA_POR_DEFECTO)
+    parser.add_argument("--calentamiento", type=int, default=10, help="Peticiones previas que no se miden")
+    parser.add_argument("--semilla", type=int, default=42)
+    parser.add_argument("--modelo", type=str, default="llama3")
+    parser.add_argument("--salida", type=str, default="resultado")
+    parser.add_argument("--baseline", type=str, default=None, help="JSON de un reporte anterior para comparar")
+    args = parser.parse_args()
+
+    configuracion = vars(args).copy()
+    configuracion.pop("salida")
+    configuracion.pop("baseline")
+
+    mezcla = parsear_mezcla(args.mezcla)
+    if args.calentamiento:
+        ejecutar_carga(args.url, generar_peticiones(args.calentamiento, mezcla, args.semilla + 1000, args.modelo), args.concurrencia)
+    mediciones, duracion = ejecutar_carga(args.url, generar_peticiones(args.peticiones, mezcla, args.semilla, args.modelo), args.concurrencia)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+    reporte = armar_reporte(resumir(mediciones, duracion), configuracion, baseline)
+    guardar_reporte(reporte, args.salida)
+    print(reporte_markdown(reporte))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+'''
+Benchmark de punta a punta del RAG, sin red
+1. Siembra una colección ChromaDB sintética en benchmarks/trabajo
+2. Levanta los servidores falsos de Ollama y Groq
+3. Arranca rag_api (Flask) o rag_asgi (uvicorn) apuntando a ellos
+4. Corre el generador de carga y guarda el reporte JSON + markdown
+
+Uso (desde backend-python/benchmarks):
+    python ejecutar_benchmark.py --peticiones 300 --concurrencia 16
+    python ejecutar_benchmark.py --baseline resultados/base.json
+'''
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+from carga import (
+    MEZCLA_POR_DEFECTO, armar_reporte, ejecutar_carga, generar_peticiones,
+    guardar_reporte, parsear_mezcla, reporte_markdown, resumir
+)
+from sembrar_chroma import BACKEND_DIR, sembrar
+from servidores_falsos import iniciar_servidores, url_de
+
+BENCHMARKS_DIR = Path(__file__).resolve().parent
+
+def _puerto_libre():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def _comando_servidor(servidor, puerto):
+    if servidor == "asgi":
+        return [sys.executable, "-m", "uvicorn", "rag_asgi:app", "--host", "127.0.0.1",
+                "--port", str(puerto), "--log-level", "warning"]
+    return [sys.executable, "-c",
+            f"from rag_api import app; app.run(host='127.0.0.1', port={puerto}, threaded=True)"]
+
+def _esperar_listo(url, proceso, timeout=180):
+    """Espera a /ready (200) o, si el servidor no lo tiene, a /health con rag_loaded"""
+    limite = time.time() + timeout
+    while time.time() < limite:
+        if proceso.poll() is not None:
+            raise RuntimeError(f"El servidor terminó al arrancar (código {proceso.returncode})")
+        try:
+            with urllib.request.urlopen(f"{url}/ready", timeout=2) as r:
+                if r.status == 200:
+                    return
+        except urllib.error.HTTPError as e:
+            if e.code == 503:
+                # El arranque falló (fase obligatoria con error): no tiene sentido seguir esperando
+                try:
+                    error = json.loads(e.read()).get("error")
+                except ValueError:
+                    error = None
+                if error:
+                    raise RuntimeError(f"El servidor no pudo arrancar: {error}")
+            if e.code == 404:
+                try:
+                    with urllib.request.urlopen(f"{url}/health", timeout=2) as r:
+                        if json.loads(r.read()).get("rag_loaded"):
+                            return
+                except OSError:
+                    pass
+        except OSError:
+            pass
+        time.sleep(0.25)
+    raise TimeoutError(f"El servidor no quedó listo en {timeout}s")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark offline de la API del RAG")
+    parser.add_argument("--servidor", choices=["flask", "asgi"], default="flask")
+    parser.add_argument("--chunks", type=int, default=500)
+    parser.add_argument("--peticiones", type=int, default=200)
+    parser.add_argument("--concurrencia", type=int, default=8)
+    parser.add_argument("--mezcla", type=str, default=MEZCLA_POR_DEFECTO)
+    parser.add_argument("--calentamiento", type=int, default=10)
+    parser.add_argument("--embedding-ms", type=float, default=20)
+    parser.add_argument("--embedding-jitter-ms", type=float, default=5)
+    parser.add_argument("--llm-ms", type=float, default=400)
+    parser.add_argument("--llm-jitter-ms", type=float, default=100)
+    parser.add_argument("--token-ms", type=float, default=5)
+    parser.add_argument("--tokens-respuesta", type=int, default=120)
+    parser.add_argument("--sin-cache", action="store_true", help="Desactiva la cache de respuestas del RAG")
+    parser.add_argument("--vectorstore", choices=["chroma", "numpy-float16", "numpy-int8"], default="chroma")
+    parser.add_argument("--semilla", type=int, default=42)
+    parser.add_argument("--trabajo", type=str, default=str(BENCHMARKS_DIR / 'trabajo'))
+    parser.add_argument("--salida", type=str, default=None)
+    parser.add_argument("--baseline", type=str, default=None)
+    args = parser.parse_args()
+
+    print(f"Sembrando {args.chunks} chunks en {args.trabajo}...")
+    rag_dir = sembrar(args.trabajo, args.chunks, args.semilla)
+    if args.vectorstore != "chroma":
+        from rag_npstore import exportar_desde_chroma
+        exportar_desde_chroma(rag_dir / 'vectorstore' / 'chroma_db', args.vectorstore.split('-')[1])
+
+    ollama, groq = iniciar_servidores(
+        embedding_ms=args.embedding_ms, embedding_jitter_ms=args.embedding_jitter_ms,
+        llm_ms=args.llm_ms, llm_jitter_ms=args.llm_jitter_ms, token_ms=args.token_ms,
+        tokens_respuesta=args.tokens_respuesta, semilla=args.semilla
+    )
+
+    puerto = _puerto_libre()
+    url = f"http://127.0.0.1:{puerto}"
+    entorno = {
+        **os.environ,
+        "OLLAMA_HOST": url_de(ollama),
+        "GROQ_BASE_URL": url_de(groq),
+        "GROQ_API_BASE": url_de(groq),
+        "GROQ_API_KEY": "clave-falsa-benchmark",
+        "RAG_INSIGHTS_INTERVALO": "3600",
+        "PYTHONPATH": os.pathsep.join(filter(None, [str(BACKEND_DIR / 'rag'), os.environ.get("PYTHONPATH")]))
+    }
+    if args.sin_cache:
+        entorno["RAG_CACHE_MAX"] = "0"
+    if args.vectorstore != "chroma":
+        entorno["RAG_VECTORSTORE"] = "numpy"
+
+    proceso = subprocess.Popen(_comando_servidor(args.servidor, puerto), cwd=str(rag_dir), env=entorno)
+    try:
+        inicio = time.perf_counter()
+        _esperar_listo(url, proceso)
+        print(f"Servidor {args.servidor} listo en {1000 * (time.perf_counter() - inicio):.0f} ms")
+
+        mezcla = parsear_mezcla(args.mezcla)
+        if args.calentamiento:
+            ejecutar_carga(url, generar_peticiones(args.calentamiento, mezcla, args.semilla + 1000), args.concurrencia)
+        mediciones, duracion = ejecutar_carga(url, generar_peticiones(args.peticiones, mezcla, args.semilla), args.concurrencia)
+    finally:
+        proceso.terminate()
+        try:
+            proceso.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proceso.kill()
+        ollama.shutdown()
+        groq.shutdown()
+
+    configuracion = {k: v for k, v in vars(args).items() if k not in ("trabajo", "salida", "baseline")}
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+    reporte = armar_reporte(resumir(mediciones, duracion), configuracion, baseline)
+
+    salida = args.salida or str(BENCHMARKS_DIR / 'resultados' / f"{args.servidor}_{time.strftime('%Y%m%d_%H%M%S')}")
+    Path(salida).parent.mkdir(parents=True, exist_ok=True)
+    guardar_reporte(reporte, salida)
+    print(reporte_markdown(reporte))
+    print(f"Reporte guardado en {salida}.json y {salida}.md")
+
+if __name__ == "__main__":
+    main()
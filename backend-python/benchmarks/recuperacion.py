@@ -0,0 +1,236 @@
+'''
+Benchmark de recuperación: recall vs latencia según chunking y k
+Recarga las fuentes reales del RAG (documents_raw y knowledge_sources), reconstruye
+el índice (ChromaDB + BM25) para cada combinación de chunk_size y chunk_overlap y,
+con un set dorado de preguntas, mide para cada k:
+recall@k, MRR, tamaño del índice, tiempo de ingesta y latencia de consulta.
+Los embeddings salen del proveedor del RAG (por defecto el backend determinista "hash").
+
+Uso (desde backend-python/benchmarks):
+    python recuperacion.py --chunk-sizes 500,1000,1500 --overlaps 0,150 --ks 3,5,10
+'''
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+from carga import commit_actual, percentil
+from sembrar_chroma import BACKEND_DIR
+
+BENCHMARKS_DIR = Path(__file__).resolve().parent
+RAG_DIR = BACKEND_DIR / 'rag'
+GOLDEN_PATH = BENCHMARKS_DIR / 'golden_recuperacion.json'
+K_CANDIDATOS = 20
+
+def cargar_corpus():
+    """Documentos (sin dividir) de las mismas carpetas que usa rag_ingest"""
+    from rag_ingest import cargar_docs_de_directorio
+
+    documentos = []
+    documentos.extend(cargar_docs_de_directorio(str(RAG_DIR / 'documents_raw'), tipos_archivo=(".pdf", ".txt"), tipo_fuente="documentos"))
+    documentos.extend(cargar_docs_de_directorio(str(RAG_DIR / 'knowledge_sources'), tipos_archivo=(".txt", ".json", ".pdf"), tipo_fuente="knowledge"))
+    return documentos
+
+def _nombre(source):
+    return str(source).replace('\\', '/').split('/')[-1]
+
+def _tamano_directorio(ruta):
+    total = 0
+    for raiz, _, archivos in os.walk(ruta):
+        for archivo in archivos:
+            try:
+                total += os.path.getsize(os.path.join(raiz, archivo))
+            except OSError:
+                pass
+    return total
+
+def construir_indice(documentos, chunk_size, chunk_overlap, directorio, embeddings, lote=256):
+    """
+    Divide, embebe y guarda los chunks en una colección nueva, y arma el BM25
+
+    Returns:
+        (coleccion, indice_bm25, info) con info = chunks, segundos de ingesta y bytes en disco
+    """
+    import chromadb
+    from chromadb.config import Settings
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+    from rag_hibrido import IndiceBM25
+
+    inicio = time.perf_counter()
+    splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap, length_function=len)
+    chunks = [c for c in splitter.split_documents(documentos) if c.page_content.strip()]
+
+    cliente = chromadb.PersistentClient(path=str(directorio), settings=Settings(anonymized_telemetry=False))
+    coleccion = cliente.get_or_create_collection(name='langchain')
+    ids = [f"c{i}" for i in range(len(chunks))]
+    textos = [c.page_content for c in chunks]
+    metadatas = [{"source": _nombre(c.metadata.get('source', ''))} for c in chunks]
+    for i in range(0, len(ids), lote):
+        coleccion.add(
+            ids=ids[i:i + lote],
+            documents=textos[i:i + lote],
+            metadatas=metadatas[i:i + lote],
+            embeddings=embeddings.embed_documents(textos[i:i + lote])
+        )
+    indice = IndiceBM25.construir(ids, textos)
+    segundos = time.perf_counter() - inicio
+
+    return coleccion, indice, {
+        "chunks": len(chunks),
+        "ingesta_s": round(segundos, 3),
+        "indice_bytes": _tamano_directorio(directorio)
+    }
+
+def recuperar(coleccion, indice, embeddings, pregunta, k, modo="hibrido"):
+    """Misma recuperación que rag_query.buscar_hibrido (o solo una de sus ramas)"""
+    from rag_hibrido import fusionar_rrf
+
+    ids_vector = []
+    if modo in ("hibrido", "vectorial"):
+        data = coleccion.query(
+            query_embeddings=[embeddings.embed_query(pregunta)],
+            n_results=max(K_CANDIDATOS, k),
+            include=[]
+        )
+        ids_vector = data.get('ids', [[]])[0]
+    ids_lexicos = []
+    if modo in ("hibrido", "bm25"):
+        ids_lexicos = [chunk_id for chunk_id, _ in indice.buscar(pregunta, max(K_CANDIDATOS, k))]
+
+    if modo == "vectorial":
+        return ids_vector[:k]
+    if modo == "bm25":
+        return ids_lexicos[:k]
+    return fusionar_rrf([ids_vector, ids_lexicos], k)
+
+def evaluar(coleccion, indice, embeddings, golden, ks, modo="hibrido", repeticiones=3):
+    """
+    Returns:
+        dict k -> {recall, mrr}, y la latencia de consulta (p50/p95/media en ms)
+    """
+    k_max = max(ks)
+    fuentes_por_id = {}
+    latencias = []
+    rankings = []
+    for caso in golden:
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            ids = recuperar(coleccion, indice, embeddings, caso["pregunta"], k_max, modo)
+            latencias.append(time.perf_counter() - inicio)
+        faltantes = [i for i in ids if i not in fuentes_por_id]
+        if faltantes:
+            data = coleccion.get(ids=faltantes, include=['metadatas'])
+            for chunk_id, meta in zip(data.get('ids', []), data.get('metadatas', [])):
+                fuentes_por_id[chunk_id] = (meta or {}).get('source', '')
+        rankings.append([fuentes_por_id.get(i, '') for i in ids])
+
+    por_k = {}
+    for k in ks:
+        recalls, reciprocos = [], []
+        for caso, fuentes in zip(golden, rankings):
+            esperadas = set(caso["fuentes"])
+            encontradas = esperadas & set(fuentes[:k])
+            recalls.append(len(encontradas) / len(esperadas))
+            rango = next((pos + 1 for pos, f in enumerate(fuentes[:k]) if f in esperadas), None)
+            reciprocos.append(1.0 / rango if rango else 0.0)
+        por_k[k] = {
+            "recall": round(sum(recalls) / len(recalls), 4),
+            "mrr": round(sum(reciprocos) / len(reciprocos), 4)
+        }
+
+    latencia = {
+        "p50_ms": round(1000 * percentil(latencias, 50), 3),
+        "p95_ms": round(1000 * percentil(latencias, 95), 3),
+        "media_ms": round(1000 * sum(latencias) / len(latencias), 3)
+    }
+    return por_k, latencia
+
+def reporte_markdown(reporte):
+    lineas = [
+        f"# Benchmark de recuperación ({reporte['fecha']}, commit {reporte.get('commit') or '?'})",
+        "",
+        f"Modo: {reporte['modo']}, preguntas: {reporte['preguntas']}, documentos: {reporte['documentos']}",
+        "",
+        "| chunk_size | overlap | k | recall@k | MRR | chunks | índice KB | ingesta s | consulta p50 ms | consulta p95 ms |",
+        "|---|---|---|---|---|---|---|---|---|---|"
+    ]
+    for fila in reporte["resultados"]:
+        lineas.append(
+            f"| {fila['chunk_size']} | {fila['chunk_overlap']} | {fila['k']} | {fila['recall']} | {fila['mrr']} "
+            f"| {fila['chunks']} | {fila['indice_bytes'] // 1024} | {fila['ingesta_s']} "
+            f"| {fila['p50_ms']} | {fila['p95_ms']} |"
+        )
+    return "\n".join(lineas) + "\n"
+
+def _enteros(texto):
+    return [int(x) for x in texto.split(',') if x.strip()]
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall vs latencia de la recuperación según chunking y k")
+    parser.add_argument("--chunk-sizes", type=str, default="500,1000,1500,2000")
+    parser.add_argument("--overlaps", type=str, default="0,150,200")
+    parser.add_argument("--ks", type=str, default="3,5,10")
+    parser.add_argument("--modo", choices=["hibrido", "vectorial", "bm25"], default="hibrido")
+    parser.add_argument("--embeddings", type=str, default="hash", help="Proveedor de embeddings (hash u ollama)")
+    parser.add_argument("--golden", type=str, default=str(GOLDEN_PATH))
+    parser.add_argument("--repeticiones", type=int, default=3, help="Repeticiones de cada consulta para la latencia")
+    parser.add_argument("--salida", type=str, default=None)
+    args = parser.parse_args()
+
+    with open(args.golden, 'r', encoding='utf-8') as f:
+        golden = json.load(f)
+    ks = _enteros(args.ks)
+
+    from rag_embeddings import crear_embeddings
+    embeddings = crear_embeddings(args.embeddings)
+
+    print("Cargando corpus...")
+    documentos = cargar_corpus()
+    print(f"{len(documentos)} documentos, {len(golden)} preguntas")
+
+    resultados = []
+    for chunk_size in _enteros(args.chunk_sizes):
+        for chunk_overlap in _enteros(args.overlaps):
+            if chunk_overlap >= chunk_size:
+                continue
+            directorio = tempfile.mkdtemp(prefix="bench_recuperacion_")
+            try:
+                coleccion, indice, info = construir_indice(documentos, chunk_size, chunk_overlap, directorio, embeddings)
+                por_k, latencia = evaluar(coleccion, indice, embeddings, golden, ks, args.modo, args.repeticiones)
+            finally:
+                shutil.rmtree(directorio, ignore_errors=True)
+            for k in ks:
+                resultados.append({
+                    "chunk_size": chunk_size,
+                    "chunk_overlap": chunk_overlap,
+                    "k": k,
+                    **por_k[k],
+                    **info,
+                    **latencia
+                })
+            print(f"chunk_size={chunk_size} overlap={chunk_overlap}: {info['chunks']} chunks, "
+                  + ", ".join(f"recall@{k}={por_k[k]['recall']}" for k in ks))
+
+    reporte = {
+        "fecha": time.strftime('%Y-%m-%dT%H:%M:%S'),
+        "commit": commit_actual(),
+        "modo": args.modo,
+        "embeddings": embeddings.nombre,
+        "preguntas": len(golden),
+        "documentos": len(documentos),
+        "resultados": resultados
+    }
+    salida = args.salida or str(BENCHMARKS_DIR / 'resultados' / f"recuperacion_{time.strftime('%Y%m%d_%H%M%S')}")
+    Path(salida).parent.mkdir(parents=True, exist_ok=True)
+    with open(f"{salida}.json", 'w', encoding='utf-8') as f:
+        json.dump(reporte, f, ensure_ascii=False, indent=2)
+    with open(f"{salida}.md", 'w', encoding='utf-8') as f:
+        f.write(reporte_markdown(reporte))
+    print(reporte_markdown(reporte))
+    print(f"Reporte guardado en {salida}.json y {salida}.md")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+'''
+Colección ChromaDB sembrada para los benchmarks
+Arma un directorio de trabajo con la misma estructura que backend-python
+(rag/vectorstore/chroma_db y data/processed/estadisticas_ecuador) y lo llena con
+chunks sintéticos reproducibles, sus embeddings deterministas, el catálogo y el índice BM25.
+'''
+import argparse
+import random
+import shutil
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR / 'rag'))
+
+from servidores_falsos import DIMENSION
+
+ESTADISTICAS_ORIGEN = BACKEND_DIR / 'data' / 'processed' / 'estadisticas_ecuador'
+
+# Temas de los chunks sintéticos: cada uno con su vocabulario propio
+TEMAS = {
+    "economia": ["ingresos", "trabajo", "costos", "matrícula", "becas", "crédito", "pobreza", "empleo"],
+    "academico": ["rendimiento", "calificaciones", "reprobación", "tutorías", "asignaturas", "docentes", "evaluación"],
+    "familia": ["familia", "padres", "hogar", "hijos", "apoyo", "responsabilidades", "migración"],
+    "institucional": ["universidad", "políticas", "retención", "acompañamiento", "infraestructura", "oferta"],
+    "salud": ["salud", "ansiedad", "estrés", "bienestar", "psicológico", "motivación", "pandemia"]
+}
+CONECTORES = [
+    "Los estudios sobre deserción estudiantil señalan que",
+    "En Ecuador se observa que",
+    "Según la evidencia revisada,",
+    "El análisis de cohortes muestra que",
+    "Las entrevistas a estudiantes indican que"
+]
+VERBOS = ["influye en", "se relaciona con", "explica parte de", "aumenta", "reduce"]
+TIPOS = ["pdf", "paper", "notebook", "csv"]
+
+def _chunk(rnd, tema, largo=1200):
+    palabras = TEMAS[tema]
+    frases = []
+    while sum(len(f) for f in frases) < largo:
+        a, b = rnd.sample(palabras, 2)
+        frases.append(f"{rnd.choice(CONECTORES)} {a} {rnd.choice(VERBOS)} {b} y el abandono de los estudios.")
+    return " ".join(frases)
+
+def generar_chunks(cantidad, semilla=42):
+    """
+    Returns:
+        (ids, textos, metadatas) reproducibles para la semilla dada
+    """
+    rnd = random.Random(semilla)
+    ids, textos, metadatas = [], [], []
+    temas = list(TEMAS)
+    for i in range(cantidad):
+        tema = temas[i % len(temas)]
+        documento = i // 8
+        tipo = TIPOS[documento % len(TIPOS)]
+        ids.append(f"bench_{i:06d}")
+        textos.append(_chunk(rnd, tema))
+        metadatas.append({
+            "source": f"knowledge_sources/{tema}/documento_{documento:04d}.{tipo}",
+            "type": tipo,
+            "tema": tema
+        })
+    return ids, textos, metadatas
+
+def sembrar(directorio, chunks=500, semilla=42, lote=256):
+    """
+    Crea (o recrea) el directorio de trabajo del benchmark
+
+    Returns:
+        ruta del directorio rag/ dentro del directorio de trabajo (cwd del servidor)
+    """
+    import chromadb
+    from chromadb.config import Settings
+    from rag_catalogo import publicar_version, registrar_chunks, version_catalogo
+    from rag_embeddings import MODELO_OLLAMA, registrar_embeddings, vector_hash
+    from rag_hibrido import construir_bm25_desde_coleccion
+
+    directorio = Path(directorio)
+    rag_dir = directorio / 'rag'
+    vectorstore = rag_dir / 'vectorstore'
+    chroma_path = vectorstore / 'chroma_db'
+    if vectorstore.exists():
+        shutil.rmtree(vectorstore)
+    chroma_path.mkdir(parents=True)
+
+    destino_csv = directorio / 'data' / 'processed' / 'estadisticas_ecuador'
+    destino_csv.mkdir(parents=True, exist_ok=True)
+    for csv in ESTADISTICAS_ORIGEN.glob('*.csv'):
+        shutil.copy2(csv, destino_csv / csv.name)
+
+    cliente = chromadb.PersistentClient(path=str(chroma_path), settings=Settings(anonymized_telemetry=False))
+    coleccion = cliente.get_or_create_collection(name='langchain')
+
+    ids, textos, metadatas = generar_chunks(chunks, semilla)
+    for i in range(0, len(ids), lote):
+        coleccion.add(
+            ids=ids[i:i + lote],
+            documents=textos[i:i + lote],
+            metadatas=metadatas[i:i + lote],
+            embeddings=[vector_hash(t, DIMENSION) for t in textos[i:i + lote]]
+        )
+        registrar_chunks(chroma_path, metadatas[i:i + lote], publicar=False)
+
+    version = version_catalogo(chroma_path) + 1
+    construir_bm25_desde_coleccion(coleccion, chroma_path, version)
+    publicar_version(chroma_path, version)
+    # El servidor arranca con el proveedor ollama apuntando al Ollama falso
+    registrar_embeddings(chroma_path, f"ollama:{MODELO_OLLAMA}", DIMENSION)
+    return rag_dir
+
+def main():
+    parser = argparse.ArgumentParser(description="Siembra una colección ChromaDB sintética para benchmarks")
+    parser.add_argument("--directorio", type=str, default=str(Path(__file__).resolve().parent / 'trabajo'))
+    parser.add_argument("--chunks", type=int, default=500)
+    parser.add_argument("--semilla", type=int, default=42)
+    args = parser.parse_args()
+
+    rag_dir = sembrar(args.directorio, args.chunks, args.semilla)
+    print(f"Colección sembrada con {args.chunks} chunks en {rag_dir / 'vectorstore' / 'chroma_db'}")
+
+if __name__ == "__main__":
+    main()
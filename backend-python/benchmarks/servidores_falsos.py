@@ -0,0 +1,229 @@
+'''
+Servidores falsos de Ollama y Groq para los benchmarks
+Responden con la misma forma que las APIs reales (embeddings de Ollama y
+chat completions compatibles con OpenAI de Groq), con latencia y jitter
+configurables y resultados deterministas, para medir el RAG sin red.
+'''
+import argparse
+import hashlib
+import json
+import random
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'rag'))
+from rag_embeddings import vector_hash
+
+# Los embeddings "de Ollama" son los del backend determinista del RAG (RAG_EMBEDDINGS=hash)
+DIMENSION = 768
+
+FRASES_RESPUESTA = [
+    "La deserción estudiantil responde a factores económicos, académicos y familiares.",
+    "Los datos muestran que el primer año concentra la mayor parte de los abandonos.",
+    "Las becas y el acompañamiento académico reducen el riesgo de abandono.",
+    "La situación laboral del estudiante influye en su permanencia.",
+    "Las instituciones con tutorías tempranas presentan mejores tasas de retención."
+]
+
+class Latencia:
+    """Latencia simulada: media +/- jitter uniforme, con una semilla fija"""
+
+    def __init__(self, media_ms=0.0, jitter_ms=0.0, semilla=0):
+        self.media = media_ms / 1000
+        self.jitter = jitter_ms / 1000
+        self._random = random.Random(semilla)
+        self._lock = threading.Lock()
+
+    def muestra(self):
+        if not self.jitter:
+            return self.media
+        with self._lock:
+            return max(0.0, self.media + self._random.uniform(-self.jitter, self.jitter))
+
+    def esperar(self):
+        segundos = self.muestra()
+        if segundos:
+            time.sleep(segundos)
+
+class _Manejador(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, formato, *args):
+        pass
+
+    def _leer_json(self):
+        largo = int(self.headers.get('Content-Length') or 0)
+        return json.loads(self.rfile.read(largo) or b'{}')
+
+    def _responder_json(self, datos, estado=200):
+        cuerpo = json.dumps(datos).encode('utf-8')
+        self.send_response(estado)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+class ManejadorOllama(_Manejador):
+    """/api/embed (actual) y /api/embeddings (anterior) de Ollama"""
+
+    latencia = Latencia()
+
+    def do_GET(self):
+        if self.path.startswith('/api/version'):
+            return self._responder_json({"version": "0.0.0-falso"})
+        if self.path.startswith('/api/tags'):
+            return self._responder_json({"models": [{"name": "nomic-embed-text:latest"}]})
+        self._responder_json({"error": "no encontrado"}, 404)
+
+    def do_POST(self):
+        datos = self._leer_json()
+        if self.path.startswith('/api/embed') and not self.path.startswith('/api/embeddings'):
+            entradas = datos.get('input', [])
+            if isinstance(entradas, str):
+                entradas = [entradas]
+            self.latencia.esperar()
+            return self._responder_json({
+                "model": datos.get('model', ''),
+                "embeddings": [vector_hash(t, DIMENSION) for t in entradas]
+            })
+        if self.path.startswith('/api/embeddings'):
+            self.latencia.esperar()
+            return self._responder_json({"embedding": vector_hash(datos.get('prompt', ''), DIMENSION)})
+        self._responder_json({"error": "no encontrado"}, 404)
+
+class ManejadorGroq(_Manejador):
+    """/openai/v1/chat/completions de Groq, con y sin streaming"""
+
+    latencia = Latencia()
+    latencia_token = Latencia()
+    tokens_respuesta = 120
+
+    def do_GET(self):
+        if self.path.rstrip('/').endswith('/models'):
+            return self._responder_json({"object": "list", "data": []})
+        self._responder_json({"error": "no encontrado"}, 404)
+
+    def _respuesta(self, prompt):
+        """Respuesta determinista según el prompt: lista numerada de frases hasta ~tokens_respuesta"""
+        inicio = int(hashlib.md5(prompt.encode('utf-8')).hexdigest(), 16) % len(FRASES_RESPUESTA)
+        lineas = []
+        caracteres = self.tokens_respuesta * 4
+        i = 0
+        while sum(len(l) for l in lineas) < caracteres:
+            frase = FRASES_RESPUESTA[(inicio + i) % len(FRASES_RESPUESTA)]
+            lineas.append(f"{i + 1}. {frase}")
+            i += 1
+        return "\n".join(lineas)
+
+    def do_POST(self):
+        if not self.path.rstrip('/').endswith('/chat/completions'):
+            return self._responder_json({"error": "no encontrado"}, 404)
+
+        datos = self._leer_json()
+        prompt = "\n".join(str(m.get('content', '')) for m in datos.get('messages', []))
+        respuesta = self._respuesta(prompt)
+        uso = {
+            "prompt_tokens": len(prompt) // 4,
+            "completion_tokens": len(respuesta) // 4,
+            "total_tokens": (len(prompt) + len(respuesta)) // 4
+        }
+        base = {
+            "id": f"chatcmpl-{hashlib.md5(prompt.encode('utf-8')).hexdigest()[:12]}",
+            "created": int(time.time()),
+            "model": datos.get('model', '')
+        }
+
+        self.latencia.esperar()
+        if not datos.get('stream'):
+            return self._responder_json({
+                **base,
+                "object": "chat.completion",
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": respuesta},
+                    "finish_reason": "stop"
+                }],
+                "usage": uso
+            })
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        self.close_connection = True
+        for palabra in re.findall(r'\S+\s*', respuesta):
+            self.latencia_token.esperar()
+            trozo = {
+                **base,
+                "object": "chat.completion.chunk",
+                "choices": [{"index": 0, "delta": {"content": palabra}, "finish_reason": None}]
+            }
+            self.wfile.write(f"data: {json.dumps(trozo)}\n\n".encode('utf-8'))
+        fin = {
+            **base,
+            "object": "chat.completion.chunk",
+            "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+            "x_groq": {"usage": uso}
+        }
+        self.wfile.write(f"data: {json.dumps(fin)}\n\ndata: [DONE]\n\n".encode('utf-8'))
+
+def _servir(manejador, puerto, atributos):
+    clase = type(manejador.__name__, (manejador,), atributos)
+    servidor = ThreadingHTTPServer(('127.0.0.1', puerto), clase)
+    servidor.daemon_threads = True
+    threading.Thread(target=servidor.serve_forever, daemon=True, name=manejador.__name__).start()
+    return servidor
+
+def iniciar_servidores(puerto_ollama=0, puerto_groq=0, embedding_ms=20, embedding_jitter_ms=5,
+                       llm_ms=400, llm_jitter_ms=100, token_ms=5, tokens_respuesta=120, semilla=42):
+    """
+    Levanta ambos servidores en hilos (puerto 0 = puerto libre cualquiera)
+
+    Returns:
+        (servidor_ollama, servidor_groq); la URL de cada uno sale de server_address
+    """
+    ollama = _servir(ManejadorOllama, puerto_ollama, {
+        "latencia": Latencia(embedding_ms, embedding_jitter_ms, semilla)
+    })
+    groq = _servir(ManejadorGroq, puerto_groq, {
+        "latencia": Latencia(llm_ms, llm_jitter_ms, semilla + 1),
+        "latencia_token": Latencia(token_ms, 0, semilla + 2),
+        "tokens_respuesta": tokens_respuesta
+    })
+    return ollama, groq
+
+def url_de(servidor):
+    host, puerto = servidor.server_address[:2]
+    return f"http://{host}:{puerto}"
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidores falsos de Ollama y Groq")
+    parser.add_argument("--puerto-ollama", type=int, default=11435)
+    parser.add_argument("--puerto-groq", type=int, default=11436)
+    parser.add_argument("--embedding-ms", type=float, default=20)
+    parser.add_argument("--embedding-jitter-ms", type=float, default=5)
+    parser.add_argument("--llm-ms", type=float, default=400)
+    parser.add_argument("--llm-jitter-ms", type=float, default=100)
+    parser.add_argument("--token-ms", type=float, default=5)
+    parser.add_argument("--tokens-respuesta", type=int, default=120)
+    parser.add_argument("--semilla", type=int, default=42)
+    args = parser.parse_args()
+
+    ollama, groq = iniciar_servidores(
+        args.puerto_ollama, args.puerto_groq, args.embedding_ms, args.embedding_jitter_ms,
+        args.llm_ms, args.llm_jitter_ms, args.token_ms, args.tokens_respuesta, args.semilla
+    )
+    print(f"OLLAMA_HOST={url_de(ollama)}")
+    print(f"GROQ_BASE_URL={url_de(groq)}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
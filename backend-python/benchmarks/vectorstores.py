@@ -0,0 +1,239 @@
+'''
+Benchmark de vectorstores: ChromaDB vs store NumPy memory-mapped (float16 e int8)
+Siembra la misma colección sintética en cada backend y, en un proceso nuevo por
+backend (para medir el arranque en frío), toma el tiempo de importar y abrir el
+store, la primera consulta, la RAM residente y la latencia de consulta top-k,
+con y sin filtro de metadata. También mide cuántos de los top-k coinciden con
+la búsqueda exacta en float32.
+
+Uso (desde backend-python/benchmarks):
+    python vectorstores.py --chunks 2000,5000 --consultas 200 --k 20
+'''
+import argparse
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from carga import commit_actual, percentil
+from sembrar_chroma import TEMAS, generar_chunks
+from servidores_falsos import DIMENSION
+
+BENCHMARKS_DIR = Path(__file__).resolve().parent
+BACKENDS = ("chroma", "numpy-float16", "numpy-int8")
+
+def _rss_mb():
+    """Memoria residente del proceso actual en MB (Linux: /proc; si no, el máximo de getrusage)"""
+    try:
+        with open('/proc/self/status', 'r') as f:
+            for linea in f:
+                if linea.startswith('VmRSS:'):
+                    return int(linea.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    maximo = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maximo / (1024 * 1024) if sys.platform == 'darwin' else maximo / 1024
+
+def _tamano_directorio(ruta):
+    return sum(f.stat().st_size for f in Path(ruta).rglob('*') if f.is_file())
+
+def preparar(directorio, chunks, semilla, consultas, backends=BACKENDS):
+    """
+    Siembra los backends con los mismos chunks y vectores, y guarda las consultas
+
+    Returns:
+        dict backend -> ruta del store, y ruta del JSON de consultas
+    """
+    from rag_embeddings import vector_hash
+    from rag_npstore import ColeccionNumpy
+
+    ids, textos, metadatas = generar_chunks(chunks, semilla)
+    vectores = [vector_hash(t, DIMENSION) for t in textos]
+
+    rutas = {}
+    if "chroma" in backends:
+        import chromadb
+        from chromadb.config import Settings
+
+        ruta = os.path.join(directorio, 'chroma')
+        cliente = chromadb.PersistentClient(path=ruta, settings=Settings(anonymized_telemetry=False))
+        coleccion = cliente.get_or_create_collection(name='langchain', metadata={"hnsw:space": "cosine"})
+        for i in range(0, len(ids), 1000):
+            coleccion.add(ids=ids[i:i + 1000], documents=textos[i:i + 1000],
+                          metadatas=metadatas[i:i + 1000], embeddings=vectores[i:i + 1000])
+        rutas["chroma"] = ruta
+    for tipo in ("float16", "int8"):
+        if f"numpy-{tipo}" in backends:
+            ruta = os.path.join(directorio, f'numpy_{tipo}')
+            ColeccionNumpy(ruta, tipo).add(ids=ids, embeddings=vectores, documents=textos, metadatas=metadatas)
+            rutas[f"numpy-{tipo}"] = ruta
+
+    rnd = random.Random(semilla + 1)
+    palabras = [p for lista in TEMAS.values() for p in lista]
+    vectores_consulta = [vector_hash(" ".join(rnd.sample(palabras, 3)), DIMENSION) for _ in range(consultas)]
+    ruta_consultas = os.path.join(directorio, 'consultas.json')
+    with open(ruta_consultas, 'w', encoding='utf-8') as f:
+        json.dump({
+            "vectores": vectores_consulta,
+            "temas": [rnd.choice(list(TEMAS)) for _ in vectores_consulta],
+            "exactos": _exactos(vectores, vectores_consulta)
+        }, f)
+    return rutas, ruta_consultas
+
+def _exactos(vectores, consultas, k=100):
+    """Top-k exacto en float32, como referencia de calidad"""
+    import numpy as np
+
+    matriz = np.asarray(vectores, dtype=np.float32)
+    matriz /= np.linalg.norm(matriz, axis=1, keepdims=True) + 1e-12
+    q = np.asarray(consultas, dtype=np.float32)
+    q /= np.linalg.norm(q, axis=1, keepdims=True) + 1e-12
+    puntajes = q @ matriz.T
+    return [np.argsort(-fila, kind='stable')[:k].tolist() for fila in puntajes]
+
+def medir(backend, ruta, ruta_consultas, k, repeticiones=1):
+    """
+    Se ejecuta en un proceso aparte: abre el store en frío y mide
+
+    Returns:
+        dict con tiempos de carga, RAM y latencias de consulta
+    """
+    rss_inicial = _rss_mb()
+    inicio = time.perf_counter()
+    if backend == "chroma":
+        import chromadb
+        from chromadb.config import Settings
+        importado = time.perf_counter()
+        cliente = chromadb.PersistentClient(path=ruta, settings=Settings(anonymized_telemetry=False))
+        coleccion = cliente.get_collection('langchain')
+    else:
+        from rag_npstore import ColeccionNumpy
+        importado = time.perf_counter()
+        coleccion = ColeccionNumpy(ruta)
+    abierto = time.perf_counter()
+
+    with open(ruta_consultas, 'r', encoding='utf-8') as f:
+        consultas = json.load(f)
+    vectores = consultas["vectores"]
+
+    coleccion.query(query_embeddings=[vectores[0]], n_results=k, include=[])
+    primera = time.perf_counter()
+
+    latencias, latencias_filtro, coincidencias = [], [], []
+    for _ in range(repeticiones):
+        for i, (vector, tema) in enumerate(zip(vectores, consultas["temas"])):
+            t0 = time.perf_counter()
+            data = coleccion.query(query_embeddings=[vector], n_results=k, include=['documents', 'metadatas'])
+            latencias.append(time.perf_counter() - t0)
+            exactos = {f"bench_{p:06d}" for p in consultas["exactos"][i][:k]}
+            coincidencias.append(len(exactos & set(data['ids'][0])) / k)
+
+            t0 = time.perf_counter()
+            coleccion.query(query_embeddings=[vector], n_results=k, where={"tema": tema}, include=['documents', 'metadatas'])
+            latencias_filtro.append(time.perf_counter() - t0)
+
+    return {
+        "importar_ms": round(1000 * (importado - inicio), 1),
+        "abrir_ms": round(1000 * (abierto - importado), 1),
+        "primera_consulta_ms": round(1000 * (primera - abierto), 1),
+        "rss_mb": round(_rss_mb(), 1),
+        "rss_delta_mb": round(_rss_mb() - rss_inicial, 1),
+        "consulta_p50_ms": round(1000 * percentil(latencias, 50), 3),
+        "consulta_p95_ms": round(1000 * percentil(latencias, 95), 3),
+        "filtro_p50_ms": round(1000 * percentil(latencias_filtro, 50), 3),
+        "filtro_p95_ms": round(1000 * percentil(latencias_filtro, 95), 3),
+        f"coincidencia@{k}": round(sum(coincidencias) / len(coincidencias), 4)
+    }
+
+def _medir_en_proceso(backend, ruta, ruta_consultas, k, repeticiones):
+    entorno = {
+        **os.environ,
+        "PYTHONPATH": os.pathsep.join(filter(None, [str(BENCHMARKS_DIR.parent / 'rag'), os.environ.get("PYTHONPATH")]))
+    }
+    salida = subprocess.run(
+        [sys.executable, __file__, "--medir", backend, "--ruta", ruta,
+         "--ruta-consultas", ruta_consultas, "--k", str(k), "--repeticiones", str(repeticiones)],
+        capture_output=True, text=True, check=True, env=entorno, cwd=str(BENCHMARKS_DIR)
+    )
+    return json.loads(salida.stdout.strip().splitlines()[-1])
+
+def reporte_markdown(reporte):
+    k = reporte["k"]
+    lineas = [
+        f"# Benchmark de vectorstores ({reporte['fecha']}, commit {reporte.get('commit') or '?'})",
+        "",
+        f"Dimensión {reporte['dimension']}, k={k}, {reporte['consultas']} consultas",
+        "",
+        "| chunks | backend | disco KB | importar ms | abrir ms | 1ª consulta ms | RSS MB | RSS Δ MB "
+        f"| p50 ms | p95 ms | filtro p50 ms | filtro p95 ms | coincidencia@{k} |",
+        "|---|---|---|---|---|---|---|---|---|---|---|---|---|"
+    ]
+    for fila in reporte["resultados"]:
+        lineas.append(
+            f"| {fila['chunks']} | {fila['backend']} | {fila['disco_bytes'] // 1024} | {fila['importar_ms']} "
+            f"| {fila['abrir_ms']} | {fila['primera_consulta_ms']} | {fila['rss_mb']} | {fila['rss_delta_mb']} "
+            f"| {fila['consulta_p50_ms']} | {fila['consulta_p95_ms']} | {fila['filtro_p50_ms']} "
+            f"| {fila['filtro_p95_ms']} | {fila[f'coincidencia@{k}']} |"
+        )
+    return "\n".join(lineas) + "\n"
+
+def main():
+    parser = argparse.ArgumentParser(description="ChromaDB vs store NumPy: carga, RAM y latencia de consulta")
+    parser.add_argument("--chunks", type=str, default="1000,5000")
+    parser.add_argument("--consultas", type=int, default=200)
+    parser.add_argument("--k", type=int, default=20)
+    parser.add_argument("--repeticiones", type=int, default=1)
+    parser.add_argument("--backends", type=str, default=",".join(BACKENDS))
+    parser.add_argument("--semilla", type=int, default=42)
+    parser.add_argument("--salida", type=str, default=None)
+    # Modo interno: medir un backend en este proceso
+    parser.add_argument("--medir", choices=BACKENDS, default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--ruta", type=str, default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--ruta-consultas", type=str, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.medir:
+        print(json.dumps(medir(args.medir, args.ruta, args.ruta_consultas, args.k, args.repeticiones)))
+        return
+
+    backends = [b for b in args.backends.split(',') if b.strip()]
+    resultados = []
+    for chunks in [int(x) for x in args.chunks.split(',') if x.strip()]:
+        directorio = tempfile.mkdtemp(prefix="bench_vectorstores_")
+        try:
+            print(f"Sembrando {chunks} chunks...")
+            rutas, ruta_consultas = preparar(directorio, chunks, args.semilla, args.consultas, backends)
+            for backend in backends:
+                fila = _medir_en_proceso(backend, rutas[backend], ruta_consultas, args.k, args.repeticiones)
+                fila = {"chunks": chunks, "backend": backend, "disco_bytes": _tamano_directorio(rutas[backend]), **fila}
+                resultados.append(fila)
+                print(f"  {backend}: abrir {fila['abrir_ms']} ms, RSS {fila['rss_mb']} MB, "
+                      f"p50 {fila['consulta_p50_ms']} ms, coincidencia@{args.k} {fila[f'coincidencia@{args.k}']}")
+        finally:
+            shutil.rmtree(directorio, ignore_errors=True)
+
+    reporte = {
+        "fecha": time.strftime('%Y-%m-%dT%H:%M:%S'),
+        "commit": commit_actual(),
+        "dimension": DIMENSION,
+        "k": args.k,
+        "consultas": args.consultas,
+        "resultados": resultados
+    }
+    salida = args.salida or str(BENCHMARKS_DIR / 'resultados' / f"vectorstores_{time.strftime('%Y%m%d_%H%M%S')}")
+    Path(salida).parent.mkdir(parents=True, exist_ok=True)
+    with open(f"{salida}.json", 'w', encoding='utf-8') as f:
+        json.dump(reporte, f, ensure_ascii=False, indent=2)
+    with open(f"{salida}.md", 'w', encoding='utf-8') as f:
+        f.write(reporte_markdown(reporte))
+    print(reporte_markdown(reporte))
+    print(f"Reporte guardado en {salida}.json y {salida}.md")
+
+if __name__ == "__main__":
+    main()
@@ -1,29 +1,82 @@
 """
 API REST para el Sistema RAG
+
+Los módulos pesados (rag_query: LangChain, ChromaDB, Groq) se importan en el hilo
+de arranque; el proceso acepta conexiones de inmediato y /ready indica cuándo
+el vectorstore ya está abierto y precalentado. Con RAG_API_DEBUG=1 el servidor
+de desarrollo usa el reloader y el arranque corre solo en el proceso que sirve.
 """
-from flask import Flask, request, jsonify
+import json
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
-from rag_query import cargar_rag, consultar, generar_insights, obtener_estadisticas_rag
+import os
+from rag_arranque import Arranque
+from rag_coalescencia import consultas_en_vuelo, insights_en_vuelo
+from rag_metricas import CONTENT_TYPE, registrar_medidores_cache, registrar_medidores_coalescencia, registro
 
 app = Flask(__name__)
 CORS(app)
 
 vectorstore = None
+registrar_medidores_coalescencia(consultas_en_vuelo, "consultas")
+registrar_medidores_coalescencia(insights_en_vuelo, "insights")
+
+# Límites del endpoint por lotes
+LOTE_MAX_PREGUNTAS = int(os.getenv("RAG_LOTE_MAX", "50"))
+LOTE_MAX_CONCURRENCIA = int(os.getenv("RAG_LOTE_CONCURRENCIA", "4"))
+
+# Modo debug de Flask (reloader incluido); apagado por defecto
+DEBUG = os.getenv("RAG_API_DEBUG", "0").lower() in ("1", "true")
+
+def _arrancar(arranque):
+    """Fases de arranque: importaciones, vectorstore, precalentamiento e insights"""
+    global vectorstore
+
+    with arranque.fase("importar_modulos"):
+        import rag_query
+        import rag_insights
+        from rag_cache import cache_respuestas
+    registrar_medidores_cache(cache_respuestas)
+
+    with arranque.fase("abrir_vectorstore"):
+        vector = rag_query.cargar_rag()
+
+    # Modelo de embeddings cargado en Ollama e índice HNSW en memoria
+    with arranque.fase("calentar_indice", opcional=True):
+        rag_query.calentar_indice(vector)
+
+    # Crear los clientes Groq una sola vez al iniciar el proceso
+    with arranque.fase("clientes_llm", opcional=True):
+        rag_query.precalentar_llms()
 
-try:
-    vectorstore = cargar_rag()
-except Exception:
-    pass
+    vectorstore = vector
+
+    # Precalcular insights en segundo plano (y regenerarlos tras cada ingesta)
+    with arranque.fase("precalculo_insights", opcional=True):
+        rag_insights.iniciar_precalculo(vector)
+
+arranque = Arranque("rag_api")
+# Con el reloader, el proceso padre solo vigila archivos: el arranque va en el hijo que sirve
+# (WERKZEUG_RUN_MAIN). Importado desde WSGI o el benchmark, arranca directamente.
+if not DEBUG or os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+    arranque.iniciar(_arrancar)
 
 @app.route('/health', methods=['GET'])
 def health():
-    """Endpoint de salud para verificar que el servicio está activo"""
+    """Endpoint de salud (liveness): el proceso responde, aunque el RAG siga cargando"""
     return jsonify({
         'status': 'ok',
         'rag_loaded': vectorstore is not None,
         'service': 'RAG-EDU API'
     })
 
+@app.route('/ready', methods=['GET'])
+def ready():
+    """Readiness: 200 cuando el vectorstore está abierto y precalentado, 503 mientras tanto"""
+    estado = arranque.estado()
+    estado['ready'] = estado['ready'] and vectorstore is not None
+    return jsonify(estado), 200 if estado['ready'] else 503
+
 @app.route('/api/rag/query', methods=['POST'])
 def query():
     """Endpoint principal para realizar consultas al RAG"""
@@ -51,6 +104,7 @@ def query():
                 'error': 'La pregunta no puede estar vacía'
             }), 400
 
+        from rag_query import consultar
         resultado = consultar(pregunta, vectorstore, modelo)
 
         return jsonify({
@@ -68,6 +122,124 @@ def query():
             'error': f'Error al procesar la consulta: {str(e)}'
         }), 500
 
+@app.route('/api/rag/query/batch', methods=['POST'])
+def query_batch():
+    """
+    Responde varias preguntas en una sola llamada.
+    Body: {"preguntas": [...], "modelo": "llama3"}. Los resultados vienen en el mismo
+    orden que las preguntas, cada uno con su propio 'success' y 'error'.
+    """
+    try:
+        if vectorstore is None:
+            return jsonify({
+                'success': False,
+                'error': 'Sistema RAG no inicializado. Verifica que ChromaDB existe.'
+            }), 503
+
+        data = request.get_json(silent=True)
+
+        if not data or not isinstance(data.get('preguntas'), list) or not data['preguntas']:
+            return jsonify({
+                'success': False,
+                'error': 'El campo "preguntas" es requerido y debe ser una lista'
+            }), 400
+
+        preguntas = data['preguntas']
+        modelo = data.get('modelo', 'llama3')
+
+        if len(preguntas) > LOTE_MAX_PREGUNTAS:
+            return jsonify({
+                'success': False,
+                'error': f'Máximo {LOTE_MAX_PREGUNTAS} preguntas por lote'
+            }), 400
+
+        from rag_query import consultar_lote
+        resultados = consultar_lote(preguntas, vectorstore, modelo, max_concurrencia=LOTE_MAX_CONCURRENCIA)
+
+        return jsonify({
+            'success': True,
+            'modelo': modelo,
+            'resultados': [
+                {
+                    'success': True,
+                    'pregunta': r['pregunta'],
+                    'respuesta': r['result'],
+                    'sources': r.get('sources', []),
+                    'metadata': r.get('metadata', {})
+                } if r['success'] else r
+                for r in resultados
+            ]
+        })
+
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': f'Error al procesar el lote: {str(e)}'
+        }), 500
+
+def _evento_sse(evento, datos):
+    return f"event: {evento}\ndata: {json.dumps(datos, ensure_ascii=False)}\n\n"
+
+@app.route('/api/rag/query/stream', methods=['POST'])
+def query_stream():
+    """
+    Variante en streaming (Server-Sent Events) de /api/rag/query.
+    Envía primero las fuentes recuperadas, luego los tokens del LLM y al final
+    un evento 'final' con los mismos campos que la respuesta JSON de /api/rag/query.
+    """
+    if vectorstore is None:
+        return jsonify({
+            'success': False,
+            'error': 'Sistema RAG no inicializado. Verifica que ChromaDB existe.'
+        }), 503
+
+    data = request.get_json(silent=True)
+
+    if not data or 'pregunta' not in data:
+        return jsonify({
+            'success': False,
+            'error': 'El campo "pregunta" es requerido'
+        }), 400
+
+    pregunta = data['pregunta']
+    modelo = data.get('modelo', 'llama3')
+
+    if not pregunta.strip():
+        return jsonify({
+            'success': False,
+            'error': 'La pregunta no puede estar vacía'
+        }), 400
+
+    from rag_query import consultar_stream
+
+    def generar():
+        try:
+            for evento, datos in consultar_stream(pregunta, vectorstore, modelo):
+                if evento == 'sources':
+                    yield _evento_sse('sources', {'sources': datos})
+                elif evento == 'token':
+                    yield _evento_sse('token', {'token': datos})
+                elif evento == 'final':
+                    yield _evento_sse('final', {
+                        'success': True,
+                        'pregunta': pregunta,
+                        'respuesta': datos['result'],
+                        'sources': datos.get('sources', []),
+                        'metadata': datos.get('metadata', {}),
+                        'modelo': modelo
+                    })
+        except Exception as e:
+            yield _evento_sse('error', {
+                'success': False,
+                'error': f'Error al procesar la consulta: {str(e)}'
+            })
+
+    return Response(
+        stream_with_context(generar()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
 @app.route('/api/rag/models', methods=['GET'])
 def models():
     """Devuelve la lista de modelos disponibles en Groq"""
@@ -82,7 +254,10 @@ def models():
 
 @app.route('/api/rag/insights', methods=['POST'])
 def insights():
-    """Genera insights automáticos analizando todos los datos del RAG"""
+    """
+    Devuelve los insights del RAG, precalculados en segundo plano por versión de la colección.
+    Con {"refrescar": true} se regeneran en el momento.
+    """
     try:
         if vectorstore is None:
             return jsonify({
@@ -90,10 +265,12 @@ def insights():
                 'error': 'Sistema RAG no inicializado'
             }), 503
 
-        data = request.get_json() or {}
+        data = request.get_json(silent=True) or {}
         modelo = data.get('modelo', 'llama3')
+        refrescar = bool(data.get('refrescar', False))
 
-        resultado = generar_insights(vectorstore, modelo)
+        from rag_insights import obtener_insights
+        resultado = obtener_insights(vectorstore, modelo, refrescar=refrescar)
 
         return jsonify(resultado)
 
@@ -112,6 +289,7 @@ def stats():
                 'error': 'Sistema RAG no inicializado'
             }), 503
 
+        from rag_query import obtener_estadisticas_rag
         estadisticas = obtener_estadisticas_rag(vectorstore)
 
         return jsonify(estadisticas)
@@ -121,5 +299,16 @@ def stats():
             'error': str(e)
         }), 500
 
+@app.route('/api/rag/cache', methods=['GET'])
+def cache():
+    """Contadores de la cache de respuestas (hits, misses, evictions) para dimensionarla"""
+    from rag_cache import cache_respuestas
+    return jsonify(cache_respuestas.estadisticas())
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Métricas por etapa en formato Prometheus"""
+    return Response(registro.exportar(), content_type=CONTENT_TYPE)
+
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000, debug=True)
+    app.run(host='0.0.0.0', port=5000, debug=DEBUG)
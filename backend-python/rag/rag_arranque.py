@@ -0,0 +1,87 @@
+'''
+Arranque observable del servicio RAG
+Las importaciones pesadas (LangChain, ChromaDB, Groq), la apertura del vectorstore
+y su precalentamiento corren en un hilo en segundo plano, fase por fase.
+Cada fase queda cronometrada; /ready responde 200 solo cuando terminaron todas.
+'''
+import threading
+import time
+import traceback
+from contextlib import contextmanager
+
+from rag_metricas import duracion_etapas
+
+class Arranque:
+    """
+    Registro de las fases de arranque: nombre, duración y error (si lo hubo).
+    Las fases opcionales registran su error y el arranque continúa;
+    si falla una fase obligatoria el servicio queda sin listo y con `error`.
+    """
+
+    def __init__(self, servicio="rag"):
+        self.servicio = servicio
+        self.inicio = time.perf_counter()
+        self.fases = []
+        self.fase_actual = None
+        self.listo = False
+        self.error = None
+        self.duracion = None
+        self._hilo = None
+
+    @contextmanager
+    def fase(self, nombre, opcional=False):
+        self.fase_actual = nombre
+        inicio = time.perf_counter()
+        error = None
+        try:
+            yield
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            if not opcional:
+                raise
+        finally:
+            segundos = time.perf_counter() - inicio
+            self.fases.append({"fase": nombre, "ms": round(segundos * 1000, 1), "error": error})
+            duracion_etapas.observar(segundos, etapa="arranque", fase=nombre)
+            self.fase_actual = None
+
+    def iniciar(self, funcion):
+        """Ejecuta funcion(self) en un hilo daemon y al terminar imprime el reporte de tiempos"""
+        def correr():
+            try:
+                funcion(self)
+                self.listo = True
+            except Exception as e:
+                self.error = f"{type(e).__name__}: {e}"
+                traceback.print_exc()
+            finally:
+                self.duracion = time.perf_counter() - self.inicio
+                print(self.reporte(), flush=True)
+
+        self._hilo = threading.Thread(target=correr, daemon=True, name=f"arranque-{self.servicio}")
+        self._hilo.start()
+        return self._hilo
+
+    def estado(self):
+        transcurrido = self.duracion if self.duracion is not None else time.perf_counter() - self.inicio
+        return {
+            "ready": self.listo,
+            "fase_actual": self.fase_actual,
+            "fases": list(self.fases),
+            "ms_desde_inicio": round(transcurrido * 1000, 1),
+            "error": self.error
+        }
+
+    def reporte(self):
+        lineas = [f"[arranque {self.servicio}]"]
+        for fase in self.fases:
+            linea = f"  {fase['fase']:<22} {fase['ms']:>9.1f} ms"
+            if fase["error"]:
+                linea += f"  (error: {fase['error']})"
+            lineas.append(linea)
+        total = (self.duracion or 0) * 1000
+        if self.listo:
+            lineas.append(f"  {'listo en':<22} {total:>9.1f} ms")
+        else:
+            lineas.append(f"  {'no quedó listo':<22} {total:>9.1f} ms  ({self.error})")
+        return "\n".join(lineas)
@@ -0,0 +1,397 @@
+"""
+Servidor ASGI para el Sistema RAG
+Expone las mismas rutas que rag_api.py, pero atiende las consultas de forma asíncrona:
+embedding y búsqueda corren en hilos y las llamadas a Groq no bloquean el servidor.
+Las llamadas concurrentes al LLM (consultas, streaming, lotes e insights generados en
+el momento) se acotan con RAG_MAX_LLM_CONCURRENTES; si el cupo está lleno se responde
+503 con Retry-After. El arranque corre en segundo plano por
+fases, igual que en rag_api.py, y /ready indica cuándo terminó (o por qué falló).
+
+Uso:
+    uvicorn rag_asgi:app --host 0.0.0.0 --port 5000
+"""
+import asyncio
+import contextlib
+import json
+import os
+
+from starlette.applications import Starlette
+from starlette.background import BackgroundTask
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+from rag_query import (
+    LimitadorLLM, LLMSaturado, calentar_indice, cargar_rag, consultar_async, consultar_lote,
+    consultar_stream, obtener_estadisticas_rag, precalentar_llms
+)
+from rag_arranque import Arranque
+from rag_cache import cache_respuestas
+from rag_insights import iniciar_precalculo, insights_precalculados, obtener_insights
+from rag_coalescencia import consultas_en_vuelo, insights_en_vuelo
+from rag_metricas import CONTENT_TYPE, registrar_medidores_cache, registrar_medidores_coalescencia, registro
+
+limitador = LimitadorLLM(
+    max_concurrentes=int(os.getenv("RAG_MAX_LLM_CONCURRENTES", "8")),
+    espera=float(os.getenv("RAG_LLM_ESPERA", "2")),
+    retry_after=int(os.getenv("RAG_RETRY_AFTER", "2"))
+)
+
+# Límites del endpoint por lotes (los mismos que rag_api.py)
+LOTE_MAX_PREGUNTAS = int(os.getenv("RAG_LOTE_MAX", "50"))
+LOTE_MAX_CONCURRENCIA = int(os.getenv("RAG_LOTE_CONCURRENCIA", "4"))
+
+estado = {"vectorstore": None}
+registrar_medidores_cache(cache_respuestas)
+registrar_medidores_coalescencia(consultas_en_vuelo, "consultas")
+registrar_medidores_coalescencia(insights_en_vuelo, "insights")
+
+def _arrancar(arranque):
+    """Fases de arranque: vectorstore, precalentamiento e insights"""
+    with arranque.fase("abrir_vectorstore"):
+        vector = cargar_rag()
+
+    # Modelo de embeddings cargado e índice en memoria
+    with arranque.fase("calentar_indice", opcional=True):
+        calentar_indice(vector)
+
+    # Crear los clientes Groq una sola vez al iniciar el proceso
+    with arranque.fase("clientes_llm", opcional=True):
+        precalentar_llms()
+
+    estado["vectorstore"] = vector
+
+    # Precalcular insights en segundo plano (y regenerarlos tras cada ingesta)
+    with arranque.fase("precalculo_insights", opcional=True):
+        iniciar_precalculo(vector)
+
+arranque = Arranque("rag_asgi")
+
+def _saturado(e):
+    return JSONResponse({
+        'success': False,
+        'error': str(e)
+    }, status_code=503, headers={'Retry-After': str(e.retry_after)})
+
+async def health(request):
+    """Endpoint de salud para verificar que el servicio está activo"""
+    return JSONResponse({
+        'status': 'ok',
+        'rag_loaded': estado["vectorstore"] is not None,
+        'service': 'RAG-EDU API',
+        'llm_en_curso': limitador.en_curso
+    })
+
+async def ready(request):
+    """Readiness: 200 cuando el vectorstore está abierto y precalentado, 503 mientras tanto o si falló"""
+    estado_arranque = arranque.estado()
+    estado_arranque['ready'] = estado_arranque['ready'] and estado["vectorstore"] is not None
+    return JSONResponse(estado_arranque, status_code=200 if estado_arranque['ready'] else 503)
+
+async def query(request):
+    """Endpoint principal para realizar consultas al RAG"""
+    try:
+        if estado["vectorstore"] is None:
+            return JSONResponse({
+                'success': False,
+                'error': 'Sistema RAG no inicializado. Verifica que ChromaDB existe.'
+            }, status_code=503)
+
+        try:
+            data = await request.json()
+        except ValueError:
+            data = None
+
+        if not data or 'pregunta' not in data:
+            return JSONResponse({
+                'success': False,
+                'error': 'El campo "pregunta" es requerido'
+            }, status_code=400)
+
+        pregunta = data['pregunta']
+        modelo = data.get('modelo', 'llama3')
+
+        if not pregunta.strip():
+            return JSONResponse({
+                'success': False,
+                'error': 'La pregunta no puede estar vacía'
+            }, status_code=400)
+
+        resultado = await consultar_async(pregunta, estado["vectorstore"], modelo, limitador)
+
+        return JSONResponse({
+            'success': True,
+            'pregunta': pregunta,
+            'respuesta': resultado['result'],
+            'sources': resultado.get('sources', []),
+            'metadata': resultado.get('metadata', {}),
+            'modelo': modelo
+        })
+
+    except LLMSaturado as e:
+        return _saturado(e)
+    except Exception as e:
+        return JSONResponse({
+            'success': False,
+            'error': f'Error al procesar la consulta: {str(e)}'
+        }, status_code=500)
+
+async def _cupos(cantidad):
+    """Toma `cantidad` cupos del limitador (o ninguno, si alguno no se libera a tiempo)"""
+    tomados = 0
+    try:
+        for _ in range(cantidad):
+            await limitador.adquirir()
+            tomados += 1
+    except LLMSaturado:
+        for _ in range(tomados):
+            limitador.liberar()
+        raise
+
+async def query_batch(request):
+    """
+    Responde varias preguntas en una sola llamada.
+    Body: {"preguntas": [...], "modelo": "llama3"}. Las llamadas al LLM del lote ocupan
+    tantos cupos del limitador como su concurrencia.
+    """
+    try:
+        if estado["vectorstore"] is None:
+            return JSONResponse({
+                'success': False,
+                'error': 'Sistema RAG no inicializado. Verifica que ChromaDB existe.'
+            }, status_code=503)
+
+        try:
+            data = await request.json()
+        except ValueError:
+            data = None
+
+        if not data or not isinstance(data.get('preguntas'), list) or not data['preguntas']:
+            return JSONResponse({
+                'success': False,
+                'error': 'El campo "preguntas" es requerido y debe ser una lista'
+            }, status_code=400)
+
+        preguntas = data['preguntas']
+        modelo = data.get('modelo', 'llama3')
+
+        if len(preguntas) > LOTE_MAX_PREGUNTAS:
+            return JSONResponse({
+                'success': False,
+                'error': f'Máximo {LOTE_MAX_PREGUNTAS} preguntas por lote'
+            }, status_code=400)
+
+        concurrencia = max(1, min(LOTE_MAX_CONCURRENCIA, len(preguntas)))
+        await _cupos(concurrencia)
+        try:
+            resultados = await run_in_threadpool(
+                consultar_lote, preguntas, estado["vectorstore"], modelo, max_concurrencia=concurrencia
+            )
+        finally:
+            for _ in range(concurrencia):
+                limitador.liberar()
+
+        return JSONResponse({
+            'success': True,
+            'modelo': modelo,
+            'resultados': [
+                {
+                    'success': True,
+                    'pregunta': r['pregunta'],
+                    'respuesta': r['result'],
+                    'sources': r.get('sources', []),
+                    'metadata': r.get('metadata', {})
+                } if r['success'] else r
+                for r in resultados
+            ]
+        })
+
+    except LLMSaturado as e:
+        return _saturado(e)
+    except Exception as e:
+        return JSONResponse({
+            'success': False,
+            'error': f'Error al procesar el lote: {str(e)}'
+        }, status_code=500)
+
+def _evento_sse(evento, datos):
+    return f"event: {evento}\ndata: {json.dumps(datos, ensure_ascii=False)}\n\n"
+
+async def query_stream(request):
+    """
+    Variante en streaming (Server-Sent Events) de /api/rag/query, con los mismos eventos
+    que rag_api.py: 'sources', 'token' y 'final' (o 'error'). El cupo del limitador se
+    toma antes de responder, así la saturación sigue siendo un 503 con Retry-After.
+    """
+    if estado["vectorstore"] is None:
+        return JSONResponse({
+            'success': False,
+            'error': 'Sistema RAG no inicializado. Verifica que ChromaDB existe.'
+        }, status_code=503)
+
+    try:
+        data = await request.json()
+    except ValueError:
+        data = None
+
+    if not data or 'pregunta' not in data:
+        return JSONResponse({
+            'success': False,
+            'error': 'El campo "pregunta" es requerido'
+        }, status_code=400)
+
+    pregunta = data['pregunta']
+    modelo = data.get('modelo', 'llama3')
+
+    if not pregunta.strip():
+        return JSONResponse({
+            'success': False,
+            'error': 'La pregunta no puede estar vacía'
+        }, status_code=400)
+
+    try:
+        await limitador.adquirir()
+    except LLMSaturado as e:
+        return _saturado(e)
+
+    # El cupo se libera una sola vez: al terminar el generador o, si el cliente se desconectó
+    # antes de empezar a leer, en la tarea de fondo de la respuesta
+    liberado = False
+
+    def liberar():
+        nonlocal liberado
+        if not liberado:
+            liberado = True
+            limitador.liberar()
+
+    async def generar():
+        try:
+            # consultar_stream es un generador bloqueante: cada paso corre en un hilo
+            async for evento, datos in iterate_in_threadpool(consultar_stream(pregunta, estado["vectorstore"], modelo)):
+                if evento == 'sources':
+                    yield _evento_sse('sources', {'sources': datos})
+                elif evento == 'token':
+                    yield _evento_sse('token', {'token': datos})
+                elif evento == 'final':
+                    yield _evento_sse('final', {
+                        'success': True,
+                        'pregunta': pregunta,
+                        'respuesta': datos['result'],
+                        'sources': datos.get('sources', []),
+                        'metadata': datos.get('metadata', {}),
+                        'modelo': modelo
+                    })
+        except Exception as e:
+            yield _evento_sse('error', {
+                'success': False,
+                'error': f'Error al procesar la consulta: {str(e)}'
+            })
+        finally:
+            liberar()
+
+    return StreamingResponse(
+        generar(),
+        media_type='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+        background=BackgroundTask(liberar)
+    )
+
+async def models(request):
+    """Devuelve la lista de modelos disponibles en Groq"""
+    return JSONResponse({
+        'models': [
+            {'id': 'llama3', 'name': 'Llama 3.1 (8B)', 'description': 'Modelo rápido y eficiente'},
+            {'id': 'llama3-70b', 'name': 'Llama 3.3 (70B)', 'description': 'Modelo más potente'},
+            {'id': 'mixtral', 'name': 'Mistral Saba 24B', 'description': 'Modelo de Mistral AI'},
+            {'id': 'gemma', 'name': 'Gemma 2 (9B)', 'description': 'Modelo de Google'}
+        ]
+    })
+
+async def insights(request):
+    """Devuelve los insights precalculados; con {"refrescar": true} se regeneran en el momento"""
+    try:
+        if estado["vectorstore"] is None:
+            return JSONResponse({
+                'success': False,
+                'error': 'Sistema RAG no inicializado'
+            }, status_code=503)
+
+        try:
+            data = await request.json()
+        except ValueError:
+            data = None
+        modelo = (data or {}).get('modelo', 'llama3')
+        refrescar = bool((data or {}).get('refrescar', False))
+
+        if not refrescar:
+            guardado = insights_precalculados(modelo)
+            if guardado is not None:
+                return JSONResponse(guardado)
+
+        # Generarlos llama al LLM: ocupa un cupo del limitador como cualquier consulta
+        async with limitador:
+            resultado = await run_in_threadpool(obtener_insights, estado["vectorstore"], modelo, refrescar)
+
+        return JSONResponse(resultado)
+
+    except LLMSaturado as e:
+        return _saturado(e)
+    except Exception as e:
+        return JSONResponse({
+            'success': False,
+            'error': str(e)
+        }, status_code=500)
+
+async def stats(request):
+    """Obtiene estadísticas sobre el conocimiento almacenado en el RAG"""
+    try:
+        if estado["vectorstore"] is None:
+            return JSONResponse({
+                'error': 'Sistema RAG no inicializado'
+            }, status_code=503)
+
+        estadisticas = await asyncio.to_thread(obtener_estadisticas_rag, estado["vectorstore"])
+
+        return JSONResponse(estadisticas)
+
+    except Exception as e:
+        return JSONResponse({
+            'error': str(e)
+        }, status_code=500)
+
+async def cache(request):
+    """Contadores de la cache de respuestas (hits, misses, evictions) para dimensionarla"""
+    return JSONResponse(cache_respuestas.estadisticas())
+
+async def metrics(request):
+    """Métricas por etapa en formato Prometheus"""
+    return Response(registro.exportar(), headers={'Content-Type': CONTENT_TYPE})
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    # El servidor acepta conexiones de inmediato; los errores quedan en el log y en /ready
+    arranque.iniciar(_arrancar)
+    yield
+
+app = Starlette(
+    routes=[
+        Route('/health', health, methods=['GET']),
+        Route('/ready', ready, methods=['GET']),
+        Route('/api/rag/query', query, methods=['POST']),
+        Route('/api/rag/query/batch', query_batch, methods=['POST']),
+        Route('/api/rag/query/stream', query_stream, methods=['POST']),
+        Route('/api/rag/models', models, methods=['GET']),
+        Route('/api/rag/insights', insights, methods=['POST']),
+        Route('/api/rag/stats', stats, methods=['GET']),
+        Route('/api/rag/cache', cache, methods=['GET']),
+        Route('/metrics', metrics, methods=['GET']),
+    ],
+    middleware=[Middleware(CORSMiddleware, allow_origins=['*'], allow_methods=['*'], allow_headers=['*'])],
+    lifespan=lifespan
+)
+
+if __name__ == '__main__':
+    import uvicorn
+    uvicorn.run(app, host='0.0.0.0', port=int(os.getenv("RAG_PORT", "5000")))
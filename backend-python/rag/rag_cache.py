@@ -0,0 +1,254 @@
+'''
+Caches del RAG
+- Respuestas: evita repetir embedding, búsqueda en ChromaDB y llamada a Groq
+  para preguntas que ya se respondieron con la misma versión de la colección.
+- Embeddings de consultas: evita volver a llamar a Ollama por textos ya embebidos.
+'''
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+def normalizar_pregunta(pregunta):
+    """Minúsculas, sin acentos, sin signos de puntuación y con espacios simples"""
+    texto = unicodedata.normalize('NFKD', str(pregunta).lower())
+    texto = ''.join(c for c in texto if not unicodedata.combining(c))
+    texto = re.sub(r'[^\w\s]', ' ', texto)
+    return re.sub(r'\s+', ' ', texto).strip()
+
+class CacheRespuestas:
+    """
+    Cache LRU con TTL indexado por (pregunta normalizada, modelo).
+
+    Si se define `umbral_similitud`, una pregunta sin coincidencia exacta se compara
+    por similitud coseno de embeddings contra las preguntas cacheadas del mismo modelo
+    para reutilizar respuestas a paráfrasis.
+    Las entradas se descartan cuando cambia la versión de la colección.
+    """
+
+    def __init__(self, max_entradas=256, ttl=3600, umbral_similitud=None):
+        self.max_entradas = max_entradas
+        self.ttl = ttl
+        self.umbral_similitud = umbral_similitud
+        self._entradas = OrderedDict()
+        self._lock = threading.Lock()
+        self._version = None
+        self.hits = 0
+        self.hits_semanticos = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _sincronizar_version(self, version):
+        # Una re-ingesta cambia la versión: todo lo cacheado queda obsoleto
+        if version != self._version:
+            self._entradas.clear()
+            self._version = version
+
+    def _vigente(self, entrada, ahora):
+        return self.ttl is None or ahora - entrada["creado"] <= self.ttl
+
+    def obtener(self, pregunta, modelo, version, embedding_fn=None, embedding=None):
+        """
+        Busca una respuesta cacheada
+
+        Args:
+            pregunta: Pregunta original del usuario
+            modelo: Id del modelo usado
+            version: Versión actual de la colección
+            embedding_fn: Función texto -> vector, usada solo si hay umbral de similitud
+            embedding: Vector ya calculado de la pregunta; si se pasa, no se llama a embedding_fn
+
+        Returns:
+            tuple (resultado o None, embedding de la pregunta o None)
+        """
+        clave = (normalizar_pregunta(pregunta), modelo)
+        ahora = time.time()
+
+        with self._lock:
+            self._sincronizar_version(version)
+            entrada = self._entradas.get(clave)
+            if entrada is not None:
+                if self._vigente(entrada, ahora):
+                    self._entradas.move_to_end(clave)
+                    self.hits += 1
+                    return entrada["resultado"], entrada["embedding"]
+                del self._entradas[clave]
+
+            if self.umbral_similitud is None or (embedding_fn is None and embedding is None):
+                self.misses += 1
+                return None, None
+
+            candidatos = [
+                (k, e) for k, e in self._entradas.items()
+                if k[1] == modelo and e["embedding"] is not None and self._vigente(e, ahora)
+            ]
+
+        # El embedding se calcula fuera del lock para no bloquear otras consultas
+        try:
+            if embedding is None:
+                embedding = embedding_fn(pregunta)
+            embedding = np.array(embedding, dtype=np.float32)
+            embedding /= (np.linalg.norm(embedding) or 1.0)
+        except Exception:
+            embedding = None
+
+        with self._lock:
+            if embedding is not None and candidatos:
+                matriz = np.stack([e["embedding"] for _, e in candidatos])
+                similitudes = matriz @ embedding
+                mejor = int(np.argmax(similitudes))
+                clave_mejor = candidatos[mejor][0]
+                if similitudes[mejor] >= self.umbral_similitud and clave_mejor in self._entradas:
+                    self._entradas.move_to_end(clave_mejor)
+                    self.hits += 1
+                    self.hits_semanticos += 1
+                    return self._entradas[clave_mejor]["resultado"], embedding
+
+            self.misses += 1
+            return None, embedding
+
+    def guardar(self, pregunta, modelo, version, resultado, embedding=None):
+        """Guarda una respuesta, desalojando la menos usada si se supera el tamaño máximo"""
+        clave = (normalizar_pregunta(pregunta), modelo)
+        with self._lock:
+            self._sincronizar_version(version)
+            self._entradas[clave] = {
+                "resultado": resultado,
+                "embedding": embedding,
+                "creado": time.time()
+            }
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+                self.evictions += 1
+
+    def limpiar(self):
+        with self._lock:
+            self._entradas.clear()
+
+    def estadisticas(self):
+        """Contadores para dimensionar la cache"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entradas": len(self._entradas),
+                "max_entradas": self.max_entradas,
+                "ttl": self.ttl,
+                "umbral_similitud": self.umbral_similitud,
+                "version_coleccion": self._version,
+                "hits": self.hits,
+                "hits_semanticos": self.hits_semanticos,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0
+            }
+
+def _umbral_desde_entorno():
+    valor = os.getenv("RAG_CACHE_SIMILITUD", "").strip()
+    return float(valor) if valor else None
+
+# Cache compartida por el proceso (configurable por variables de entorno)
+cache_respuestas = CacheRespuestas(
+    max_entradas=int(os.getenv("RAG_CACHE_MAX", "256")),
+    ttl=float(os.getenv("RAG_CACHE_TTL", "3600")),
+    umbral_similitud=_umbral_desde_entorno()
+)
+
+class EmbeddingsCacheados(Embeddings):
+    """
+    Envoltura de un modelo de embeddings con cache de dos niveles:
+    un LRU acotado en memoria y un almacén SQLite en disco.
+    La clave es el hash del texto junto con el nombre del modelo,
+    así una pregunta repetida no vuelve a pasar por el servidor de embeddings.
+    """
+
+    def __init__(self, base, nombre_modelo, ruta_disco=None, max_memoria=2048):
+        self.base = base
+        self.nombre_modelo = nombre_modelo
+        self.max_memoria = max_memoria
+        self._memoria = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        self.hits = 0
+        self.misses = 0
+
+        if ruta_disco:
+            os.makedirs(os.path.dirname(ruta_disco) or '.', exist_ok=True)
+            self._db = sqlite3.connect(ruta_disco, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings (clave TEXT PRIMARY KEY, vector BLOB)"
+            )
+            self._db.commit()
+
+    def _clave(self, texto):
+        return hashlib.sha256(f"{self.nombre_modelo}\0{texto}".encode('utf-8')).hexdigest()
+
+    def _recordar(self, clave, vector):
+        self._memoria[clave] = vector
+        self._memoria.move_to_end(clave)
+        while len(self._memoria) > self.max_memoria:
+            self._memoria.popitem(last=False)
+
+    def _buscar(self, clave):
+        vector = self._memoria.get(clave)
+        if vector is not None:
+            self._memoria.move_to_end(clave)
+            return vector
+        if self._db is not None:
+            fila = self._db.execute("SELECT vector FROM embeddings WHERE clave = ?", (clave,)).fetchone()
+            if fila:
+                vector = np.frombuffer(fila[0], dtype=np.float32).tolist()
+                self._recordar(clave, vector)
+                return vector
+        return None
+
+    def embed_documents(self, texts):
+        claves = [self._clave(t) for t in texts]
+        resultados = [None] * len(texts)
+        faltantes = []
+
+        with self._lock:
+            for i, clave in enumerate(claves):
+                resultados[i] = self._buscar(clave)
+                if resultados[i] is None:
+                    faltantes.append(i)
+            self.hits += len(texts) - len(faltantes)
+            self.misses += len(faltantes)
+
+        if faltantes:
+            nuevos = self.base.embed_documents([texts[i] for i in faltantes])
+            with self._lock:
+                for i, vector in zip(faltantes, nuevos):
+                    resultados[i] = list(vector)
+                    self._recordar(claves[i], resultados[i])
+                if self._db is not None:
+                    self._db.executemany(
+                        "INSERT OR REPLACE INTO embeddings (clave, vector) VALUES (?, ?)",
+                        [(claves[i], np.asarray(resultados[i], dtype=np.float32).tobytes()) for i in faltantes]
+                    )
+                    self._db.commit()
+
+        return resultados
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+    def precalcular(self, textos):
+        """Calcula (o carga desde disco) los embeddings de consultas constantes y los devuelve"""
+        return self.embed_documents(list(textos))
+
+    def estadisticas(self):
+        with self._lock:
+            return {
+                "modelo": self.nombre_modelo,
+                "en_memoria": len(self._memoria),
+                "hits": self.hits,
+                "misses": self.misses
+            }
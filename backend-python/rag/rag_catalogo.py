@@ -0,0 +1,157 @@
+'''
+Catálogo materializado de la base de conocimiento
+Guarda junto a ChromaDB los conteos de chunks por fuente y por tipo.
+Los scripts de ingesta lo actualizan al agregar o eliminar chunks,
+así /api/rag/stats no necesita recorrer la colección. La versión, que invalida
+BM25, insights y el vectorstore NumPy de la API, se publica una sola vez al
+terminar cada ingesta para que nadie reconstruya sobre una colección a medias.
+'''
+import json
+import os
+import threading
+from datetime import datetime
+
+CATALOGO_ARCHIVO = "kb_catalogo.json"
+
+_LOCK = threading.Lock()
+# Cache por ruta: (mtime, catalogo) para no releer el JSON si no cambió
+_CACHE = {}
+
+def nombre_fuente(source):
+    """Extrae solo el nombre del archivo de un 'source' de metadata"""
+    return str(source).split('/')[-1].split('\\')[-1]
+
+def tipo_fuente(filename):
+    """Clasifica una fuente por extensión (CSV, Jupyter, PDF u Otro)"""
+    if filename.endswith('.csv'):
+        return 'CSV'
+    if filename.endswith('.ipynb'):
+        return 'Jupyter'
+    if filename.endswith('.pdf'):
+        return 'PDF'
+    return 'Otro'
+
+def ruta_catalogo(chroma_path):
+    return os.path.join(str(chroma_path), CATALOGO_ARCHIVO)
+
+def _resumen(fuentes):
+    """Arma la respuesta de /api/rag/stats a partir de los conteos por fuente"""
+    fuentes_list = sorted(
+        [{'nombre': nombre, 'chunks': chunks, 'tipo': tipo_fuente(nombre)} for nombre, chunks in fuentes.items()],
+        key=lambda x: x['chunks'],
+        reverse=True
+    )
+    return {
+        "total_documentos": len(fuentes_list),
+        "total_chunks": sum(fuentes.values()),
+        "fuentes": fuentes_list,
+        "tipos": {
+            "csv": len([f for f in fuentes_list if f['tipo'] == 'CSV']),
+            "jupyter": len([f for f in fuentes_list if f['tipo'] == 'Jupyter']),
+            "pdf": len([f for f in fuentes_list if f['tipo'] == 'PDF']),
+            "otros": len([f for f in fuentes_list if f['tipo'] == 'Otro'])
+        }
+    }
+
+def leer_catalogo(chroma_path):
+    """
+    Lee el catálogo desde disco (o desde cache si el archivo no cambió)
+
+    Returns:
+        dict con version, fuentes y resumen, o None si aún no existe
+    """
+    ruta = ruta_catalogo(chroma_path)
+    try:
+        mtime = os.stat(ruta).st_mtime_ns
+    except OSError:
+        return None
+
+    cacheado = _CACHE.get(ruta)
+    if cacheado and cacheado[0] == mtime:
+        return cacheado[1]
+
+    try:
+        with open(ruta, 'r', encoding='utf-8') as f:
+            catalogo = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    _CACHE[ruta] = (mtime, catalogo)
+    return catalogo
+
+def version_catalogo(chroma_path):
+    """Devuelve la versión actual de la colección (cambia en cada ingesta), o 0 si no hay catálogo"""
+    catalogo = leer_catalogo(chroma_path)
+    return catalogo.get("version", 0) if catalogo else 0
+
+def _escribir(chroma_path, fuentes, version):
+    catalogo = {
+        "version": version,
+        "actualizado": datetime.now().isoformat(),
+        "fuentes": fuentes,
+        "resumen": _resumen(fuentes)
+    }
+    ruta = ruta_catalogo(chroma_path)
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    tmp = f"{ruta}.{os.getpid()}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(catalogo, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, ruta)
+    return catalogo
+
+def registrar_chunks(chroma_path, metadatas, signo=1, publicar=True):
+    """
+    Suma (signo=1) o resta (signo=-1) chunks al conteo de sus fuentes
+
+    Args:
+        chroma_path: Directorio de ChromaDB donde vive el catálogo
+        metadatas: Metadata de los chunks agregados o eliminados
+        signo: 1 al agregar, -1 al eliminar
+        publicar: False durante una ingesta: los conteos cambian pero la versión no
+            (se publica al final con publicar_version)
+
+    Returns:
+        dict con el catálogo actualizado
+    """
+    with _LOCK:
+        actual = leer_catalogo(chroma_path) or {}
+        fuentes = dict(actual.get("fuentes", {}))
+
+        for meta in metadatas:
+            if not isinstance(meta, dict):
+                continue
+            nombre = nombre_fuente(meta.get('source', 'Desconocido'))
+            fuentes[nombre] = fuentes.get(nombre, 0) + signo
+            if fuentes[nombre] <= 0:
+                del fuentes[nombre]
+
+        return _escribir(chroma_path, fuentes, actual.get("version", 0) + (1 if publicar else 0))
+
+def reiniciar_catalogo(chroma_path, metadatas=(), publicar=True):
+    """Reemplaza los conteos por los de `metadatas` (vacío tras limpiar la colección)"""
+    with _LOCK:
+        actual = leer_catalogo(chroma_path) or {}
+        fuentes = {}
+        for meta in metadatas:
+            if isinstance(meta, dict):
+                nombre = nombre_fuente(meta.get('source', 'Desconocido'))
+                fuentes[nombre] = fuentes.get(nombre, 0) + 1
+        return _escribir(chroma_path, fuentes, actual.get("version", 0) + (1 if publicar else 0))
+
+def publicar_version(chroma_path, version=None):
+    """
+    Publica una nueva versión de la colección al terminar una ingesta
+
+    Args:
+        chroma_path: Directorio de ChromaDB donde vive el catálogo
+        version: Versión a publicar (por defecto la actual + 1); la ingesta la
+            calcula antes para guardar el índice BM25 ya con esa versión
+
+    Returns:
+        int con la versión publicada
+    """
+    with _LOCK:
+        actual = leer_catalogo(chroma_path) or {}
+        version = version if version is not None else actual.get("version", 0) + 1
+        _escribir(chroma_path, dict(actual.get("fuentes", {})), version)
+        return version
@@ -0,0 +1,83 @@
+'''
+Coalescencia de consultas en vuelo (single-flight)
+Si varias peticiones idénticas llegan mientras la primera todavía se está
+calculando, las siguientes esperan ese mismo cálculo en lugar de repetir
+embedding, búsqueda y llamada a Groq.
+'''
+import asyncio
+import threading
+
+class _Llamada:
+    def __init__(self):
+        self.listo = threading.Event()
+        self.resultado = None
+        self.error = None
+
+class Coalescedor:
+    """
+    Agrupa las llamadas concurrentes con la misma clave en una sola ejecución.
+    El primero ejecuta la función; los demás reciben su resultado (o su excepción).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._en_vuelo = {}
+        self._en_vuelo_async = {}
+        self.ejecutadas = 0
+        self.compartidas = 0
+
+    def ejecutar(self, clave, funcion):
+        """
+        Returns:
+            (resultado, compartido): compartido es True si se reutilizó un cálculo en vuelo
+        """
+        with self._lock:
+            llamada = self._en_vuelo.get(clave)
+            if llamada is not None:
+                self.compartidas += 1
+                lider = False
+            else:
+                llamada = self._en_vuelo[clave] = _Llamada()
+                self.ejecutadas += 1
+                lider = True
+
+        if not lider:
+            llamada.listo.wait()
+            if llamada.error is not None:
+                raise llamada.error
+            return llamada.resultado, True
+
+        try:
+            llamada.resultado = funcion()
+        except Exception as e:
+            llamada.error = e
+            raise
+        finally:
+            with self._lock:
+                self._en_vuelo.pop(clave, None)
+            llamada.listo.set()
+        return llamada.resultado, False
+
+    async def ejecutar_async(self, clave, fabrica):
+        """
+        Igual que ejecutar() para corrutinas: `fabrica()` crea la corrutina que se
+        espera una sola vez por clave dentro del event loop.
+        """
+        futuro = self._en_vuelo_async.get(clave)
+        if futuro is not None:
+            self.compartidas += 1
+            return await asyncio.shield(futuro), True
+
+        futuro = asyncio.ensure_future(fabrica())
+        self._en_vuelo_async[clave] = futuro
+        self.ejecutadas += 1
+        futuro.add_done_callback(lambda _: self._en_vuelo_async.pop(clave, None))
+        return await asyncio.shield(futuro), False
+
+    def en_vuelo(self):
+        with self._lock:
+            return len(self._en_vuelo) + len(self._en_vuelo_async)
+
+# Coalescedores compartidos por el proceso
+consultas_en_vuelo = Coalescedor()
+insights_en_vuelo = Coalescedor()
@@ -0,0 +1,171 @@
+'''
+Armado del contexto del prompt
+Los chunks recuperados se fusionan cuando son adyacentes (el splitter deja 150
+caracteres de solapamiento entre chunks vecinos), se descartan los casi duplicados,
+se ordenan con MMR para diversificar y se empacan hasta el presupuesto de tokens
+del modelo, cortando en un fin de oración y no a mitad de palabra.
+'''
+import re
+
+from langchain_core.documents import Document
+
+from rag_hibrido import tokenizar
+
+CARACTERES_POR_TOKEN = 4
+SOLAPAMIENTO_MINIMO = 30
+SIMILITUD_DUPLICADO = 0.8
+LAMBDA_MMR = 0.7
+TOKENS_MINIMOS_FRAGMENTO = 60
+
+def estimar_tokens(texto):
+    """Estimación rápida de tokens (~4 caracteres por token en español)"""
+    return (len(texto) + CARACTERES_POR_TOKEN - 1) // CARACTERES_POR_TOKEN
+
+def _fuente(doc):
+    meta = getattr(doc, 'metadata', {}) or {}
+    return meta.get('source', '') if isinstance(meta, dict) else ''
+
+def _solapamiento(a, b, minimo=SOLAPAMIENTO_MINIMO):
+    """Largo del sufijo de `a` que coincide con el prefijo de `b` (0 si es menor a `minimo`)"""
+    if len(a) < minimo or len(b) < minimo:
+        return 0
+    semilla = b[:minimo]
+    pos = a.find(semilla, max(0, len(a) - len(b)))
+    while pos != -1:
+        if b.startswith(a[pos:]):
+            return len(a) - pos
+        pos = a.find(semilla, pos + 1)
+    return 0
+
+def _unir(a, b):
+    """Une dos textos de la misma fuente si uno contiene al otro o si se solapan; si no, None"""
+    if b in a:
+        return a
+    if a in b:
+        return b
+    n = _solapamiento(a, b)
+    if n:
+        return a + b[n:]
+    n = _solapamiento(b, a)
+    if n:
+        return b + a[n:]
+    return None
+
+def fusionar_adyacentes(docs):
+    """
+    Fusiona los chunks de una misma fuente que se solapan o se contienen
+
+    Returns:
+        lista de dicts (texto, fuente, metadata, rango) en el orden del mejor chunk de cada fragmento
+    """
+    fragmentos = []
+    for rango, doc in enumerate(docs):
+        texto = getattr(doc, 'page_content', str(doc))
+        fuente = _fuente(doc)
+        for fragmento in fragmentos:
+            if fragmento["fuente"] != fuente:
+                continue
+            unido = _unir(fragmento["texto"], texto)
+            if unido is not None:
+                fragmento["texto"] = unido
+                break
+        else:
+            fragmentos.append({
+                "texto": texto,
+                "fuente": fuente,
+                "metadata": getattr(doc, 'metadata', {}) or {},
+                "rango": rango
+            })
+    return fragmentos
+
+def _shingles(tokens, n=3):
+    if len(tokens) < n:
+        return {tuple(tokens)}
+    return {tuple(tokens[i:i + n]) for i in range(len(tokens) - n + 1)}
+
+def _jaccard(a, b):
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+def _contencion(a, b):
+    if not a or not b:
+        return 0.0
+    return len(a & b) / min(len(a), len(b))
+
+def quitar_casi_duplicados(fragmentos, umbral=SIMILITUD_DUPLICADO):
+    """Descarta los fragmentos casi iguales (o casi contenidos) en uno mejor rankeado"""
+    elegidos = []
+    for fragmento in fragmentos:
+        tokens = tokenizar(fragmento["texto"])
+        fragmento["tokens"] = set(tokens)
+        fragmento["shingles"] = _shingles(tokens)
+        if any(_contencion(fragmento["shingles"], e["shingles"]) >= umbral for e in elegidos):
+            continue
+        elegidos.append(fragmento)
+    return elegidos
+
+def ordenar_mmr(fragmentos, lambda_mmr=LAMBDA_MMR):
+    """
+    Maximal Marginal Relevance: alterna relevancia (posición en el ranking de
+    recuperación) y novedad (similitud léxica con lo ya elegido)
+    """
+    if not fragmentos:
+        return []
+    n = len(fragmentos)
+    relevancia = {id(f): 1.0 - f["rango"] / (n + 1) for f in fragmentos}
+    pendientes = sorted(fragmentos, key=lambda f: f["rango"])
+    orden = [pendientes.pop(0)]
+    while pendientes:
+        mejor = max(
+            pendientes,
+            key=lambda f: lambda_mmr * relevancia[id(f)]
+            - (1 - lambda_mmr) * max(_jaccard(f["tokens"], e["tokens"]) for e in orden)
+        )
+        pendientes.remove(mejor)
+        orden.append(mejor)
+    return orden
+
+def _recortar(texto, max_caracteres):
+    """Recorta en el último fin de oración (o espacio) antes de `max_caracteres`, "…" incluido"""
+    if len(texto) <= max_caracteres:
+        return texto
+    if max_caracteres <= 0:
+        return ""
+    corte = texto[:max_caracteres]
+    fines = [m.end() for m in re.finditer(r'[.!?](\s|$)', corte)]
+    if fines and fines[-1] > max_caracteres // 2:
+        return corte[:fines[-1]].rstrip()
+    espacio = corte.rfind(' ')
+    # Sin espacio se corta un carácter antes para dejar lugar al "…"
+    return (corte[:espacio] if espacio > 0 else corte[:max_caracteres - 1]).rstrip() + "…"
+
+def empacar_contexto(docs, presupuesto_tokens, separador="\n\n"):
+    """
+    Arma el contexto del prompt dentro del presupuesto de tokens
+
+    Args:
+        docs: Documentos recuperados, del más al menos relevante
+        presupuesto_tokens: Tokens disponibles para el contexto
+
+    Returns:
+        (contexto, docs_usados): el texto empacado y un Document por fragmento incluido
+    """
+    fragmentos = ordenar_mmr(quitar_casi_duplicados(fusionar_adyacentes(docs)))
+
+    partes = []
+    usados = []
+    restante = presupuesto_tokens * CARACTERES_POR_TOKEN
+    for fragmento in fragmentos:
+        costo = len(fragmento["texto"]) + (len(separador) if partes else 0)
+        if costo <= restante:
+            texto = fragmento["texto"]
+        elif restante // CARACTERES_POR_TOKEN >= TOKENS_MINIMOS_FRAGMENTO:
+            texto = _recortar(fragmento["texto"], restante - (len(separador) if partes else 0))
+        else:
+            continue
+        partes.append(texto)
+        usados.append(Document(page_content=texto, metadata=fragmento["metadata"]))
+        restante -= len(texto) + (len(separador) if len(partes) > 1 else 0)
+
+    return separador.join(partes), usados
@@ -0,0 +1,160 @@
+'''
+Proveedor de embeddings del RAG
+Un único punto para crear el modelo de embeddings que usan la ingesta, la ingesta
+de datos scrapeados y las consultas: envía los textos en lotes (con tamaño y
+concurrencia configurables) y registra junto a ChromaDB qué modelo y dimensión
+se usaron, para no mezclar espacios de embeddings en la misma colección.
+
+Backends (variable RAG_EMBEDDINGS):
+    ollama: OllamaEmbeddings (por defecto nomic-embed-text)
+    hash:   vectores deterministas de n-gramas hasheados, sin red (tests y benchmarks)
+'''
+import hashlib
+import json
+import math
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain_core.embeddings import Embeddings
+
+from rag_hibrido import tokenizar
+
+EMBEDDINGS_ARCHIVO = "embeddings.json"
+MODELO_OLLAMA = "nomic-embed-text"
+DIMENSION_HASH = 768
+
+class EmbeddingsIncompatibles(ValueError):
+    """La colección fue creada con otro modelo (o dimensión) de embeddings"""
+
+def vector_hash(texto, dimension=DIMENSION_HASH):
+    """
+    Feature hashing de unigramas y bigramas de palabras (sin acentos ni stopwords),
+    normalizado a norma 1: determinista y con textos parecidos cerca entre sí
+    """
+    tokens = tokenizar(texto)
+    ngramas = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+    vector = [0.0] * dimension
+    for ngrama in ngramas:
+        h = int.from_bytes(hashlib.blake2b(ngrama.encode('utf-8'), digest_size=8).digest(), 'little')
+        vector[h % dimension] += 1.0 if (h >> 32) & 1 else -1.0
+    norma = math.sqrt(sum(v * v for v in vector)) or 1.0
+    return [v / norma for v in vector]
+
+class EmbeddingsHash(Embeddings):
+    """Backend local y determinista (no necesita Ollama)"""
+
+    def __init__(self, dimension=DIMENSION_HASH):
+        self.dimension = dimension
+
+    def embed_documents(self, texts):
+        return [vector_hash(t, self.dimension) for t in texts]
+
+    def embed_query(self, text):
+        return vector_hash(text, self.dimension)
+
+class EmbeddingsLotes(Embeddings):
+    """
+    Envía los textos al backend en lotes de `tamano_lote`, con hasta `concurrencia`
+    lotes en paralelo, y conserva el orden de entrada.
+    """
+
+    def __init__(self, base, nombre, tamano_lote=64, concurrencia=2):
+        self.base = base
+        self.nombre = nombre
+        self.tamano_lote = max(1, tamano_lote)
+        self.concurrencia = max(1, concurrencia)
+        self._dimension = getattr(base, 'dimension', None)
+
+    def embed_documents(self, texts):
+        texts = list(texts)
+        lotes = [texts[i:i + self.tamano_lote] for i in range(0, len(texts), self.tamano_lote)]
+        if len(lotes) <= 1 or self.concurrencia == 1:
+            vectores = [v for lote in lotes for v in self.base.embed_documents(lote)]
+        else:
+            with ThreadPoolExecutor(max_workers=min(self.concurrencia, len(lotes))) as executor:
+                vectores = [v for resultado in executor.map(self.base.embed_documents, lotes) for v in resultado]
+        if vectores and self._dimension is None:
+            self._dimension = len(vectores[0])
+        return vectores
+
+    def embed_query(self, text):
+        vector = self.base.embed_query(text)
+        if self._dimension is None:
+            self._dimension = len(vector)
+        return vector
+
+    @property
+    def dimension(self):
+        """Dimensión de los vectores (si todavía no se conoce, embebe un texto de prueba)"""
+        if self._dimension is None:
+            self.embed_query("dimension")
+        return self._dimension
+
+def crear_embeddings(proveedor=None, modelo=None, tamano_lote=None, concurrencia=None):
+    """
+    Crea el proveedor de embeddings configurado (argumentos o variables de entorno
+    RAG_EMBEDDINGS, RAG_EMBEDDINGS_MODELO, RAG_EMBEDDINGS_LOTE, RAG_EMBEDDINGS_CONCURRENCIA)
+
+    Returns:
+        EmbeddingsLotes con `nombre` = "<proveedor>:<modelo>"
+    """
+    proveedor = (proveedor or os.getenv("RAG_EMBEDDINGS", "ollama")).lower()
+    tamano_lote = tamano_lote or int(os.getenv("RAG_EMBEDDINGS_LOTE", "64"))
+    concurrencia = concurrencia or int(os.getenv("RAG_EMBEDDINGS_CONCURRENCIA", "2"))
+
+    if proveedor == "ollama":
+        from langchain_ollama import OllamaEmbeddings
+        modelo = modelo or os.getenv("RAG_EMBEDDINGS_MODELO", MODELO_OLLAMA)
+        base = OllamaEmbeddings(model=modelo)
+    elif proveedor == "hash":
+        dimension = int(modelo or os.getenv("RAG_EMBEDDINGS_MODELO", str(DIMENSION_HASH)))
+        modelo = str(dimension)
+        base = EmbeddingsHash(dimension)
+    else:
+        raise ValueError(f"Proveedor de embeddings desconocido: {proveedor} (usar ollama o hash)")
+
+    return EmbeddingsLotes(base, f"{proveedor}:{modelo}", tamano_lote, concurrencia)
+
+def ruta_embeddings(chroma_path):
+    return os.path.join(str(chroma_path), EMBEDDINGS_ARCHIVO)
+
+def leer_embeddings(chroma_path):
+    """Modelo y dimensión registrados para la colección, o None si no hay registro"""
+    try:
+        with open(ruta_embeddings(chroma_path), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def verificar_embeddings(chroma_path, nombre, dimension=None):
+    """Lanza EmbeddingsIncompatibles si la colección se creó con otro modelo o dimensión"""
+    registro = leer_embeddings(chroma_path)
+    if registro is None:
+        return
+    if registro.get("modelo") != nombre:
+        raise EmbeddingsIncompatibles(
+            f"La colección usa embeddings de {registro.get('modelo')} y se intentó usar {nombre}; "
+            "reingesta la colección o configura RAG_EMBEDDINGS/RAG_EMBEDDINGS_MODELO"
+        )
+    if dimension is not None and registro.get("dimension") not in (None, dimension):
+        raise EmbeddingsIncompatibles(
+            f"La colección tiene vectores de dimensión {registro.get('dimension')} y {nombre} produce {dimension}"
+        )
+
+def registrar_embeddings(chroma_path, nombre, dimension):
+    """Guarda junto a ChromaDB el modelo y la dimensión de los vectores de la colección"""
+    os.makedirs(str(chroma_path), exist_ok=True)
+    ruta = ruta_embeddings(chroma_path)
+    tmp = f"{ruta}.{os.getpid()}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump({"modelo": nombre, "dimension": dimension}, f)
+    os.replace(tmp, ruta)
+
+def asegurar_embeddings(chroma_path, embeddings, coleccion_vacia=False):
+    """
+    Antes de agregar chunks: verifica que el proveedor coincida con el de la colección
+    (salvo que esté vacía) y deja registrado el modelo y la dimensión
+    """
+    if not coleccion_vacia:
+        verificar_embeddings(chroma_path, embeddings.nombre, embeddings.dimension)
+    registrar_embeddings(chroma_path, embeddings.nombre, embeddings.dimension)
@@ -0,0 +1,147 @@
+'''
+Escritura de embeddings en pipeline (productor/consumidor)
+Varios lotes se embeben a la vez en un pool de hilos mientras un único escritor,
+que mantiene abierta la colección, va guardando los lotes que terminan: el
+embedding y la escritura a disco se solapan en lugar de alternarse. La cantidad
+de lotes en vuelo está acotada (backpressure) y los lotes que fallan al embeberse
+se reintentan con espera exponencial.
+'''
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+class EscritorEmbeddings:
+    """
+    Embebe y escribe (id, texto, metadata) en lotes
+
+    Args:
+        embeddings: Modelo con embed_documents
+        escribir: función (ids, vectores, textos, metadatas) que guarda un lote
+        tamano_lote: Chunks por lote de embedding
+        concurrencia: Lotes embebiéndose a la vez (RAG_INGESTA_CONCURRENCIA)
+        en_vuelo: Máximo de lotes embebidos o embebiéndose sin escribir (por defecto 2 x concurrencia)
+        reintentos: Reintentos por lote si falla el embedding
+        espera: Segundos antes del primer reintento (se duplica en cada uno)
+        intervalo_progreso: Segundos entre líneas de progreso (0 = sin progreso)
+    """
+
+    def __init__(self, embeddings, escribir, tamano_lote=None, concurrencia=None, en_vuelo=None,
+                 reintentos=3, espera=1.0, intervalo_progreso=2.0):
+        self.embeddings = embeddings
+        self.escribir = escribir
+        # Por defecto, lo configurado en el proveedor (RAG_EMBEDDINGS_LOTE / RAG_EMBEDDINGS_CONCURRENCIA)
+        self.tamano_lote = tamano_lote or getattr(embeddings, 'tamano_lote', 64)
+        self.concurrencia = max(1, concurrencia or int(os.getenv("RAG_INGESTA_CONCURRENCIA", "0"))
+                                or getattr(embeddings, 'concurrencia', 2))
+        self.en_vuelo = max(self.concurrencia, en_vuelo or 2 * self.concurrencia)
+        self.reintentos = reintentos
+        self.espera = espera
+        self.intervalo_progreso = intervalo_progreso
+        self.reintentos_hechos = 0
+        self._lock = threading.Lock()
+
+    def _embeber(self, textos):
+        for intento in range(self.reintentos + 1):
+            try:
+                return self.embeddings.embed_documents(textos)
+            except Exception as e:
+                if intento == self.reintentos:
+                    raise
+                with self._lock:
+                    self.reintentos_hechos += 1
+                espera = self.espera * (2 ** intento)
+                print(f"   Falló el embedding de un lote de {len(textos)} chunks ({e}); reintento en {espera:.1f} s")
+                time.sleep(espera)
+
+    def _lotes(self, items):
+        lote = []
+        for item in items:
+            lote.append(item)
+            if len(lote) >= self.tamano_lote:
+                yield lote
+                lote = []
+        if lote:
+            yield lote
+
+    def ejecutar(self, items, total=None, al_escribir=None):
+        """
+        Consume `items` (iterable de (id, texto, metadata)) a medida que hay lugar en el pipeline
+
+        Args:
+            items: Chunks a embeber y escribir
+            total: Cantidad esperada de chunks (solo para el progreso)
+            al_escribir: función (ids, metadatas) llamada tras escribir cada lote
+
+        Returns:
+            dict con chunks, lotes, segundos, chunks_por_segundo y reintentos
+        """
+        inicio = time.perf_counter()
+        ultimo_progreso = inicio
+        escritos = 0
+        lotes = 0
+
+        def escribir_terminados(pendientes, bloquear):
+            nonlocal escritos, lotes, ultimo_progreso
+            terminados, _ = wait(pendientes, return_when=FIRST_COMPLETED) if bloquear else (
+                {f for f in pendientes if f.done()}, None
+            )
+            for futuro in terminados:
+                lote = pendientes.pop(futuro)
+                vectores = futuro.result()
+                ids = [i for i, _, _ in lote]
+                metadatas = [m for _, _, m in lote]
+                self.escribir(ids, vectores, [t for _, t, _ in lote], metadatas)
+                escritos += len(lote)
+                lotes += 1
+                if al_escribir:
+                    al_escribir(ids, metadatas)
+
+            ahora = time.perf_counter()
+            if self.intervalo_progreso and ahora - ultimo_progreso >= self.intervalo_progreso:
+                ultimo_progreso = ahora
+                avance = f"{escritos}/{total}" if total else f"{escritos}"
+                print(f"   {avance} chunks escritos ({escritos / (ahora - inicio):.1f} chunks/s)")
+
+        pendientes = {}
+        with ThreadPoolExecutor(max_workers=self.concurrencia, thread_name_prefix="embedding") as executor:
+            try:
+                for lote in self._lotes(items):
+                    # Backpressure: no se lee el siguiente lote hasta que haya lugar
+                    while len(pendientes) >= self.en_vuelo:
+                        escribir_terminados(pendientes, bloquear=True)
+                    pendientes[executor.submit(self._embeber, [t for _, t, _ in lote])] = lote
+                    escribir_terminados(pendientes, bloquear=False)
+                while pendientes:
+                    escribir_terminados(pendientes, bloquear=True)
+            except BaseException:
+                for futuro in pendientes:
+                    futuro.cancel()
+                raise
+
+        segundos = time.perf_counter() - inicio
+        return {
+            "chunks": escritos,
+            "lotes": lotes,
+            "segundos": round(segundos, 3),
+            "chunks_por_segundo": round(escritos / segundos, 1) if segundos else None,
+            "reintentos": self.reintentos_hechos
+        }
+
+def escritor_de_coleccion(collection, al_insertar=None):
+    """
+    Función de escritura para EscritorEmbeddings sobre una colección abierta (ChromaDB o NumPy)
+
+    Args:
+        collection: Colección donde se hace el upsert
+        al_insertar: función (metadatas) llamada solo con los chunks cuyo id no estaba
+            en la colección, para que reingerir los mismos ids no infle los conteos
+    """
+    def escribir(ids, vectores, textos, metadatas):
+        existentes = set(collection.get(ids=ids, include=[]).get('ids') or []) if al_insertar else set()
+        collection.upsert(ids=ids, embeddings=vectores, documents=textos, metadatas=metadatas)
+        if al_insertar:
+            nuevos = [m for i, m in zip(ids, metadatas) if i not in existentes]
+            if nuevos:
+                al_insertar(nuevos)
+    return escribir
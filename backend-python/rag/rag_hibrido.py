@@ -0,0 +1,190 @@
+'''
+Recuperación híbrida léxica + vectorial
+Índice BM25 invertido sobre los mismos chunks de ChromaDB, construido al ingerir
+y guardado junto a la base vectorial. Los rankings léxico y vectorial se combinan
+con Reciprocal Rank Fusion (RRF).
+'''
+import json
+import math
+import os
+import re
+import threading
+import unicodedata
+
+BM25_ARCHIVO = "bm25.json"
+
+STOPWORDS = {
+    'a', 'al', 'algo', 'como', 'con', 'cual', 'cuales', 'de', 'del', 'desde', 'donde',
+    'e', 'el', 'ella', 'ellos', 'en', 'entre', 'es', 'esa', 'ese', 'esta', 'este', 'esto',
+    'fue', 'ha', 'hay', 'la', 'las', 'le', 'les', 'lo', 'los', 'mas', 'me', 'mi', 'muy',
+    'no', 'o', 'para', 'pero', 'por', 'que', 'se', 'segun', 'ser', 'si', 'sin', 'sobre',
+    'son', 'su', 'sus', 'tiene', 'un', 'una', 'uno', 'unos', 'y', 'ya'
+}
+
+def tokenizar(texto):
+    """Tokens en minúsculas, sin acentos y sin stopwords"""
+    texto = unicodedata.normalize('NFKD', str(texto).lower())
+    texto = ''.join(c for c in texto if not unicodedata.combining(c))
+    return [t for t in re.findall(r'[a-z0-9]+', texto) if t not in STOPWORDS and len(t) > 1]
+
+class IndiceBM25:
+    """Índice invertido BM25: término -> [(posición del chunk, frecuencia)]"""
+
+    def __init__(self, ids=None, longitudes=None, postings=None, version=None, k1=1.5, b=0.75):
+        self.ids = ids or []
+        self.longitudes = longitudes or []
+        self.postings = postings or {}
+        self.version = version
+        self.k1 = k1
+        self.b = b
+        self._preparar()
+
+    def _preparar(self):
+        n = len(self.ids)
+        self.promedio = (sum(self.longitudes) / n) if n else 0.0
+        self.idf = {
+            termino: math.log(1 + (n - len(lista) + 0.5) / (len(lista) + 0.5))
+            for termino, lista in self.postings.items()
+        }
+
+    @classmethod
+    def construir(cls, ids, textos, version=None):
+        """Construye el índice a partir de los ids y textos de los chunks"""
+        postings = {}
+        longitudes = []
+        for pos, texto in enumerate(textos):
+            tokens = tokenizar(texto or '')
+            longitudes.append(len(tokens))
+            frecuencias = {}
+            for token in tokens:
+                frecuencias[token] = frecuencias.get(token, 0) + 1
+            for token, tf in frecuencias.items():
+                postings.setdefault(token, []).append((pos, tf))
+        return cls(list(ids), longitudes, postings, version)
+
+    def buscar(self, consulta, k=20):
+        """
+        Devuelve los k chunks con mayor puntaje BM25
+
+        Returns:
+            lista de (id, puntaje) ordenada de mayor a menor
+        """
+        if not self.ids:
+            return []
+
+        puntajes = {}
+        for termino in set(tokenizar(consulta)):
+            lista = self.postings.get(termino)
+            if not lista:
+                continue
+            idf = self.idf[termino]
+            for pos, tf in lista:
+                norm = self.k1 * (1 - self.b + self.b * self.longitudes[pos] / (self.promedio or 1.0))
+                puntajes[pos] = puntajes.get(pos, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+
+        mejores = sorted(puntajes.items(), key=lambda x: x[1], reverse=True)[:k]
+        return [(self.ids[pos], puntaje) for pos, puntaje in mejores]
+
+    def guardar(self, ruta):
+        os.makedirs(os.path.dirname(ruta) or '.', exist_ok=True)
+        # Temporal único por proceso e hilo: dos escritores nunca comparten el archivo a medio escribir
+        tmp = f"{ruta}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({
+                "version": self.version,
+                "ids": self.ids,
+                "longitudes": self.longitudes,
+                "postings": self.postings
+            }, f)
+        os.replace(tmp, ruta)
+
+    @classmethod
+    def cargar(cls, ruta):
+        with open(ruta, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        postings = {t: [tuple(p) for p in lista] for t, lista in data.get("postings", {}).items()}
+        return cls(data.get("ids"), data.get("longitudes"), postings, data.get("version"))
+
+def ruta_bm25(chroma_path):
+    return os.path.join(str(chroma_path), BM25_ARCHIVO)
+
+def construir_bm25_desde_coleccion(collection, chroma_path, version):
+    """Reconstruye y guarda el índice BM25 con todos los chunks de la colección (se usa al ingerir)"""
+    data = collection.get(include=['documents'])
+    indice = IndiceBM25.construir(data.get('ids', []) or [], data.get('documents', []) or [], version)
+    indice.guardar(ruta_bm25(chroma_path))
+    return indice
+
+def fusionar_rrf(rankings, k, k_rrf=60):
+    """
+    Reciprocal Rank Fusion: combina varias listas de ids ordenadas en una sola
+
+    Args:
+        rankings: listas de ids, cada una ordenada de más a menos relevante
+        k: cantidad de ids a devolver
+        k_rrf: constante de suavizado del RRF
+
+    Returns:
+        lista con los k ids de mayor puntaje fusionado
+    """
+    puntajes = {}
+    for ranking in rankings:
+        for posicion, chunk_id in enumerate(ranking):
+            puntajes[chunk_id] = puntajes.get(chunk_id, 0.0) + 1.0 / (k_rrf + posicion + 1)
+    return [chunk_id for chunk_id, _ in sorted(puntajes.items(), key=lambda x: x[1], reverse=True)[:k]]
+
+class GestorBM25:
+    """
+    Mantiene en memoria el índice BM25 de la versión actual de la colección.
+    Cuando la versión cambia, el índice nuevo se carga (o reconstruye) en un hilo
+    aparte y mientras tanto se sigue sirviendo el anterior.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.indice = None
+        self._actualizando = None
+
+    def _cargar_o_construir(self, collection, chroma_path, version):
+        """Índice de `version`: del disco si la ingesta ya lo guardó, si no desde la colección"""
+        try:
+            indice = IndiceBM25.cargar(ruta_bm25(chroma_path))
+        except (OSError, ValueError):
+            indice = None
+        if indice is None or indice.version != version:
+            indice = construir_bm25_desde_coleccion(collection, chroma_path, version)
+        return indice
+
+    def _actualizar(self, collection, chroma_path, version):
+        try:
+            indice = self._cargar_o_construir(collection, chroma_path, version)
+        except Exception as e:
+            print(f"No se pudo actualizar el índice BM25 (versión {version}): {e}")
+            indice = None
+        with self._lock:
+            if indice is not None:
+                self.indice = indice
+            self._actualizando = None
+
+    def obtener(self, collection, chroma_path, version):
+        """
+        Devuelve el índice vigente. Solo bloquea si todavía no hay ninguno; si la
+        versión cambió, lanza la actualización en segundo plano y devuelve el anterior.
+        """
+        indice = self.indice
+        if indice is not None and indice.version == version:
+            return indice
+
+        with self._lock:
+            if self.indice is None:
+                self.indice = self._cargar_o_construir(collection, chroma_path, version)
+                return self.indice
+            if self.indice.version != version and self._actualizando is None:
+                self._actualizando = version
+                threading.Thread(
+                    target=self._actualizar, args=(collection, chroma_path, version),
+                    daemon=True, name="actualizar-bm25"
+                ).start()
+            return self.indice
+
+gestor_bm25 = GestorBM25()
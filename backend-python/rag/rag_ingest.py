@@ -1,11 +1,21 @@
+import argparse
 import os
 import json
+import re
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
 import nbformat
 from langchain_community.document_loaders import PyPDFLoader, TextLoader, CSVLoader
 from langchain_core.documents import Document
 from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_community.vectorstores import Chroma
-from langchain_ollama import OllamaEmbeddings
+from rag_catalogo import publicar_version, registrar_chunks, version_catalogo
+from rag_hibrido import construir_bm25_desde_coleccion
+from rag_embeddings import asegurar_embeddings, crear_embeddings
+from rag_escritor import EscritorEmbeddings, escritor_de_coleccion
+from rag_manifiesto import guardar_manifiesto, hash_vigente, id_chunk, leer_manifiesto
+from rag_npstore import abrir_vectorstore, escritura_diferida
 
 DOCUMENTS_PATH = "documents_raw"
 DATA_RAW_PATH = "../data/raw"
@@ -16,122 +26,122 @@ KNOWLEDGE_SOURCES_PATH = "knowledge_sources"
 OUTPUT_RENDIMIENTO_PATH = "../output"
 CHROMA_PATH = "vectorstore/chroma_db"
 
+CHUNK_SIZE = 1500
+CHUNK_OVERLAP = 150
+
+# start_index: offset del chunk en su documento, parte del id determinista
 text_splitter = RecursiveCharacterTextSplitter(
-    chunk_size=1500,
-    chunk_overlap=150,
-    length_function=len
+    chunk_size=CHUNK_SIZE,
+    chunk_overlap=CHUNK_OVERLAP,
+    length_function=len,
+    add_start_index=True
 )
 
 MAX_CHUNK_LENGTH = 6000
 
+# Tres o más saltos de línea (con espacios entre medio) -> un párrafo
+_LINEAS_EN_BLANCO = re.compile(r"\n[ \t]*(?:\n[ \t]*){2,}")
+
 def procesar_notebook(ruta_notebook):
     """Extrae el contenido de un notebook Jupyter y lo convierte en documentos"""
-    try:
-        with open(ruta_notebook, 'r', encoding='utf-8') as f:
-            notebook = nbformat.read(f, as_version=4)
-
-        contenido = []
-        for i, celda in enumerate(notebook.cells):
-            if celda.cell_type == 'markdown':
-                contenido.append(f"# Markdown (Celda {i})\n{celda.source}")
-            elif celda.cell_type == 'code':
-                contenido.append(f"# Código (Celda {i})\n{celda.source}")
-
-            if hasattr(celda, 'outputs') and celda.outputs:
-                for output in celda.outputs:
-                    if hasattr(output, 'text'):
-                        contenido.append(f"# Output (Celda {i})\n{output.text}")
-
-        contenido_completo = "\n\n".join(contenido)
-        return [Document(page_content=contenido_completo, metadata={"source": ruta_notebook, "type": "notebook"})]
-    except Exception:
-        return []
-
-def cargar_docs_de_directorio(ruta_dir, tipos_archivo=(".pdf", ".txt", ".csv"), tipo_fuente="documento"):
-    """Carga documentos de un directorio específico (recursivo)."""
-    documentos = []
-
+    with open(ruta_notebook, 'r', encoding='utf-8') as f:
+        notebook = nbformat.read(f, as_version=4)
+
+    contenido = []
+    for i, celda in enumerate(notebook.cells):
+        if celda.cell_type == 'markdown':
+            contenido.append(f"# Markdown (Celda {i})\n{celda.source}")
+        elif celda.cell_type == 'code':
+            contenido.append(f"# Código (Celda {i})\n{celda.source}")
+
+        if hasattr(celda, 'outputs') and celda.outputs:
+            for output in celda.outputs:
+                if hasattr(output, 'text'):
+                    contenido.append(f"# Output (Celda {i})\n{output.text}")
+
+    contenido_completo = "\n\n".join(contenido)
+    return [Document(page_content=contenido_completo, metadata={"source": ruta_notebook, "type": "notebook"})]
+
+def listar_archivos(ruta_dir, tipos_archivo=(".pdf", ".txt", ".csv")):
+    """Rutas de los archivos de un directorio (recursivo) con alguna de las extensiones dadas"""
+    found_files = []
     if not os.path.exists(ruta_dir):
-        return documentos
+        return found_files
 
-    found_files = []
     for root, _, files in os.walk(ruta_dir):
         for f in files:
             if f.lower().endswith(tipos_archivo):
                 found_files.append(os.path.join(root, f))
+    return found_files
 
-    for ruta in found_files:
+def cargar_archivo(ruta):
+    """Carga un archivo .pdf, .txt, .csv o .json como lista de documentos"""
+    documentos = []
+    if ruta.lower().endswith(".pdf"):
+        loader = PyPDFLoader(ruta)
+        documentos.extend(loader.load())
+    elif ruta.lower().endswith(".txt"):
+        loader = TextLoader(ruta, encoding='utf-8')
+        documentos.extend(loader.load())
+    elif ruta.lower().endswith(".csv"):
         try:
-            if ruta.lower().endswith(".pdf"):
-                loader = PyPDFLoader(ruta)
-                documentos.extend(loader.load())
-            elif ruta.lower().endswith(".txt"):
-                loader = TextLoader(ruta, encoding='utf-8')
-                documentos.extend(loader.load())
-            elif ruta.lower().endswith(".csv"):
-                try:
-                    with open(ruta, 'r', encoding='utf-8') as f:
-                        contenido_csv = f.read()
-                    nombre_archivo = os.path.basename(ruta)
-                    contenido_con_titulo = f"Archivo: {nombre_archivo}\n\nDatos:\n{contenido_csv}"
+            with open(ruta, 'r', encoding='utf-8') as f:
+                contenido_csv = f.read()
+            nombre_archivo = os.path.basename(ruta)
+            contenido_con_titulo = f"Archivo: {nombre_archivo}\n\nDatos:\n{contenido_csv}"
+            documentos.append(Document(
+                page_content=contenido_con_titulo,
+                metadata={"source": ruta, "type": "csv", "filename": nombre_archivo}
+            ))
+        except UnicodeDecodeError:
+            loader = CSVLoader(ruta)
+            documentos.extend(loader.load())
+    elif ruta.lower().endswith(".json"):
+        with open(ruta, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        nombre_archivo = os.path.basename(ruta)
+        if isinstance(data, list):
+            for item in data:
+                if isinstance(item, dict):
+                    contenido = "\n".join([f"{k}: {v}" for k, v in item.items()])
                     documentos.append(Document(
-                        page_content=contenido_con_titulo,
-                        metadata={"source": ruta, "type": "csv", "filename": nombre_archivo}
+                        page_content=contenido,
+                        metadata={"source": ruta, "type": "json", "filename": nombre_archivo}
                     ))
-                except Exception:
-                    loader = CSVLoader(ruta)
-                    documentos.extend(loader.load())
-            elif ruta.lower().endswith(".json"):
-                try:
-                    with open(ruta, 'r', encoding='utf-8') as f:
-                        data = json.load(f)
-                    nombre_archivo = os.path.basename(ruta)
-                    if isinstance(data, list):
-                        for item in data:
-                            if isinstance(item, dict):
-                                contenido = "\n".join([f"{k}: {v}" for k, v in item.items()])
-                                documentos.append(Document(
-                                    page_content=contenido,
-                                    metadata={"source": ruta, "type": "json", "filename": nombre_archivo}
-                                ))
-                    else:
-                        contenido = json.dumps(data, indent=2, ensure_ascii=False)
-                        documentos.append(Document(
-                            page_content=contenido,
-                            metadata={"source": ruta, "type": "json", "filename": nombre_archivo}
-                        ))
-                except Exception:
-                    pass
-        except Exception:
-            continue
+        else:
+            contenido = json.dumps(data, indent=2, ensure_ascii=False)
+            documentos.append(Document(
+                page_content=contenido,
+                metadata={"source": ruta, "type": "json", "filename": nombre_archivo}
+            ))
 
     return documentos
 
-def cargar_hallazgos_rendimiento(ruta_dir):
-    """Carga los JSONs de rendimiento y genera resúmenes estadísticos"""
-    documentos = []
+def cargar_docs_de_directorio(ruta_dir, tipos_archivo=(".pdf", ".txt", ".csv"), tipo_fuente="documento"):
+    """Carga documentos de un directorio específico (recursivo)."""
+    return cargar_fuentes([(ruta, cargar_archivo) for ruta in listar_archivos(ruta_dir, tipos_archivo)])
 
-    if not os.path.exists(ruta_dir):
+def _hallazgo_clicks(clicks_path):
+    """Resumen de la relación entre clicks en la plataforma y nota final"""
+    documentos = []
+    if not os.path.exists(clicks_path):
         return documentos
 
-    clicks_path = os.path.join(ruta_dir, "clicks_vs_nota.json")
-    if os.path.exists(clicks_path):
-        try:
-            with open(clicks_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+    with open(clicks_path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
 
-            total_estudiantes = len(data)
-            clicks = [d['sum_click'] for d in data]
-            notas = [d['final_score'] for d in data]
-            avg_clicks = sum(clicks) / len(clicks)
-            avg_nota = sum(notas) / len(notas)
+    total_estudiantes = len(data)
+    clicks = [d['sum_click'] for d in data]
+    notas = [d['final_score'] for d in data]
+    avg_clicks = sum(clicks) / len(clicks)
+    avg_nota = sum(notas) / len(notas)
 
-            alto_clicks = [d for d in data if d['sum_click'] > avg_clicks]
-            bajo_clicks = [d for d in data if d['sum_click'] <= avg_clicks]
-            nota_alto = sum(d['final_score'] for d in alto_clicks) / len(alto_clicks) if alto_clicks else 0
-            nota_bajo = sum(d['final_score'] for d in bajo_clicks) / len(bajo_clicks) if bajo_clicks else 0
+    alto_clicks = [d for d in data if d['sum_click'] > avg_clicks]
+    bajo_clicks = [d for d in data if d['sum_click'] <= avg_clicks]
+    nota_alto = sum(d['final_score'] for d in alto_clicks) / len(alto_clicks) if alto_clicks else 0
+    nota_bajo = sum(d['final_score'] for d in bajo_clicks) / len(bajo_clicks) if bajo_clicks else 0
 
-            resumen = f"""HALLAZGO: Relacion entre Clicks y Nota Final
+    resumen = f"""HALLAZGO: Relacion entre Clicks y Nota Final
 
 Analisis de {total_estudiantes} estudiantes sobre la correlacion entre actividad en plataforma (clicks) y rendimiento academico.
 
@@ -147,23 +157,26 @@ HALLAZGO PRINCIPAL:
 
 CONCLUSION: {"Existe correlacion positiva entre actividad en plataforma y rendimiento" if nota_alto > nota_bajo else "No se observa correlacion clara"}
 """
-            documentos.append(Document(page_content=resumen, metadata={"source": clicks_path, "type": "hallazgo_rendimiento"}))
-        except Exception:
-            pass
+    documentos.append(Document(page_content=resumen, metadata={"source": clicks_path, "type": "hallazgo_rendimiento"}))
 
-    eval_path = os.path.join(ruta_dir, "evaluaciones_vs_nota.json")
-    if os.path.exists(eval_path):
-        try:
-            with open(eval_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+    return documentos
+
+def _hallazgo_evaluaciones(eval_path):
+    """Resumen de la relación entre evaluaciones completadas y nota final"""
+    documentos = []
+    if not os.path.exists(eval_path):
+        return documentos
 
-            total_estudiantes = len(data)
-            evaluaciones = [d.get('sum_evaluaciones', d.get('evaluaciones', 0)) for d in data]
-            notas = [d['final_score'] for d in data]
-            avg_eval = sum(evaluaciones) / len(evaluaciones) if evaluaciones else 0
-            avg_nota = sum(notas) / len(notas)
+    with open(eval_path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
 
-            resumen = f"""HALLAZGO: Relacion entre Evaluaciones Completadas y Nota Final
+    total_estudiantes = len(data)
+    evaluaciones = [d.get('sum_evaluaciones', d.get('evaluaciones', 0)) for d in data]
+    notas = [d['final_score'] for d in data]
+    avg_eval = sum(evaluaciones) / len(evaluaciones) if evaluaciones else 0
+    avg_nota = sum(notas) / len(notas)
+
+    resumen = f"""HALLAZGO: Relacion entre Evaluaciones Completadas y Nota Final
 
 Analisis de {total_estudiantes} estudiantes sobre la correlacion entre evaluaciones realizadas y rendimiento academico.
 
@@ -174,24 +187,27 @@ ESTADISTICAS:
 
 CONCLUSION: Mayor participacion en evaluaciones se asocia con mejor rendimiento academico.
 """
-            documentos.append(Document(page_content=resumen, metadata={"source": eval_path, "type": "hallazgo_rendimiento"}))
-        except Exception:
-            pass
+    documentos.append(Document(page_content=resumen, metadata={"source": eval_path, "type": "hallazgo_rendimiento"}))
 
-    materia_path = os.path.join(ruta_dir, "rendimiento_por_materia.json")
-    if os.path.exists(materia_path):
-        try:
-            with open(materia_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+    return documentos
+
+def _hallazgo_materias(materia_path):
+    """Resumen del rendimiento promedio por materia"""
+    documentos = []
+    if not os.path.exists(materia_path):
+        return documentos
+
+    with open(materia_path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
 
-            if isinstance(data, list):
-                materias_info = "\n".join([f"- {item.get('code_module', 'N/A')}: promedio {item.get('avg_score', item.get('promedio', 'N/A'))}" for item in data[:20]])
-                total = len(data)
-            else:
-                materias_info = json.dumps(data, indent=2, ensure_ascii=False)[:1000]
-                total = 1
+    if isinstance(data, list):
+        materias_info = "\n".join([f"- {item.get('code_module', 'N/A')}: promedio {item.get('avg_score', item.get('promedio', 'N/A'))}" for item in data[:20]])
+        total = len(data)
+    else:
+        materias_info = json.dumps(data, indent=2, ensure_ascii=False)[:1000]
+        total = 1
 
-            resumen = f"""HALLAZGO: Rendimiento Academico por Materia
+    resumen = f"""HALLAZGO: Rendimiento Academico por Materia
 
 Analisis del rendimiento promedio de estudiantes por modulo/materia.
 
@@ -200,118 +216,406 @@ MATERIAS ANALIZADAS ({total}):
 
 Este analisis permite identificar materias con mayor y menor rendimiento para enfocar esfuerzos de mejora.
 """
-            documentos.append(Document(page_content=resumen, metadata={"source": materia_path, "type": "hallazgo_rendimiento"}))
-        except Exception:
-            pass
+    documentos.append(Document(page_content=resumen, metadata={"source": materia_path, "type": "hallazgo_rendimiento"}))
 
     return documentos
 
-def cargar_docs():
-    """Carga TODOS los documentos importantes del proyecto"""
-    all_documents = []
+# Archivo de output/ -> función que arma su documento de hallazgos
+HALLAZGOS_RENDIMIENTO = {
+    "clicks_vs_nota.json": _hallazgo_clicks,
+    "evaluaciones_vs_nota.json": _hallazgo_evaluaciones,
+    "rendimiento_por_materia.json": _hallazgo_materias
+}
 
-    all_documents.extend(cargar_docs_de_directorio(DOCUMENTS_PATH, tipos_archivo=(".pdf", ".txt"), tipo_fuente="documentos"))
+def cargar_hallazgos_rendimiento(ruta_dir):
+    """Carga los JSONs de rendimiento y genera resúmenes estadísticos"""
+    if not os.path.exists(ruta_dir):
+        return []
+
+    return cargar_fuentes([(os.path.join(ruta_dir, archivo), cargador) for archivo, cargador in HALLAZGOS_RENDIMIENTO.items()])
+
+def _doc_estadisticas(ruta_csv):
+    """CSV de estadísticas de Ecuador completo, con su nombre como título"""
+    archivo = os.path.basename(ruta_csv)
+    with open(ruta_csv, 'r', encoding='utf-8') as f:
+        contenido = f.read()
+    return [Document(
+        page_content=f"ESTADISTICAS ECUADOR 2022 - {archivo}\n\n{contenido}",
+        metadata={"source": ruta_csv, "type": "estadisticas_ecuador", "filename": archivo}
+    )]
+
+def _doc_dataset(ruta_csv):
+    """Resumen (columnas, ejemplos y estadísticas) de un CSV principal de OULAD"""
+    import pandas as pd
+    csv_name = os.path.basename(ruta_csv)
+    df = pd.read_csv(ruta_csv, nrows=100)
+
+    resumen = f"DATASET: {csv_name}\n\n"
+    resumen += f"Columnas: {', '.join(df.columns.tolist())}\n\n"
+    resumen += f"Primeras filas de ejemplo:\n{df.head(10).to_string()}\n\n"
+    resumen += f"Estadísticas descriptivas:\n{df.describe().to_string()}\n"
+
+    return [Document(
+        page_content=resumen,
+        metadata={"source": ruta_csv, "type": "dataset", "filename": csv_name}
+    )]
+
+def _doc_uci(uci_path):
+    """Resumen del dataset UCI de deserción universitaria"""
+    import pandas as pd
+    df = pd.read_csv(uci_path, nrows=50)
+    resumen = f"DATASET UCI - Datos de desercion universitaria\n\n"
+    resumen += f"Columnas: {', '.join(df.columns.tolist())}\n\n"
+    resumen += f"Primeras filas:\n{df.head(10).to_string()}\n\n"
+    resumen += f"Estadísticas:\n{df.describe().to_string()}\n"
+
+    return [Document(
+        page_content=resumen,
+        metadata={"source": uci_path, "type": "dataset_uci", "filename": "dataset_uci.csv"}
+    )]
+
+def fuentes_ingesta():
+    """
+    Todos los archivos que alimentan la base de conocimiento
+
+    Returns:
+        lista de (ruta, cargador) donde cargador(ruta) devuelve los documentos del archivo
+    """
+    fuentes = [(ruta, cargar_archivo) for ruta in listar_archivos(DOCUMENTS_PATH, (".pdf", ".txt"))]
 
     if os.path.exists(DATA_ANALYSIS_PATH):
-        for archivo in os.listdir(DATA_ANALYSIS_PATH):
+        for archivo in sorted(os.listdir(DATA_ANALYSIS_PATH)):
             if archivo.lower().endswith(".ipynb"):
-                ruta_notebook = os.path.join(DATA_ANALYSIS_PATH, archivo)
-                all_documents.extend(procesar_notebook(ruta_notebook))
+                fuentes.append((os.path.join(DATA_ANALYSIS_PATH, archivo), procesar_notebook))
 
-    if os.path.exists(KNOWLEDGE_SOURCES_PATH):
-        all_documents.extend(cargar_docs_de_directorio(KNOWLEDGE_SOURCES_PATH, tipos_archivo=(".txt", ".json", ".pdf"), tipo_fuente="knowledge"))
+    fuentes.extend((ruta, cargar_archivo) for ruta in listar_archivos(KNOWLEDGE_SOURCES_PATH, (".txt", ".json", ".pdf")))
 
-    all_documents.extend(cargar_hallazgos_rendimiento(OUTPUT_RENDIMIENTO_PATH))
+    for archivo, cargador in HALLAZGOS_RENDIMIENTO.items():
+        ruta = os.path.join(OUTPUT_RENDIMIENTO_PATH, archivo)
+        if os.path.exists(ruta):
+            fuentes.append((ruta, cargador))
 
     if os.path.exists(DATA_PROCESSED_PATH):
-        for archivo in os.listdir(DATA_PROCESSED_PATH):
+        for archivo in sorted(os.listdir(DATA_PROCESSED_PATH)):
             if archivo.lower().endswith(".csv"):
-                ruta_csv = os.path.join(DATA_PROCESSED_PATH, archivo)
-                try:
-                    with open(ruta_csv, 'r', encoding='utf-8') as f:
-                        contenido = f.read()
-                    doc = Document(
-                        page_content=f"ESTADISTICAS ECUADOR 2022 - {archivo}\n\n{contenido}",
-                        metadata={"source": ruta_csv, "type": "estadisticas_ecuador", "filename": archivo}
-                    )
-                    all_documents.append(doc)
-                except Exception:
-                    pass
+                fuentes.append((os.path.join(DATA_PROCESSED_PATH, archivo), _doc_estadisticas))
 
     csvs_principales = ["studentInfo.csv", "assessments.csv", "studentAssessment.csv", "vle.csv"]
     for csv_name in csvs_principales:
         ruta_csv = os.path.join(DATA_ROOT_PATH, csv_name)
         if os.path.exists(ruta_csv):
-            try:
-                import pandas as pd
-                df = pd.read_csv(ruta_csv, nrows=100)
-
-                resumen = f"DATASET: {csv_name}\n\n"
-                resumen += f"Columnas: {', '.join(df.columns.tolist())}\n\n"
-                resumen += f"Primeras filas de ejemplo:\n{df.head(10).to_string()}\n\n"
-                resumen += f"Estadísticas descriptivas:\n{df.describe().to_string()}\n"
-
-                doc = Document(
-                    page_content=resumen,
-                    metadata={"source": ruta_csv, "type": "dataset", "filename": csv_name}
-                )
-                all_documents.append(doc)
-            except Exception:
-                pass
+            fuentes.append((ruta_csv, _doc_dataset))
 
     uci_path = os.path.join(DATA_RAW_PATH, "dataset_uci.csv")
     if os.path.exists(uci_path):
-        try:
-            import pandas as pd
-            df = pd.read_csv(uci_path, nrows=50)
-            resumen = f"DATASET UCI - Datos de desercion universitaria\n\n"
-            resumen += f"Columnas: {', '.join(df.columns.tolist())}\n\n"
-            resumen += f"Primeras filas:\n{df.head(10).to_string()}\n\n"
-            resumen += f"Estadísticas:\n{df.describe().to_string()}\n"
-
-            doc = Document(
-                page_content=resumen,
-                metadata={"source": uci_path, "type": "dataset_uci", "filename": "dataset_uci.csv"}
-            )
-            all_documents.append(doc)
-        except Exception:
-            pass
-
-    all_chunks = text_splitter.split_documents(all_documents)
-    return all_chunks
-
-def guardar_en_chroma(chunks):
-    """Guarda los chunks en ChromaDB"""
-    chunks_validos = []
-    for chunk in chunks:
-        if len(chunk.page_content) > MAX_CHUNK_LENGTH:
-            chunk.page_content = chunk.page_content[:MAX_CHUNK_LENGTH]
-        if len(chunk.page_content.strip()) > 0:
-            chunks_validos.append(chunk)
+        fuentes.append((uci_path, _doc_uci))
 
-    embeddings = OllamaEmbeddings(model="nomic-embed-text")
+    return fuentes
 
-    batch_size = 200
-    for i in range(0, len(chunks_validos), batch_size):
-        batch = chunks_validos[i:i+batch_size]
+def procesos_carga():
+    """Procesos para cargar archivos en paralelo (RAG_INGESTA_PROCESOS, por defecto uno por núcleo)"""
+    return max(1, int(os.getenv("RAG_INGESTA_PROCESOS", "0")) or os.cpu_count() or 1)
 
-        if i == 0:
-            vectorstore = Chroma.from_documents(
-                documents=batch,
-                embedding=embeddings,
-                persist_directory=CHROMA_PATH
-            )
-        else:
-            vectorstore = Chroma(
-                persist_directory=CHROMA_PATH,
-                embedding_function=embeddings
-            )
-            vectorstore.add_documents(batch)
+def cargar_fuente(ruta, cargador):
+    """
+    Carga un archivo midiendo el tiempo; los errores se devuelven en lugar de lanzarse
+
+    Returns:
+        dict con ruta, documentos, segundos y error (None si cargó bien)
+    """
+    inicio = time.perf_counter()
+    try:
+        documentos, error = cargador(ruta), None
+    except Exception as e:
+        documentos, error = [], f"{type(e).__name__}: {e}"
+    return {"ruta": ruta, "documentos": documentos, "segundos": time.perf_counter() - inicio, "error": error}
+
+def cargar_en_paralelo(fuentes, procesos=None):
+    """
+    Carga los archivos en un pool de procesos (la extracción de texto de PDFs usa CPU).
+    Los resultados salen en el mismo orden que `fuentes`, y solo se adelantan unos pocos
+    archivos por proceso para no tener todo el corpus en memoria.
+
+    Args:
+        fuentes: lista de (ruta, cargador)
+        procesos: Cantidad de procesos (por defecto procesos_carga())
+
+    Yields:
+        el resultado de cargar_fuente de cada archivo
+    """
+    fuentes = list(fuentes)
+    procesos = min(procesos or procesos_carga(), len(fuentes))
+    if procesos <= 1:
+        for ruta, cargador in fuentes:
+            yield cargar_fuente(ruta, cargador)
+        return
+
+    with ProcessPoolExecutor(max_workers=procesos) as executor:
+        restantes = iter(fuentes)
+        pendientes = deque(executor.submit(cargar_fuente, ruta, cargador) for ruta, cargador in islice(restantes, 2 * procesos))
+        while pendientes:
+            resultado = pendientes.popleft().result()
+            siguiente = next(restantes, None)
+            if siguiente:
+                pendientes.append(executor.submit(cargar_fuente, *siguiente))
+            yield resultado
+
+def informar_carga(resultado):
+    """Imprime el tiempo de carga de un archivo o su error"""
+    if resultado["error"]:
+        print(f"   Error cargando {resultado['ruta']}: {resultado['error']}")
+    else:
+        print(f"   {resultado['ruta']}: {len(resultado['documentos'])} documentos en {resultado['segundos']:.2f} s")
+
+def cargar_fuentes(fuentes, procesos=None):
+    """Documentos de todas las fuentes, en orden, informando tiempos y errores por archivo"""
+    documentos = []
+    for resultado in cargar_en_paralelo(fuentes, procesos):
+        informar_carga(resultado)
+        documentos.extend(resultado["documentos"])
+    return documentos
 
-    print(f"Base de datos guardada en {CHROMA_PATH}")
+def limpiar_documentos(documentos):
+    """Quita caracteres nulos y colapsa las líneas en blanco repetidas (texto extraído de PDFs)"""
+    for documento in documentos:
+        documento.page_content = _LINEAS_EN_BLANCO.sub("\n\n", documento.page_content.replace("\x00", ""))
+        yield documento
+
+def dividir_documentos(documentos):
+    """Divide documento por documento; genera (número de documento en el archivo, chunk)"""
+    for n_doc, documento in enumerate(documentos):
+        for chunk in text_splitter.split_documents([documento]):
+            yield n_doc, chunk
+
+def filtrar_chunks(chunks):
+    """Recorta los chunks demasiado largos y descarta los vacíos"""
+    for n_doc, chunk in chunks:
+        if len(chunk.page_content) > MAX_CHUNK_LENGTH:
+            chunk.page_content = chunk.page_content[:MAX_CHUNK_LENGTH]
+        if len(chunk.page_content.strip()) > 0:
+            yield n_doc, chunk
+
+def cargar_docs(procesos=None):
+    """
+    Chunks de TODOS los documentos importantes del proyecto, generados archivo por
+    archivo (carga -> limpieza -> división -> filtro) sin acumular el corpus
+
+    Yields:
+        chunks (Document)
+    """
+    for resultado in cargar_en_paralelo(fuentes_ingesta(), procesos):
+        informar_carga(resultado)
+        for _, chunk in filtrar_chunks(dividir_documentos(limpiar_documentos(resultado.pop("documentos")))):
+            yield chunk
+
+def dividir_fuente(ruta, hash_contenido, documentos):
+    """
+    Limpia, divide y filtra los documentos de un archivo, con ids deterministas
+
+    Yields:
+        (id, chunk)
+    """
+    vistos = set()
+    for n_doc, chunk in filtrar_chunks(dividir_documentos(limpiar_documentos(documentos))):
+        chunk_id = id_chunk(ruta, hash_contenido, n_doc, chunk.metadata.get("start_index", len(vistos)))
+        if chunk_id in vistos:
+            continue
+        vistos.add(chunk_id)
+        yield chunk_id, chunk
+
+def _eliminar_chunks(collection, ids):
+    """Borra chunks por id y los descuenta del catálogo"""
+    if not ids:
+        return 0
+    data = collection.get(ids=list(ids), include=['metadatas'])
+    encontrados = data.get('ids', []) or []
+    if encontrados:
+        collection.delete(ids=encontrados)
+        registrar_chunks(CHROMA_PATH, data.get('metadatas', []) or [], signo=-1, publicar=False)
+    return len(encontrados)
+
+def _faltan_chunks(collection, ids):
+    """True si algún chunk registrado en el manifiesto ya no está en la colección (p. ej. tras limpiarla)"""
+    if not ids:
+        return False
+    encontrados = collection.get(ids=list(ids), include=[]).get('ids') or []
+    return len(set(encontrados)) < len(set(ids))
+
+def _eliminar_fuentes_sin_manifiesto(collection, rutas):
+    """
+    Colección ingerida antes del manifiesto (ids aleatorios): borra los chunks cuyo
+    source es uno de los archivos de la ingesta, para no duplicarlos al reingerirlos.
+    Los chunks de otras fuentes (p. ej. ingest_scraped_data) se conservan.
+    """
+    data = collection.get(include=['metadatas'])
+    ids = [
+        chunk_id for chunk_id, meta in zip(data.get('ids', []) or [], data.get('metadatas', []) or [])
+        if (meta or {}).get('source') in rutas
+    ]
+    return _eliminar_chunks(collection, ids)
+
+def ingestar(completo=False, procesos=None):
+    """
+    Ingesta incremental: solo carga, divide y embebe los archivos nuevos o modificados
+    (según el hash de su contenido), borra los chunks de los archivos modificados o
+    eliminados y hace upsert de los nuevos con ids deterministas.
+
+    Los chunks fluyen por generadores (carga -> limpieza -> división -> filtro -> embedding
+    -> escritura) con lotes acotados en cada etapa: unos pocos archivos cargados por
+    proceso y unos pocos lotes embebiéndose, así que la memoria no crece con el corpus.
+
+    Args:
+        completo: Reingestar todos los archivos aunque no hayan cambiado
+        procesos: Procesos para cargar los archivos (por defecto RAG_INGESTA_PROCESOS o uno por núcleo)
+
+    Returns:
+        dict con archivos nuevos, modificados, eliminados, sin cambios, restaurados (sin cambios pero
+        con chunks faltantes en la colección) y con errores, chunks agregados y
+        eliminados, y las estadísticas de escritura (chunks/s, reintentos)
+    """
+    # Proveedor de embeddings configurado (RAG_EMBEDDINGS)
+    embeddings = crear_embeddings()
+    # ChromaDB o el store NumPy, según RAG_VECTORSTORE
+    vectorstore = abrir_vectorstore(CHROMA_PATH, embeddings)
+    collection = vectorstore._collection
+    # No mezclar vectores de otro modelo en la misma colección
+    asegurar_embeddings(CHROMA_PATH, embeddings, coleccion_vacia=collection.count() == 0)
+
+    resumen = {"nuevos": 0, "modificados": 0, "eliminados": 0, "sin_cambios": 0, "restaurados": 0, "errores": 0,
+               "chunks_agregados": 0, "chunks_eliminados": 0}
+    fuentes = fuentes_ingesta()
+    rutas = {ruta for ruta, _ in fuentes}
+
+    # Con otro chunking u otro modelo de embeddings ningún chunk anterior sirve
+    configuracion = {
+        "chunk_size": CHUNK_SIZE,
+        "chunk_overlap": CHUNK_OVERLAP,
+        "max_chunk": MAX_CHUNK_LENGTH,
+        "limpieza": _LINEAS_EN_BLANCO.pattern,
+        "embeddings": embeddings.nombre
+    }
+    manifiesto = leer_manifiesto(CHROMA_PATH)
+    # En el store NumPy, ids y metadata se guardan una vez al cerrar cada bloque y no por lote
+    with escritura_diferida(collection):
+        if not manifiesto["archivos"]:
+            resumen["chunks_eliminados"] += _eliminar_fuentes_sin_manifiesto(collection, rutas)
+        elif completo or manifiesto["configuracion"] != configuracion:
+            anteriores = [i for entrada in manifiesto["archivos"].values() for i in entrada["ids"]]
+            resumen["chunks_eliminados"] += _eliminar_chunks(collection, anteriores)
+            manifiesto["archivos"] = {}
+        manifiesto["configuracion"] = configuracion
+
+        # Archivos que ya no existen
+        for ruta in [r for r in manifiesto["archivos"] if r not in rutas]:
+            entrada = manifiesto["archivos"].pop(ruta)
+            resumen["chunks_eliminados"] += _eliminar_chunks(collection, entrada["ids"])
+            resumen["eliminados"] += 1
+    guardar_manifiesto(CHROMA_PATH, manifiesto)
+
+    # Archivos en curso: chunks que faltan escribir y datos para cerrarlos en el manifiesto
+    en_curso = {}
+    ruta_de_id = {}
+
+    def finalizar(ruta):
+        archivo = en_curso.pop(ruta)
+        entrada, ids = archivo["anterior"], archivo["ids"]
+        # Los chunks de la versión anterior se borran después de escribir los nuevos
+        if entrada:
+            nuevos = set(ids)
+            resumen["chunks_eliminados"] += _eliminar_chunks(collection, [i for i in entrada["ids"] if i not in nuevos])
+            resumen["restaurados" if archivo["restaurar"] else "modificados"] += 1
+        else:
+            resumen["nuevos"] += 1
+        resumen["chunks_agregados"] += len(ids)
+        manifiesto["archivos"][ruta] = {"hash": archivo["hash"], "mtime_ns": archivo["mtime_ns"],
+                                        "tamano": archivo["tamano"], "ids": ids}
+        guardar_manifiesto(CHROMA_PATH, manifiesto)
+
+    def chunks_pendientes():
+        """Carga y divide los archivos nuevos o modificados a medida que el escritor pide más chunks"""
+        cambiados = {}
+        for ruta, cargador in fuentes:
+            entrada = manifiesto["archivos"].get(ruta)
+            try:
+                hash_contenido, mtime_ns, tamano = hash_vigente(ruta, entrada)
+            except OSError:
+                continue
+            # Un archivo sin cambios se saltea solo si sus chunks siguen en la colección
+            restaurar = False
+            if entrada and entrada["hash"] == hash_contenido:
+                if not _faltan_chunks(collection, entrada["ids"]):
+                    entrada.update({"mtime_ns": mtime_ns, "tamano": tamano})
+                    resumen["sin_cambios"] += 1
+                    continue
+                restaurar = True
+            cambiados[ruta] = {"cargador": cargador, "anterior": entrada, "hash": hash_contenido,
+                               "mtime_ns": mtime_ns, "tamano": tamano, "restaurar": restaurar}
+
+        for resultado in cargar_en_paralelo([(ruta, c["cargador"]) for ruta, c in cambiados.items()], procesos):
+            informar_carga(resultado)
+            ruta = resultado["ruta"]
+            archivo = cambiados.pop(ruta)
+            # Un archivo que no cargó conserva sus chunks y su entrada anterior; se reintenta en la próxima ingesta
+            if resultado["error"]:
+                resumen["errores"] += 1
+                continue
+
+            en_curso[ruta] = {"anterior": archivo["anterior"], "hash": archivo["hash"], "mtime_ns": archivo["mtime_ns"],
+                              "tamano": archivo["tamano"], "restaurar": archivo["restaurar"],
+                              "ids": [], "restantes": 0, "dividido": False}
+            for chunk_id, chunk in dividir_fuente(ruta, archivo["hash"], resultado.pop("documentos")):
+                en_curso[ruta]["ids"].append(chunk_id)
+                en_curso[ruta]["restantes"] += 1
+                ruta_de_id[chunk_id] = ruta
+                yield chunk_id, chunk.page_content, chunk.metadata
+            # Si el escritor ya guardó todos sus chunks (o no tenía ninguno), el archivo se cierra acá
+            en_curso[ruta]["dividido"] = True
+            if en_curso[ruta]["restantes"] == 0:
+                finalizar(ruta)
+
+    def al_escribir(ids, metadatas):
+        for chunk_id in ids:
+            ruta = ruta_de_id.pop(chunk_id)
+            en_curso[ruta]["restantes"] -= 1
+            if en_curso[ruta]["restantes"] == 0 and en_curso[ruta]["dividido"]:
+                finalizar(ruta)
+
+    # Los lotes se embeben en paralelo mientras este hilo escribe los que ya terminaron
+    # Mantener al día los conteos por fuente que sirve /api/rag/stats (solo ids nuevos);
+    # la versión no cambia hasta terminar
+    escribir = escritor_de_coleccion(
+        collection, al_insertar=lambda metadatas: registrar_chunks(CHROMA_PATH, metadatas, publicar=False)
+    )
+    escritor = EscritorEmbeddings(embeddings, escribir)
+    with escritura_diferida(collection):
+        resumen["escritura"] = escritor.ejecutar(chunks_pendientes(), al_escribir=al_escribir)
+
+    guardar_manifiesto(CHROMA_PATH, manifiesto)
+
+    # Índice BM25 para la recuperación híbrida, sobre los mismos chunks, guardado ya con la
+    # versión nueva; recién después se publica y la API, los insights y BM25 se invalidan una vez
+    if resumen["chunks_agregados"] or resumen["chunks_eliminados"]:
+        version = version_catalogo(CHROMA_PATH) + 1
+        construir_bm25_desde_coleccion(collection, CHROMA_PATH, version)
+        publicar_version(CHROMA_PATH, version)
+
+    return resumen
 
 if __name__ == "__main__":
-    chunks = cargar_docs()
-    print(f"Total de chunks: {len(chunks)}")
-    guardar_en_chroma(chunks)
+    parser = argparse.ArgumentParser(description="Ingesta incremental de la base de conocimiento")
+    parser.add_argument("--completo", action="store_true", help="Reingestar todos los archivos aunque no hayan cambiado")
+    parser.add_argument("--procesos", type=int, default=None, help="Procesos para cargar archivos (por defecto RAG_INGESTA_PROCESOS o uno por núcleo)")
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    resumen = ingestar(completo=args.completo, procesos=args.procesos)
+    print(f"Archivos: {resumen['nuevos']} nuevos, {resumen['modificados']} modificados, "
+          f"{resumen['eliminados']} eliminados, {resumen['sin_cambios']} sin cambios, {resumen['restaurados']} restaurados, "
+          f"{resumen['errores']} con errores")
+    print(f"Chunks: {resumen['chunks_agregados']} agregados, {resumen['chunks_eliminados']} eliminados")
+    escritura = resumen["escritura"]
+    if escritura["chunks"]:
+        print(f"Embedding y escritura: {escritura['chunks']} chunks en {escritura['lotes']} lotes, "
+              f"{escritura['chunks_por_segundo']} chunks/s, {escritura['reintentos']} reintentos")
+    print(f"Base de datos guardada en {CHROMA_PATH} ({time.perf_counter() - inicio:.1f} s)")
     print("Proceso completado.")
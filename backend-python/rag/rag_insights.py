@@ -0,0 +1,129 @@
+'''
+Insights precalculados del RAG
+Un hilo en segundo plano genera los insights cuando cambia la versión de la colección
+(es decir, tras cada ingesta) y los guarda por modelo; /api/rag/insights los sirve
+desde ese almacén sin esperar la llamada a Groq.
+'''
+import json
+import os
+import threading
+from datetime import datetime
+
+from rag_query import CHROMA_PATH, generar_insights, version_coleccion
+
+INSIGHTS_PATH = os.path.join(os.path.dirname(CHROMA_PATH), "insights.json")
+
+class AlmacenInsights:
+    """Insights por (versión de la colección, modelo), en memoria y respaldados en disco"""
+
+    def __init__(self, ruta=INSIGHTS_PATH):
+        self.ruta = ruta
+        self._lock = threading.Lock()
+        self._datos = {"version": None, "modelos": {}}
+        try:
+            with open(ruta, 'r', encoding='utf-8') as f:
+                self._datos = json.load(f)
+        except (OSError, ValueError):
+            pass
+
+    def obtener(self, modelo, version):
+        with self._lock:
+            if self._datos.get("version") != version:
+                return None
+            return self._datos["modelos"].get(modelo)
+
+    def guardar(self, modelo, version, resultado):
+        with self._lock:
+            if self._datos.get("version") != version:
+                # Nueva versión de la colección: los insights anteriores quedan obsoletos
+                self._datos = {"version": version, "modelos": {}}
+            self._datos["modelos"][modelo] = {
+                **resultado,
+                "generado": datetime.now().isoformat(),
+                "version_coleccion": version
+            }
+            try:
+                os.makedirs(os.path.dirname(self.ruta) or '.', exist_ok=True)
+                tmp = f"{self.ruta}.{os.getpid()}.tmp"
+                with open(tmp, 'w', encoding='utf-8') as f:
+                    json.dump(self._datos, f, ensure_ascii=False, indent=2)
+                os.replace(tmp, self.ruta)
+            except OSError:
+                pass
+
+almacen_insights = AlmacenInsights()
+
+def insights_precalculados(modelo="llama3", almacen=almacen_insights):
+    """Insights ya guardados para la versión actual de la colección, o None (no llama al LLM)"""
+    guardado = almacen.obtener(modelo, version_coleccion())
+    return {**guardado, "precalculado": True} if guardado is not None else None
+
+def obtener_insights(vector, modelo="llama3", refrescar=False, almacen=almacen_insights):
+    """
+    Devuelve los insights precalculados para la versión actual de la colección.
+    Si no existen (o refrescar=True) los genera en el momento y los guarda.
+    """
+    if not refrescar:
+        guardado = insights_precalculados(modelo, almacen)
+        if guardado is not None:
+            return guardado
+
+    version = version_coleccion()
+    resultado = generar_insights(vector, modelo)
+    if resultado.get("success"):
+        almacen.guardar(modelo, version, resultado)
+    return {**resultado, "precalculado": False}
+
+class PrecalculadorInsights(threading.Thread):
+    """
+    Hilo que revisa periódicamente la versión de la colección y, si cambió,
+    regenera los insights de los modelos configurados. Una versión nueva solo se
+    usa cuando se mantuvo igual durante un intervalo completo, para no generar
+    insights sobre una colección que todavía se está ingiriendo.
+    """
+
+    def __init__(self, vector, modelos=("llama3",), intervalo=30, almacen=almacen_insights):
+        super().__init__(daemon=True, name="precalculador-insights")
+        self.vector = vector
+        self.modelos = list(modelos)
+        self.intervalo = intervalo
+        self.almacen = almacen
+        self._detener = threading.Event()
+        self._version_vista = None
+
+    def precalcular(self, exigir_estable=False):
+        version = version_coleccion()
+        anterior, self._version_vista = self._version_vista, version
+        if exigir_estable and version != anterior:
+            return
+        for modelo in self.modelos:
+            if self.almacen.obtener(modelo, version) is not None:
+                continue
+            try:
+                resultado = generar_insights(self.vector, modelo)
+            except Exception:
+                continue
+            if resultado.get("success"):
+                self.almacen.guardar(modelo, version, resultado)
+
+    def run(self):
+        # Al arrancar se precalcula de inmediato; después, solo con versiones estables
+        exigir_estable = False
+        while not self._detener.is_set():
+            self.precalcular(exigir_estable=exigir_estable)
+            exigir_estable = True
+            self._detener.wait(self.intervalo)
+
+    def detener(self):
+        self._detener.set()
+
+def iniciar_precalculo(vector):
+    """Arranca el hilo de precálculo con los modelos de RAG_INSIGHTS_MODELOS (por defecto llama3)"""
+    modelos = [m.strip() for m in os.getenv("RAG_INSIGHTS_MODELOS", "llama3").split(",") if m.strip()]
+    hilo = PrecalculadorInsights(
+        vector,
+        modelos=modelos,
+        intervalo=float(os.getenv("RAG_INSIGHTS_INTERVALO", "30"))
+    )
+    hilo.start()
+    return hilo
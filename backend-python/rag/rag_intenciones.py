@@ -0,0 +1,122 @@
+'''
+Router de intenciones para preguntas de estadísticas
+Reglas declarativas compiladas en una sola expresión regular: la pregunta
+(sin acentos) se recorre una vez y se obtiene la intención y sus slots.
+Las preguntas que el router resuelve se responden desde las tablas en memoria,
+sin embeddings, sin ChromaDB y sin Groq.
+'''
+import json
+import os
+import re
+import unicodedata
+
+# Conceptos: nombre -> patrones (regex sobre texto en minúsculas y sin acentos)
+CONCEPTOS = {
+    "tasa": [r"tasas?", r"porcentajes?"],
+    "desercion": [r"desercion(es)?", r"desert\w*", r"abandon\w*"],
+    "cantidad": [r"cuant[oa]s?", r"numero", r"total(es)?"],
+    "sexo": [r"sexos?", r"mujer(es)?", r"hombres?", r"generos?"],
+    "institucion": [
+        r"institucion(es)?", r"tipo de (universidad|financiamiento)\w*", r"financiamiento",
+        r"public[ao]s?", r"particular(es)?", r"cofinanciad[ao]s?", r"autofinanciad[ao]s?"
+    ],
+    "ecuador": [r"ecuador", r"2022"],
+    "estadistica": [r"estadisticas?", r"matriculad[oa]s?"]
+}
+
+# Slots: nombre -> valor -> patrón
+SLOTS = {
+    "sexo": {"MUJER": r"mujer(es)?", "HOMBRE": r"hombres?"},
+    "tipo_institucion": {
+        "PUBLICA": r"public[ao]s?",
+        "PARTICULAR COFINANCIADA": r"cofinanciad[ao]s?",
+        "PARTICULAR AUTOFINANCIADA": r"autofinanciad[ao]s?"
+    },
+    "anio": {"2022": r"2022"}
+}
+
+# Reglas en orden de prioridad: todos los conceptos de "requiere" y al menos uno de "alguno"
+CONTEXTO_ESTADISTICO = ["tasa", "desercion", "cantidad", "ecuador", "estadistica"]
+REGLAS = [
+    {"intencion": "sexo", "requiere": ["sexo"], "alguno": CONTEXTO_ESTADISTICO},
+    {"intencion": "tipo", "requiere": ["institucion"], "alguno": CONTEXTO_ESTADISTICO},
+    {"intencion": "tasa", "requiere": ["tasa", "desercion"]},
+    {"intencion": "total", "requiere": ["cantidad", "desercion"]},
+    {"intencion": "resumen", "requiere": ["ecuador"]}
+]
+
+def normalizar(texto):
+    texto = unicodedata.normalize('NFKD', str(texto).lower())
+    return ''.join(c for c in texto if not unicodedata.combining(c))
+
+class RouterIntenciones:
+    """
+    Compila conceptos y slots en una única regex con grupos nombrados.
+    enrutar() hace una sola pasada sobre la pregunta y evalúa las reglas en orden.
+    """
+
+    def __init__(self, conceptos=CONCEPTOS, reglas=REGLAS, slots=SLOTS):
+        self.reglas = reglas
+
+        # Cada patrón distinto es un grupo; un mismo patrón puede marcar concepto y slot
+        terminos = {}
+        for concepto, patrones in conceptos.items():
+            for patron in patrones:
+                terminos.setdefault(patron, []).append(("concepto", concepto, None))
+        for slot, valores in slots.items():
+            for valor, patron in valores.items():
+                terminos.setdefault(patron, []).append(("slot", slot, valor))
+
+        self._grupos = {}
+        partes = []
+        for patron, marcas in terminos.items():
+            nombre = f"g{len(self._grupos)}"
+            self._grupos[nombre] = marcas
+            partes.append(f"(?P<{nombre}>\\b(?:{patron})\\b)")
+        self._regex = re.compile("|".join(partes))
+
+    def _analizar(self, pregunta):
+        conceptos = set()
+        slots = {}
+        for m in self._regex.finditer(normalizar(pregunta)):
+            for tipo, clave, dato in self._grupos[m.lastgroup]:
+                if tipo == "concepto":
+                    conceptos.add(clave)
+                else:
+                    slots.setdefault(clave, dato)
+        return conceptos, slots
+
+    def enrutar(self, pregunta):
+        """
+        Returns:
+            lista (en orden de prioridad) de dicts {"intencion", "slots"} que aplican a la pregunta;
+            vacía si no es una pregunta de estadísticas
+        """
+        conceptos, slots = self._analizar(pregunta)
+        intenciones = []
+        for regla in self.reglas:
+            if not all(c in conceptos for c in regla.get("requiere", [])):
+                continue
+            alguno = regla.get("alguno")
+            if alguno and not any(c in conceptos for c in alguno):
+                continue
+            intenciones.append({"intencion": regla["intencion"], "slots": slots})
+        return intenciones
+
+def cargar_router(ruta=None):
+    """
+    Crea el router con las reglas por defecto o, si se indica (o existe RAG_INTENCIONES),
+    con las de un JSON {"conceptos": {...}, "reglas": [...], "slots": {...}}
+    """
+    ruta = ruta or os.getenv("RAG_INTENCIONES")
+    if not ruta:
+        return RouterIntenciones()
+    with open(ruta, 'r', encoding='utf-8') as f:
+        config = json.load(f)
+    return RouterIntenciones(
+        config.get("conceptos", CONCEPTOS),
+        config.get("reglas", REGLAS),
+        config.get("slots", SLOTS)
+    )
+
+router_intenciones = cargar_router()
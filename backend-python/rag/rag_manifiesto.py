@@ -0,0 +1,72 @@
+'''
+Manifiesto de la ingesta incremental
+Guarda junto a ChromaDB, por cada archivo ingerido, el hash de su contenido
+(con mtime y tamaño para no volver a leerlo si no cambió) y los ids de sus chunks,
+más la configuración de chunking y embeddings con la que se generaron.
+'''
+import hashlib
+import json
+import os
+
+MANIFIESTO_ARCHIVO = "ingesta_manifiesto.json"
+
+def ruta_manifiesto(chroma_path):
+    return os.path.join(str(chroma_path), MANIFIESTO_ARCHIVO)
+
+def leer_manifiesto(chroma_path):
+    """
+    Returns:
+        dict con configuracion y archivos (ruta -> hash, mtime_ns, tamano, ids); vacío si no existe
+    """
+    try:
+        with open(ruta_manifiesto(chroma_path), 'r', encoding='utf-8') as f:
+            manifiesto = json.load(f)
+    except (OSError, ValueError):
+        manifiesto = {}
+    manifiesto.setdefault("configuracion", None)
+    manifiesto.setdefault("archivos", {})
+    return manifiesto
+
+def guardar_manifiesto(chroma_path, manifiesto):
+    ruta = ruta_manifiesto(chroma_path)
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    tmp = f"{ruta}.{os.getpid()}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(manifiesto, f, ensure_ascii=False, indent=1)
+    os.replace(tmp, ruta)
+
+def borrar_manifiesto(chroma_path):
+    """Elimina el manifiesto (tras limpiar la colección, para que la próxima ingesta reingiera todo)"""
+    try:
+        os.remove(ruta_manifiesto(chroma_path))
+    except FileNotFoundError:
+        pass
+
+def hash_archivo(ruta, bloque=1 << 20):
+    """SHA-256 del contenido del archivo, leído por bloques"""
+    h = hashlib.sha256()
+    with open(ruta, 'rb') as f:
+        for parte in iter(lambda: f.read(bloque), b''):
+            h.update(parte)
+    return h.hexdigest()
+
+def hash_vigente(ruta, entrada=None):
+    """
+    Hash del archivo; si mtime y tamaño coinciden con la entrada del manifiesto
+    se reutiliza el hash guardado sin leer el archivo
+
+    Returns:
+        (hash, mtime_ns, tamano)
+    """
+    stat = os.stat(ruta)
+    if entrada and entrada.get("mtime_ns") == stat.st_mtime_ns and entrada.get("tamano") == stat.st_size:
+        return entrada["hash"], stat.st_mtime_ns, stat.st_size
+    return hash_archivo(ruta), stat.st_mtime_ns, stat.st_size
+
+def id_chunk(ruta, hash_contenido, documento, offset):
+    """
+    Id determinista de un chunk: fuente (ruta + hash del contenido), documento dentro
+    del archivo (página, item) y offset del chunk en ese documento
+    """
+    fuente = hashlib.sha1(f"{ruta}\0{hash_contenido}".encode('utf-8')).hexdigest()[:16]
+    return f"{fuente}-{documento}-{offset}"
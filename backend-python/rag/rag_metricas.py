@@ -0,0 +1,170 @@
+'''
+Métricas del RAG en formato Prometheus
+Histogramas de latencia por etapa de consultar() y generar_insights(),
+tamaños de prompt/respuesta y contadores, publicados en /metrics.
+'''
+import threading
+import time
+from contextlib import contextmanager
+
+BUCKETS_SEGUNDOS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+BUCKETS_TAMANO = (50, 100, 250, 500, 1000, 2000, 4000, 8000, 16000)
+
+def _etiquetas(etiquetas):
+    if not etiquetas:
+        return ""
+    partes = []
+    for clave, valor in sorted(etiquetas.items()):
+        valor = str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        partes.append(f'{clave}="{valor}"')
+    return "{" + ",".join(partes) + "}"
+
+class Histograma:
+    """Histograma acumulativo con una serie por combinación de etiquetas"""
+
+    def __init__(self, nombre, ayuda, buckets=BUCKETS_SEGUNDOS):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observar(self, valor, **etiquetas):
+        clave = tuple(sorted(etiquetas.items()))
+        with self._lock:
+            serie = self._series.get(clave)
+            if serie is None:
+                serie = self._series[clave] = {"conteos": [0] * len(self.buckets), "suma": 0.0, "total": 0}
+            for i, limite in enumerate(self.buckets):
+                if valor <= limite:
+                    serie["conteos"][i] += 1
+            serie["suma"] += valor
+            serie["total"] += 1
+
+    def exportar(self):
+        lineas = [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} histogram"]
+        with self._lock:
+            for clave, serie in sorted(self._series.items()):
+                etiquetas = dict(clave)
+                for limite, conteo in zip(self.buckets, serie["conteos"]):
+                    lineas.append(f"{self.nombre}_bucket{_etiquetas({**etiquetas, 'le': limite})} {conteo}")
+                lineas.append(f"{self.nombre}_bucket{_etiquetas({**etiquetas, 'le': '+Inf'})} {serie['total']}")
+                lineas.append(f"{self.nombre}_sum{_etiquetas(etiquetas)} {serie['suma']}")
+                lineas.append(f"{self.nombre}_count{_etiquetas(etiquetas)} {serie['total']}")
+        return lineas
+
+class Contador:
+    """Contador monótono con una serie por combinación de etiquetas"""
+
+    def __init__(self, nombre, ayuda):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def incrementar(self, valor=1, **etiquetas):
+        clave = tuple(sorted(etiquetas.items()))
+        with self._lock:
+            self._series[clave] = self._series.get(clave, 0) + valor
+
+    def exportar(self):
+        lineas = [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} counter"]
+        with self._lock:
+            for clave, valor in sorted(self._series.items()):
+                lineas.append(f"{self.nombre}{_etiquetas(dict(clave))} {valor}")
+        return lineas
+
+class Registro:
+    """Agrupa las métricas del proceso y las exporta en formato de texto Prometheus"""
+
+    def __init__(self):
+        self._metricas = []
+        self._medidores = []
+
+    def histograma(self, nombre, ayuda, buckets=BUCKETS_SEGUNDOS):
+        metrica = Histograma(nombre, ayuda, buckets)
+        self._metricas.append(metrica)
+        return metrica
+
+    def contador(self, nombre, ayuda):
+        metrica = Contador(nombre, ayuda)
+        self._metricas.append(metrica)
+        return metrica
+
+    def medidor(self, nombre, ayuda, funcion):
+        """Registra un gauge cuyo valor se lee al exportar (funcion() -> número)"""
+        self._medidores.append((nombre, ayuda, funcion))
+
+    def exportar(self):
+        lineas = []
+        for metrica in self._metricas:
+            lineas.extend(metrica.exportar())
+        for nombre, ayuda, funcion in self._medidores:
+            try:
+                valor = funcion()
+            except Exception:
+                continue
+            lineas.extend([f"# HELP {nombre} {ayuda}", f"# TYPE {nombre} gauge", f"{nombre} {valor}"])
+        return "\n".join(lineas) + "\n"
+
+registro = Registro()
+
+duracion_etapas = registro.histograma(
+    "rag_etapa_duracion_segundos",
+    "Duración de cada etapa de consultar() y generar_insights()"
+)
+caracteres = registro.histograma(
+    "rag_llm_caracteres",
+    "Tamaño en caracteres de prompts y respuestas del LLM",
+    BUCKETS_TAMANO
+)
+tokens = registro.histograma(
+    "rag_llm_tokens",
+    "Tokens de prompt y de respuesta reportados por Groq",
+    BUCKETS_TAMANO
+)
+consultas = registro.contador(
+    "rag_consultas_total",
+    "Consultas atendidas según cómo se resolvieron"
+)
+errores = registro.contador(
+    "rag_errores_total",
+    "Errores por etapa"
+)
+
+@contextmanager
+def medir(etapa, **etiquetas):
+    """Mide la duración del bloque y la registra en el histograma de etapas"""
+    inicio = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        errores.incrementar(etapa=etapa, **etiquetas)
+        raise
+    finally:
+        duracion_etapas.observar(time.perf_counter() - inicio, etapa=etapa, **etiquetas)
+
+def registrar_llm(prompt, respuesta, uso=None, **etiquetas):
+    """Registra el tamaño del prompt y de la respuesta (y los tokens si Groq los reporta)"""
+    caracteres.observar(len(prompt or ''), tipo="prompt", **etiquetas)
+    caracteres.observar(len(respuesta or ''), tipo="respuesta", **etiquetas)
+    if isinstance(uso, dict):
+        if uso.get("input_tokens") is not None:
+            tokens.observar(uso["input_tokens"], tipo="prompt", **etiquetas)
+        if uso.get("output_tokens") is not None:
+            tokens.observar(uso["output_tokens"], tipo="respuesta", **etiquetas)
+
+def registrar_medidores_cache(cache):
+    """Publica los contadores de la cache de respuestas como gauges"""
+    registro.medidor("rag_cache_entradas", "Entradas en la cache de respuestas", lambda: cache.estadisticas()["entradas"])
+    registro.medidor("rag_cache_hits", "Aciertos de la cache de respuestas", lambda: cache.hits)
+    registro.medidor("rag_cache_misses", "Fallos de la cache de respuestas", lambda: cache.misses)
+    registro.medidor("rag_cache_evictions", "Entradas desalojadas de la cache de respuestas", lambda: cache.evictions)
+
+def registrar_medidores_coalescencia(coalescedor, nombre):
+    """Publica las ejecuciones reales y las compartidas de un coalescedor como gauges"""
+    registro.medidor(f"rag_{nombre}_ejecutadas", f"Cálculos de {nombre} ejecutados", lambda: coalescedor.ejecutadas)
+    registro.medidor(f"rag_{nombre}_compartidas", f"Peticiones de {nombre} resueltas con un cálculo en vuelo", lambda: coalescedor.compartidas)
+    registro.medidor(f"rag_{nombre}_en_vuelo", f"Cálculos de {nombre} en curso", coalescedor.en_vuelo)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
@@ -0,0 +1,736 @@
+'''
+Vectorstore compacto en NumPy para corpus chicos
+Alternativa a ChromaDB para unos pocos miles de chunks: los vectores (normalizados)
+van en una matriz contigua float16 o int8 que se abre con memory-map, y los ids,
+la metadata (por columnas) y los textos van en archivos JSON aparte. La búsqueda es
+exacta: top-k por producto punto vectorizado, con la metadata filtrada antes.
+
+ColeccionNumpy imita la parte de la API de colecciones de ChromaDB que usa el RAG
+(count, get, query, add, upsert, delete) y AlmacenNumpy la del Chroma de LangChain
+(_collection, _embedding_function, add_documents, similarity_search), así el resto
+del código no cambia. Se elige con RAG_VECTORSTORE=numpy (por defecto chroma).
+
+Uso (desde backend-python/rag), para pasar una colección ChromaDB existente:
+    python rag_npstore.py --exportar --tipo int8
+'''
+import argparse
+import itertools
+import json
+import os
+import threading
+import uuid
+from contextlib import contextmanager, nullcontext
+
+import numpy as np
+
+from rag_catalogo import version_catalogo
+
+NPSTORE_DIR = "npstore"
+VECTORES_ARCHIVO = "vectores.npy"
+ESCALAS_ARCHIVO = "escalas.npy"
+METADATOS_ARCHIVO = "metadatos.json"
+DOCUMENTOS_ARCHIVO = "documentos.json"
+ARCHIVOS_LEGADO = {"vectores": VECTORES_ARCHIVO, "escalas": ESCALAS_ARCHIVO, "documentos": DOCUMENTOS_ARCHIVO}
+TIPOS = ("float16", "int8")
+FILAS_POR_BLOQUE = 8192
+# Capacidad inicial de la matriz (se duplica al llenarse) y fracción de filas borradas que dispara la compactación
+CAPACIDAD_INICIAL = 1024
+FRACCION_COMPACTAR = 0.25
+# Tope de la copia float32 de una matriz float16 (convertir en cada consulta cuesta más que el producto)
+CACHE_FLOAT32_MB = float(os.getenv("RAG_NPSTORE_CACHE_MB", "64"))
+
+def backend_vectorstore(backend=None):
+    """Backend configurado: argumento o variable RAG_VECTORSTORE (chroma | numpy)"""
+    backend = (backend or os.getenv("RAG_VECTORSTORE", "chroma")).lower()
+    if backend not in ("chroma", "numpy"):
+        raise ValueError(f"Vectorstore desconocido: {backend} (usar chroma o numpy)")
+    return backend
+
+def ruta_npstore(chroma_path):
+    """El store vive dentro del directorio de ChromaDB para compartir catálogo, BM25 y registro de embeddings"""
+    return os.path.join(str(chroma_path), NPSTORE_DIR)
+
+def _normalizar(matriz):
+    matriz = np.asarray(matriz, dtype=np.float32)
+    if matriz.ndim == 1:
+        matriz = matriz.reshape(1, -1)
+    normas = np.linalg.norm(matriz, axis=1, keepdims=True)
+    normas[normas == 0] = 1.0
+    return matriz / normas
+
+def cuantizar(matriz, tipo):
+    """
+    Normaliza las filas y las pasa al tipo de almacenamiento
+
+    Returns:
+        (matriz en float16/int8, escalas por fila o None)
+    """
+    matriz = _normalizar(matriz)
+    if tipo == "float16":
+        return matriz.astype(np.float16), None
+    escalas = np.abs(matriz).max(axis=1) / 127.0
+    escalas[escalas == 0] = 1.0
+    return np.round(matriz / escalas[:, None]).astype(np.int8), escalas.astype(np.float32)
+
+def _escribir_atomico(ruta, escribir):
+    tmp = f"{ruta}.{os.getpid()}.tmp"
+    escribir(tmp)
+    os.replace(tmp, ruta)
+
+def _guardar_json(ruta, datos):
+    def escribir(tmp):
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(datos, f, ensure_ascii=False)
+    _escribir_atomico(ruta, escribir)
+
+def _guardar_npy(ruta, arreglo):
+    def escribir(tmp):
+        with open(tmp, 'wb') as f:
+            np.save(f, arreglo)
+    _escribir_atomico(ruta, escribir)
+
+def _cumple(valor, condicion):
+    if not isinstance(condicion, dict):
+        return valor == condicion
+    for operador, esperado in condicion.items():
+        if operador == "$eq" and not valor == esperado:
+            return False
+        if operador == "$ne" and not valor != esperado:
+            return False
+        if operador == "$in" and valor not in esperado:
+            return False
+        if operador == "$nin" and valor in esperado:
+            return False
+        if operador in ("$gt", "$gte", "$lt", "$lte"):
+            if valor is None:
+                return False
+            if operador == "$gt" and not valor > esperado:
+                return False
+            if operador == "$gte" and not valor >= esperado:
+                return False
+            if operador == "$lt" and not valor < esperado:
+                return False
+            if operador == "$lte" and not valor <= esperado:
+                return False
+    return True
+
+class ColeccionNumpy:
+    """
+    Colección de chunks sobre una matriz memory-mapped, con la API de ChromaDB que usa el RAG.
+
+    Escritura: los vectores nuevos se agregan al final de una matriz preasignada (que
+    duplica su capacidad al llenarse) y los textos al final de un JSON Lines; un
+    upsert o delete solo marca las filas viejas como borradas. Los ids y la metadata
+    (metadatos.json) se guardan al final de cada escritura o, dentro de `escritura()`,
+    una sola vez al salir. Las filas ya guardadas nunca se pisan, así un proceso que
+    tiene el store abierto sigue leyendo datos consistentes; al guardar con más de
+    FRACCION_COMPACTAR de filas borradas se reescribe todo en archivos nuevos.
+    """
+
+    def __init__(self, directorio, tipo=None):
+        self.directorio = str(directorio)
+        self._lock = threading.RLock()
+        self._tipo_nuevo = tipo or os.getenv("RAG_NPSTORE_TIPO", "float16")
+        if self._tipo_nuevo not in TIPOS:
+            raise ValueError(f"Tipo de vectores desconocido: {self._tipo_nuevo} (usar float16 o int8)")
+        self._diferir = 0
+        self._pendiente = False
+        self._lector_documentos = None
+        self._escritor_documentos = None
+        # Matrices reemplazadas al crecer: se borran recién cuando metadatos.json deja de nombrarlas
+        self._obsoletos = []
+        self._cargar()
+
+    def _ruta(self, archivo):
+        return os.path.join(self.directorio, archivo)
+
+    def _cargar(self):
+        """Abre la matriz con memory-map y lee ids y metadata; los textos se leen al pedirlos"""
+        for intento in range(3):
+            try:
+                with open(self._ruta(METADATOS_ARCHIVO), 'r', encoding='utf-8') as f:
+                    datos = json.load(f)
+            except (OSError, ValueError):
+                datos = None
+            try:
+                self._abrir(datos)
+                return
+            except OSError:
+                # Una compactación reemplazó los archivos entre leer metadatos.json y abrirlos
+                if intento == 2:
+                    raise
+
+    def _abrir(self, datos):
+        self._cerrar_documentos()
+        self._documentos = None
+        self._escribible = False
+        if datos is None:
+            self.tipo = self._tipo_nuevo
+            self.dimension = None
+            self._ids = []
+            self._columnas = {}
+            self._filas = 0
+            self._archivos = None
+            self._legado = False
+            self._bytes_documentos = 0
+            self._vectores = None
+            self._escalas_mm = None
+            self._documentos = []
+        else:
+            self.tipo = datos["tipo"]
+            self.dimension = datos["dimension"]
+            self._ids = datos["ids"]
+            self._columnas = datos["columnas"]
+            # Stores anteriores: sin filas borradas, textos en un único JSON y sin capacidad de sobra
+            self._legado = "filas" not in datos
+            self._filas = datos.get("filas", len(self._ids))
+            self._archivos = datos.get("archivos") or dict(ARCHIVOS_LEGADO)
+            self._bytes_documentos = datos.get("bytes_documentos", 0)
+            # Un archivo sin filas no se puede mapear
+            modo = 'r' if self._filas else None
+            self._vectores = np.load(self._ruta(self._archivos["vectores"]), mmap_mode=modo)
+            self._escalas_mm = (np.load(self._ruta(self._archivos["escalas"]), mmap_mode=modo)
+                                if self.tipo == "int8" else None)
+            if not self._legado:
+                # El descriptor abierto fija el archivo leído aunque después se compacte
+                self._lector_documentos = open(self._ruta(self._archivos["documentos"]), 'rb')
+        self._posiciones = {chunk_id: pos for pos, chunk_id in enumerate(self._ids) if chunk_id is not None}
+        self._actualizar_vista()
+
+    def _actualizar_vista(self):
+        self._matriz = self._vectores[:self._filas] if self._vectores is not None else None
+        self._escalas = self._escalas_mm[:self._filas] if self._escalas_mm is not None else None
+        self._matriz32 = None
+        self._vivas = None
+
+    def _cerrar_documentos(self):
+        for archivo in (self._lector_documentos, self._escritor_documentos):
+            if archivo is not None:
+                archivo.close()
+        self._lector_documentos = None
+        self._escritor_documentos = None
+
+    def _textos(self):
+        if self._documentos is None:
+            documentos = None
+            try:
+                if self._legado:
+                    with open(self._ruta(self._archivos["documentos"]), 'r', encoding='utf-8') as f:
+                        documentos = json.load(f)
+                else:
+                    self._lector_documentos.seek(0)
+                    documentos = [json.loads(linea) for linea in itertools.islice(self._lector_documentos, self._filas)]
+            except (OSError, ValueError):
+                pass
+            if documentos is None or len(documentos) < self._filas:
+                documentos = (documentos or []) + [None] * (self._filas - len(documentos or []))
+            self._documentos = documentos
+        return self._documentos
+
+    def count(self):
+        return len(self._posiciones)
+
+    def _mascara_vivas(self):
+        """Filas no borradas, o None si no hay ninguna borrada"""
+        if len(self._posiciones) == self._filas:
+            return None
+        if self._vivas is None:
+            self._vivas = np.fromiter((i is not None for i in self._ids), dtype=bool, count=self._filas)
+        return self._vivas
+
+    def _metadata(self, pos):
+        return {campo: valores[pos] for campo, valores in self._columnas.items() if valores[pos] is not None}
+
+    def _mascara(self, where):
+        """Filtro de metadata estilo ChromaDB ($and, $or, $eq, $ne, $in, $nin, $gt...) -> máscara booleana"""
+        n = self._filas
+        if not where:
+            return np.ones(n, dtype=bool)
+        if "$and" in where:
+            mascara = np.ones(n, dtype=bool)
+            for parte in where["$and"]:
+                mascara &= self._mascara(parte)
+            return mascara
+        if "$or" in where:
+            mascara = np.zeros(n, dtype=bool)
+            for parte in where["$or"]:
+                mascara |= self._mascara(parte)
+            return mascara
+        mascara = np.ones(n, dtype=bool)
+        for campo, condicion in where.items():
+            valores = self._columnas.get(campo, [None] * n)
+            mascara &= np.fromiter((_cumple(v, condicion) for v in valores), dtype=bool, count=n)
+        return mascara
+
+    def _vectores_de(self, posiciones):
+        filas = np.asarray(self._matriz[posiciones], dtype=np.float32)
+        if self._escalas is not None:
+            filas *= self._escalas[posiciones][:, None]
+        return filas
+
+    def _armar(self, posiciones, include):
+        resultado = {"ids": [self._ids[p] for p in posiciones]}
+        resultado["documents"] = [self._textos()[p] for p in posiciones] if "documents" in include else None
+        resultado["metadatas"] = [self._metadata(p) for p in posiciones] if "metadatas" in include else None
+        if "embeddings" in include:
+            resultado["embeddings"] = self._vectores_de(np.asarray(posiciones, dtype=np.int64)).tolist() if posiciones else []
+        else:
+            resultado["embeddings"] = None
+        return resultado
+
+    def get(self, ids=None, where=None, limit=None, offset=None, include=("metadatas", "documents")):
+        """
+        Returns:
+            dict con ids, documents, metadatas (y embeddings si se piden), como ChromaDB
+        """
+        if ids is not None:
+            if isinstance(ids, str):
+                ids = [ids]
+            posiciones = [self._posiciones[i] for i in ids if i in self._posiciones]
+            if where:
+                mascara = self._mascara(where)
+                posiciones = [p for p in posiciones if mascara[p]]
+        else:
+            mascara = self._mascara(where)
+            vivas = self._mascara_vivas()
+            if vivas is not None:
+                mascara &= vivas
+            posiciones = np.flatnonzero(mascara).tolist()
+        posiciones = posiciones[offset or 0:]
+        if limit is not None:
+            posiciones = posiciones[:limit]
+        return self._armar(posiciones, include)
+
+    def query(self, query_embeddings=None, n_results=10, where=None,
+              include=("metadatas", "documents", "distances"), query_texts=None):
+        """
+        Top-k exacto por similitud coseno (producto punto sobre vectores normalizados),
+        con todos los vectores de consulta en un solo producto matricial
+
+        Returns:
+            dict con listas por consulta (ids, documents, metadatas, distances), como ChromaDB
+        """
+        if query_embeddings is None:
+            raise ValueError("ColeccionNumpy necesita query_embeddings (no tiene función de embeddings propia)")
+        consultas = _normalizar(query_embeddings)
+
+        vivas = self._mascara_vivas()
+        candidatas = None
+        if where or vivas is not None:
+            mascara = self._mascara(where)
+            if vivas is not None:
+                mascara &= vivas
+            candidatas = np.flatnonzero(mascara)
+        total = self._filas if candidatas is None else len(candidatas)
+        k = min(n_results, total)
+
+        resultado = {"ids": [], "documents": [], "metadatas": [], "distances": [], "embeddings": []}
+        if k == 0:
+            for _ in range(len(consultas)):
+                for clave in resultado:
+                    resultado[clave].append([])
+            return self._incluir(resultado, include)
+
+        puntajes = self._puntajes(consultas, candidatas)
+        for fila in puntajes:
+            mejores = np.argpartition(-fila, k - 1)[:k] if k < len(fila) else np.arange(len(fila))
+            mejores = mejores[np.argsort(-fila[mejores], kind='stable')]
+            posiciones = (mejores if candidatas is None else candidatas[mejores]).tolist()
+            armado = self._armar(posiciones, include)
+            for clave in ("ids", "documents", "metadatas", "embeddings"):
+                resultado[clave].append(armado[clave])
+            resultado["distances"].append((1.0 - fila[mejores]).tolist())
+        return self._incluir(resultado, include)
+
+    def _matriz_calculo(self):
+        """La matriz float16 se convierte una sola vez a float32 si la copia entra en CACHE_FLOAT32_MB"""
+        if self.tipo != "float16":
+            return self._matriz
+        if self._matriz32 is None and self._matriz.size * 4 <= CACHE_FLOAT32_MB * 1024 * 1024:
+            self._matriz32 = np.asarray(self._matriz, dtype=np.float32)
+        return self._matriz32 if self._matriz32 is not None else self._matriz
+
+    def _puntajes(self, consultas, candidatas=None):
+        """Producto punto consultas x filas, por bloques para no pasar toda la matriz a float32 de una vez"""
+        matriz = self._matriz_calculo()
+        n = self._filas if candidatas is None else len(candidatas)
+        puntajes = np.empty((len(consultas), n), dtype=np.float32)
+        for inicio in range(0, n, FILAS_POR_BLOQUE):
+            fin = min(inicio + FILAS_POR_BLOQUE, n)
+            if candidatas is None:
+                bloque = np.asarray(matriz[inicio:fin], dtype=np.float32)
+                escalas = self._escalas[inicio:fin] if self._escalas is not None else None
+            else:
+                posiciones = candidatas[inicio:fin]
+                bloque = np.asarray(matriz[posiciones], dtype=np.float32)
+                escalas = self._escalas[posiciones] if self._escalas is not None else None
+            parcial = consultas @ bloque.T
+            if escalas is not None:
+                parcial *= escalas[None, :]
+            puntajes[:, inicio:fin] = parcial
+        return puntajes
+
+    @staticmethod
+    def _incluir(resultado, include):
+        for clave in ("documents", "metadatas", "distances", "embeddings"):
+            if clave not in include:
+                resultado[clave] = None
+        return resultado
+
+    def add(self, ids, embeddings, documents=None, metadatas=None):
+        """Agrega chunks nuevos (error si algún id ya existe)"""
+        with self._lock:
+            repetidos = [i for i in ids if i in self._posiciones]
+            if repetidos or len(set(ids)) != len(ids):
+                raise ValueError(f"Ids repetidos en la colección: {repetidos[:5]}")
+            self._agregar(ids, embeddings, documents, metadatas)
+
+    def upsert(self, ids, embeddings, documents=None, metadatas=None):
+        """Agrega o reemplaza chunks por id (la fila anterior queda marcada como borrada)"""
+        with self._lock:
+            self._agregar(ids, embeddings, documents, metadatas)
+
+    def delete(self, ids=None, where=None):
+        with self._lock:
+            borrar = set(ids or [])
+            if where:
+                borrar.update(self._ids[p] for p in np.flatnonzero(self._mascara(where)))
+            if self._quitar(borrar):
+                self._escrito()
+
+    @contextmanager
+    def escritura(self):
+        """Dentro del bloque, ids y metadata se guardan una sola vez al salir (p. ej. una ingesta completa)"""
+        with self._lock:
+            self._diferir += 1
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self._diferir -= 1
+                if not self._diferir and self._pendiente:
+                    self.guardar()
+
+    def _escrito(self):
+        if self._diferir:
+            self._pendiente = True
+        else:
+            self.guardar()
+
+    def _quitar(self, ids):
+        """Marca como borradas las filas de `ids`; devuelve cuántas había"""
+        quitadas = 0
+        for chunk_id in ids:
+            pos = self._posiciones.pop(chunk_id, None)
+            if pos is None:
+                continue
+            self._ids[pos] = None
+            for valores in self._columnas.values():
+                valores[pos] = None
+            if self._documentos is not None:
+                self._documentos[pos] = None
+            quitadas += 1
+        if quitadas:
+            self._vivas = None
+        return quitadas
+
+    def _agregar(self, ids, embeddings, documents, metadatas):
+        ids = list(ids)
+        if not ids:
+            return
+        documents = list(documents) if documents is not None else [None] * len(ids)
+        metadatas = [m or {} for m in metadatas] if metadatas is not None else [{} for _ in ids]
+        self._quitar(ids)
+        if self._legado or (self._filas and not self._posiciones):
+            # Store anterior (se pasa al formato nuevo) o con todo borrado (puede cambiar tipo o dimensión)
+            self._compactar()
+
+        nuevos, escalas_nuevas = cuantizar(embeddings, self.tipo)
+        if self.dimension is not None and nuevos.shape[1] != self.dimension:
+            raise ValueError(f"Los vectores tienen dimensión {nuevos.shape[1]} y la colección {self.dimension}")
+        self.dimension = nuevos.shape[1]
+        inicio, fin = self._filas, self._filas + len(ids)
+        self._reservar(fin)
+        self._vectores[inicio:fin] = nuevos
+        if escalas_nuevas is not None:
+            self._escalas_mm[inicio:fin] = escalas_nuevas
+        self._anexar_documentos(documents)
+
+        for campo in {campo for meta in metadatas for campo in meta} - set(self._columnas):
+            self._columnas[campo] = [None] * self._filas
+        for campo, valores in self._columnas.items():
+            valores.extend(meta.get(campo) for meta in metadatas)
+        for pos, chunk_id in enumerate(ids, start=inicio):
+            # Un id repetido dentro del lote: vale el último
+            if chunk_id in self._posiciones:
+                self._quitar([chunk_id])
+            self._posiciones[chunk_id] = pos
+        self._ids.extend(ids)
+        if self._documentos is not None:
+            self._documentos.extend(documents)
+        self._filas = fin
+        self._actualizar_vista()
+        self._escrito()
+
+    def _archivos_nuevos(self):
+        generacion = uuid.uuid4().hex[:12]
+        return {
+            "vectores": f"vectores-{generacion}.npy",
+            "escalas": f"escalas-{generacion}.npy",
+            "documentos": f"documentos-{generacion}.jsonl"
+        }
+
+    def _crecer(self, nombre, origen, forma, dtype):
+        """Crea (vía temporal) la matriz `nombre` con la forma dada, copiando las filas ya escritas de `origen`"""
+        ruta = self._ruta(nombre)
+        tmp = f"{ruta}.{os.getpid()}.tmp"
+        destino = np.lib.format.open_memmap(tmp, mode='w+', dtype=dtype, shape=forma)
+        for inicio in range(0, self._filas, FILAS_POR_BLOQUE):
+            fin = min(inicio + FILAS_POR_BLOQUE, self._filas)
+            destino[inicio:fin] = origen[inicio:fin]
+        destino.flush()
+        del destino
+        os.replace(tmp, ruta)
+
+    def _reservar(self, filas):
+        """Deja la matriz abierta para escribir con capacidad para `filas` (duplicándola si no alcanza)"""
+        os.makedirs(self.directorio, exist_ok=True)
+        if self._archivos is None:
+            self._archivos = self._archivos_nuevos()
+        capacidad = self._vectores.shape[0] if self._vectores is not None else 0
+        if filas > capacidad:
+            # Las filas ya guardadas se copian a archivos nuevos más grandes. No se reemplaza el
+            # archivo mapeado (Windows no lo permite y otro proceso puede estar leyéndolo):
+            # metadatos.json pasa a nombrar los nuevos al guardar y recién ahí se borran los viejos
+            nueva = max(filas, 2 * capacidad, CAPACIDAD_INICIAL)
+            dtype = np.float16 if self.tipo == "float16" else np.int8
+            nuevos = self._archivos_nuevos()
+            self._crecer(nuevos["vectores"], self._vectores, (nueva, self.dimension), dtype)
+            claves = ["vectores"]
+            if self.tipo == "int8":
+                self._crecer(nuevos["escalas"], self._escalas_mm, (nueva,), np.float32)
+                claves.append("escalas")
+            # Se sueltan los memory-maps de las matrices anteriores antes de dejar de usarlas
+            self._vectores = self._escalas_mm = self._matriz = self._escalas = self._matriz32 = None
+            for clave in claves:
+                if os.path.exists(self._ruta(self._archivos[clave])):
+                    self._obsoletos.append(self._archivos[clave])
+                self._archivos[clave] = nuevos[clave]
+            self._escribible = False
+        if not self._escribible:
+            self._vectores = np.load(self._ruta(self._archivos["vectores"]), mmap_mode='r+')
+            if self.tipo == "int8":
+                self._escalas_mm = np.load(self._ruta(self._archivos["escalas"]), mmap_mode='r+')
+            self._escribible = True
+            self._actualizar_vista()
+
+    def _borrar_obsoletos(self, nombres=()):
+        """Borra archivos que metadatos.json ya no nombra (si otro proceso los tiene abiertos, quedan)"""
+        for nombre in set(self._obsoletos) | set(nombres):
+            try:
+                os.remove(self._ruta(nombre))
+            except OSError:
+                pass
+        self._obsoletos = []
+
+    def _anexar_documentos(self, documents):
+        if self._escritor_documentos is None:
+            self._escritor_documentos = open(self._ruta(self._archivos["documentos"]), 'ab')
+            # Líneas de una escritura que no llegó a guardarse (no figuran en metadatos.json)
+            self._escritor_documentos.truncate(self._bytes_documentos)
+            if self._lector_documentos is None:
+                self._lector_documentos = open(self._ruta(self._archivos["documentos"]), 'rb')
+        lineas = b"".join(json.dumps(doc, ensure_ascii=False).encode('utf-8') + b"\n" for doc in documents)
+        self._escritor_documentos.write(lineas)
+        self._escritor_documentos.flush()
+        self._bytes_documentos += len(lineas)
+
+    def _guardar_metadatos(self):
+        _guardar_json(self._ruta(METADATOS_ARCHIVO), {
+            "tipo": self.tipo,
+            "dimension": self.dimension,
+            "filas": self._filas,
+            "archivos": self._archivos,
+            "bytes_documentos": self._bytes_documentos,
+            "ids": self._ids,
+            "columnas": self._columnas
+        })
+
+    def _compactar(self):
+        """Reescribe solo las filas vivas en archivos nuevos y borra los anteriores"""
+        vivas = sorted(self._posiciones.values())
+        textos = self._textos()
+        anteriores = dict(self._archivos) if self._archivos else {}
+        if not vivas:
+            # Colección vacía: se puede empezar con otro tipo o dimensión
+            self.tipo = self._tipo_nuevo
+            self.dimension = None
+
+        os.makedirs(self.directorio, exist_ok=True)
+        archivos = self._archivos_nuevos()
+        dtype = np.float16 if self.tipo == "float16" else np.int8
+        indices = np.asarray(vivas, dtype=np.int64)
+        matriz = np.asarray(self._matriz[indices]) if vivas else np.zeros((0, self.dimension or 0), dtype=dtype)
+        _guardar_npy(self._ruta(archivos["vectores"]), matriz)
+        if self.tipo == "int8":
+            escalas = np.asarray(self._escalas[indices]) if vivas else np.zeros(0, dtype=np.float32)
+            _guardar_npy(self._ruta(archivos["escalas"]), escalas)
+        documentos = [textos[p] for p in vivas]
+        lineas = b"".join(json.dumps(doc, ensure_ascii=False).encode('utf-8') + b"\n" for doc in documentos)
+        with open(self._ruta(archivos["documentos"]), 'wb') as f:
+            f.write(lineas)
+
+        datos = {
+            "tipo": self.tipo,
+            "dimension": self.dimension,
+            "filas": len(vivas),
+            "archivos": archivos,
+            "bytes_documentos": len(lineas),
+            "ids": [self._ids[p] for p in vivas],
+            "columnas": {campo: [valores[p] for p in vivas] for campo, valores in self._columnas.items()}
+        }
+        # Se sueltan los memory-maps antes de escribir metadatos.json y borrar los archivos viejos
+        self._vectores = self._escalas_mm = self._matriz = self._escalas = self._matriz32 = None
+        _guardar_json(self._ruta(METADATOS_ARCHIVO), datos)
+        self._abrir(datos)
+        self._documentos = documentos
+        self._borrar_obsoletos(set(anteriores.values()) - set(archivos.values()))
+
+    def guardar(self):
+        """Guarda ids y metadata (y compacta si hay muchas filas borradas)"""
+        with self._lock:
+            self._pendiente = False
+            borradas = self._filas - len(self._posiciones)
+            if self._legado or (borradas and borradas >= FRACCION_COMPACTAR * self._filas):
+                self._compactar()
+                return
+            if self._vectores is not None and self._escribible:
+                self._vectores.flush()
+                if self._escalas_mm is not None:
+                    self._escalas_mm.flush()
+            if self._escritor_documentos is not None:
+                self._escritor_documentos.flush()
+            if self._archivos is not None:
+                self._guardar_metadatos()
+                self._borrar_obsoletos()
+
+def escritura_diferida(collection):
+    """Contexto de escritura diferida para ColeccionNumpy; en ChromaDB no hace nada"""
+    escritura = getattr(collection, 'escritura', None)
+    return escritura() if escritura else nullcontext()
+
+class AlmacenNumpy:
+    """
+    Envoltorio con la interfaz del Chroma de LangChain que usan rag_query y rag_ingest.
+    Reabre el store cuando cambia la versión publicada de la colección (otra ingesta).
+    """
+
+    def __init__(self, persist_directory, embedding_function, tipo=None):
+        self.persist_directory = persist_directory
+        self._tipo = tipo
+        self._lock = threading.Lock()
+        self.version = version_catalogo(persist_directory)
+        self._coleccion = ColeccionNumpy(ruta_npstore(persist_directory), tipo)
+        self._embedding_function = embedding_function
+
+    @property
+    def _collection(self):
+        return self.recargar_si_cambio()
+
+    def recargar_si_cambio(self):
+        """Devuelve la colección, reabriéndola si la versión del catálogo cambió"""
+        version = version_catalogo(self.persist_directory)
+        if version != self.version:
+            with self._lock:
+                if version != self.version:
+                    self._coleccion = ColeccionNumpy(ruta_npstore(self.persist_directory), self._tipo)
+                    self.version = version
+        return self._coleccion
+
+    @property
+    def embeddings(self):
+        return self._embedding_function
+
+    def add_documents(self, documents, ids=None):
+        documents = list(documents)
+        ids = ids or [str(uuid.uuid4()) for _ in documents]
+        textos = [d.page_content for d in documents]
+        # upsert, como Chroma.add_documents: reingerir un id lo reemplaza
+        self._collection.upsert(
+            ids=ids,
+            embeddings=self._embedding_function.embed_documents(textos),
+            documents=textos,
+            metadatas=[d.metadata for d in documents]
+        )
+        return ids
+
+    def similarity_search(self, query, k=4, filter=None):
+        from langchain_core.documents import Document
+
+        data = self._collection.query(
+            query_embeddings=[self._embedding_function.embed_query(query)],
+            n_results=k,
+            where=filter,
+            include=["documents", "metadatas"]
+        )
+        return [
+            Document(page_content=doc or '', metadata=meta or {})
+            for doc, meta in zip(data["documents"][0], data["metadatas"][0])
+        ]
+
+def abrir_vectorstore(persist_directory, embedding_function, backend=None):
+    """
+    Abre el vectorstore configurado (RAG_VECTORSTORE): Chroma de LangChain o AlmacenNumpy
+
+    Returns:
+        objeto con _collection y _embedding_function
+    """
+    if backend_vectorstore(backend) == "numpy":
+        return AlmacenNumpy(persist_directory, embedding_function)
+    from langchain_community.vectorstores import Chroma
+    return Chroma(persist_directory=persist_directory, embedding_function=embedding_function)
+
+def exportar_desde_chroma(chroma_path, tipo=None, nombre_coleccion="langchain", lote=1000):
+    """
+    Copia ids, textos, metadata y vectores de la colección ChromaDB al store NumPy.
+    Los vectores son los mismos, así que el catálogo, el BM25 y embeddings.json siguen valiendo.
+
+    Returns:
+        la ColeccionNumpy nueva
+    """
+    import chromadb
+    from chromadb.config import Settings
+
+    cliente = chromadb.PersistentClient(path=str(chroma_path), settings=Settings(anonymized_telemetry=False))
+    origen = cliente.get_collection(nombre_coleccion)
+    destino = ColeccionNumpy(ruta_npstore(chroma_path), tipo)
+    destino.delete(ids=list(destino._posiciones))
+
+    ids, vectores, documentos, metadatas = [], [], [], []
+    total = origen.count()
+    for inicio in range(0, total, lote):
+        data = origen.get(limit=lote, offset=inicio, include=["embeddings", "documents", "metadatas"])
+        ids.extend(data["ids"])
+        vectores.extend(data["embeddings"])
+        documentos.extend(data["documents"])
+        metadatas.extend(data["metadatas"])
+    if ids:
+        destino.add(ids=ids, embeddings=vectores, documents=documentos, metadatas=metadatas)
+    return destino
+
+def main():
+    parser = argparse.ArgumentParser(description="Vectorstore NumPy memory-mapped")
+    parser.add_argument("--exportar", action="store_true", help="Copiar la colección ChromaDB al store NumPy")
+    parser.add_argument("--chroma", type=str, default="vectorstore/chroma_db")
+    parser.add_argument("--tipo", choices=TIPOS, default=None)
+    args = parser.parse_args()
+
+    if args.exportar:
+        coleccion = exportar_desde_chroma(args.chroma, args.tipo)
+        print(f"Exportados {coleccion.count()} chunks ({coleccion.tipo}) a {coleccion.directorio}")
+    else:
+        coleccion = ColeccionNumpy(ruta_npstore(args.chroma), args.tipo)
+        print(f"{coleccion.count()} chunks, tipo {coleccion.tipo}, dimensión {coleccion.dimension}")
+
+if __name__ == "__main__":
+    main()
@@ -4,19 +4,32 @@ Permite hacer preguntas sobre los documentos PDF Procesados
 Usa Groq para inferencia rápida en la nube
 '''
 import argparse
-from langchain_community.vectorstores import Chroma
-from langchain_ollama import OllamaEmbeddings
+import asyncio
+import contextlib
 from langchain_groq import ChatGroq
 from langchain_core.documents import Document
-import pandas as pd
 import re
 import os
+import threading
+import time
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
+from rag_catalogo import leer_catalogo, reiniciar_catalogo, version_catalogo
+from rag_cache import cache_respuestas, normalizar_pregunta, EmbeddingsCacheados
+from rag_embeddings import crear_embeddings, verificar_embeddings
+from rag_npstore import abrir_vectorstore
+from rag_coalescencia import consultas_en_vuelo, insights_en_vuelo
+from rag_tablas import responder_estadisticas, tablas_estadisticas
+from rag_hibrido import fusionar_rrf, gestor_bm25
+from rag_contexto import empacar_contexto
+from rag_metricas import consultas, duracion_etapas, medir, registrar_llm
 
 # Cargar variables de entorno
 load_dotenv()
 
 CHROMA_PATH = "vectorstore/chroma_db"
+EMBEDDINGS_CACHE_PATH = "vectorstore/cache_embeddings.sqlite3"
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 
 # Modelos disponibles en Groq (actualizados 2025)
@@ -27,218 +40,464 @@ GROQ_MODELS = {
     "gemma": "gemma2-9b-it"
 }
 
+# Presupuesto de tokens para el contexto del prompt, por modelo de GROQ_MODELS
+TOKENS_CONTEXTO = {
+    "llama3": 600,
+    "llama3-70b": 1200,
+    "mixtral": 1000,
+    "gemma": 600
+}
+
+# Clientes Groq compartidos por proceso, indexados por (modelo, temperatura).
+# Cada ChatGroq mantiene su propio pool httpx con conexiones keep-alive.
+_LLM_CLIENTES = {}
+_LLM_LOCK = threading.Lock()
+
+def obtener_llm(modelo="llama3", temperature=0.0):
+    """
+    Devuelve el cliente ChatGroq compartido para el modelo y la temperatura dados.
+    El cliente se crea una sola vez por proceso y se reutiliza en cada consulta.
+    """
+    modelo_groq = GROQ_MODELS.get(modelo, "llama-3.1-8b-instant")
+    clave = (modelo_groq, float(temperature))
+
+    llm = _LLM_CLIENTES.get(clave)
+    if llm is None:
+        with _LLM_LOCK:
+            llm = _LLM_CLIENTES.get(clave)
+            if llm is None:
+                llm = ChatGroq(
+                    api_key=GROQ_API_KEY,
+                    model_name=modelo_groq,
+                    temperature=temperature
+                )
+                _LLM_CLIENTES[clave] = llm
+    return llm
+
+class LLMSaturado(Exception):
+    """Se alcanzó el máximo de llamadas concurrentes al LLM"""
+
+    def __init__(self, retry_after=1):
+        super().__init__("Demasiadas consultas al modelo en curso, intenta de nuevo en unos segundos")
+        self.retry_after = retry_after
+
+class LimitadorLLM:
+    """
+    Semáforo async que acota las llamadas concurrentes a Groq.
+    Si no hay cupo tras `espera` segundos lanza LLMSaturado en lugar de encolar sin límite.
+    """
+
+    def __init__(self, max_concurrentes=8, espera=2.0, retry_after=2):
+        self.max_concurrentes = max_concurrentes
+        self.espera = espera
+        self.retry_after = retry_after
+        self._semaforo = asyncio.Semaphore(max_concurrentes)
+        self._lock = threading.Lock()
+        self._en_curso = 0
+
+    @property
+    def en_curso(self):
+        return self._en_curso
+
+    async def adquirir(self):
+        """Toma un cupo o lanza LLMSaturado si no se libera ninguno en `espera` segundos"""
+        try:
+            await asyncio.wait_for(self._semaforo.acquire(), timeout=self.espera)
+        except asyncio.TimeoutError:
+            raise LLMSaturado(self.retry_after)
+        with self._lock:
+            self._en_curso += 1
+
+    def liberar(self):
+        with self._lock:
+            self._en_curso -= 1
+        self._semaforo.release()
+
+    async def __aenter__(self):
+        await self.adquirir()
+        return self
+
+    async def __aexit__(self, *exc):
+        self.liberar()
+        return False
+
+def precalentar_llms(modelos=None, temperaturas=(0.0, 0.2, 0.3)):
+    """Crea por adelantado los clientes Groq usados por consultar() y generar_insights()"""
+    for modelo in (modelos or GROQ_MODELS.keys()):
+        for temperature in temperaturas:
+            obtener_llm(modelo, temperature)
+
+# Candidatos por ranking (vectorial y BM25), chunks que pasan al armado del contexto
+# y mínimo de chunks antes de complementar por metadata
+K_CANDIDATOS = 20
+K_EMPAQUE = 6
+K_CONTEXTO = 3
+
 def cargar_rag():
-    """Carga el sistema RAG desde ChromaDB"""
-    embeddings = OllamaEmbeddings(model="nomic-embed-text")
-    vector = Chroma(
-        persist_directory=CHROMA_PATH,
-        embedding_function=embeddings
+    """Carga el sistema RAG desde ChromaDB (o el store NumPy si RAG_VECTORSTORE=numpy)"""
+    # El proveedor (RAG_EMBEDDINGS) debe ser el mismo con el que se ingirió la colección
+    proveedor = crear_embeddings()
+    verificar_embeddings(CHROMA_PATH, proveedor.nombre)
+    embeddings = EmbeddingsCacheados(
+        proveedor,
+        nombre_modelo=proveedor.nombre,
+        ruta_disco=EMBEDDINGS_CACHE_PATH
     )
+    vector = abrir_vectorstore(CHROMA_PATH, embeddings)
+    try:
+        construir_indice_metadata(vector)
+    except Exception:
+        pass
+    try:
+        gestor_bm25.obtener(vector._collection, CHROMA_PATH, version_coleccion())
+    except Exception:
+        pass
+    try:
+        tablas_estadisticas.actualizar()
+    except Exception:
+        pass
     return vector
 
-def obtener_estadisticas_rag(vector):
+PREGUNTA_PRUEBA = "deserción estudiantil en Ecuador"
+
+def calentar_indice(vector, pregunta=PREGUNTA_PRUEBA):
+    """
+    Embebe una pregunta de prueba y hace una búsqueda de 1 resultado para que
+    Ollama cargue el modelo y ChromaDB suba el índice HNSW a memoria antes del primer usuario.
+    Con EmbeddingsCacheados la pregunta queda precalculada en la cache de embeddings.
     """
-    Obtiene estadísticas sobre el conocimiento almacenado en el RAG
+    embeddings = vector._embedding_function
+    precalcular = getattr(embeddings, 'precalcular', None)
+    embedding = precalcular([pregunta])[0] if precalcular else embeddings.embed_query(pregunta)
+    if vector._collection.count():
+        vector._collection.query(query_embeddings=[embedding], n_results=1, include=[])
+
+def normalizar_texto(texto):
+    """Pasa el texto a minúsculas y elimina acentos (deserción -> desercion, ñ -> n)"""
+    texto = unicodedata.normalize('NFKD', str(texto).lower())
+    return ''.join(c for c in texto if not unicodedata.combining(c))
+
+# Índice invertido en memoria: token normalizado de source/filename/type -> ids de chunks.
+# Se reconstruye cuando cambia la colección (la firma es la versión publicada por la ingesta,
+# así un reemplazo con la misma cantidad de chunks también lo invalida y no hace falta count()).
+# "prefijos" mapea cada prefijo de al menos _PREFIJO_MIN letras a los ids que lo contienen,
+# para que "estadistica" encuentre "estadisticas" sin recorrer el vocabulario en cada consulta.
+_INDICE_METADATA = {"firma": None, "posiciones": {}, "tokens": {}, "prefijos": {}}
+_INDICE_LOCK = threading.Lock()
+_PREFIJO_MIN = 4
+
+def _firma_coleccion():
+    return version_coleccion()
+
+def construir_indice_metadata(vector):
+    """
+    Construye el índice invertido de metadata leyendo solo ids y metadatas de ChromaDB
 
     Args:
         vector: El vector de ChromaDB
 
     Returns:
-        dict con estadísticas del RAG
+        dict con el índice construido
     """
-    try:
-        collection = getattr(vector, '_collection', None)
-        if collection is None:
-            return {"error": "No se pudo acceder a la colección"}
+    collection = getattr(vector, '_collection', None)
+    if collection is None:
+        return _INDICE_METADATA
+
+    with _INDICE_LOCK:
+        firma = _firma_coleccion()
+        data = collection.get(include=['metadatas'])
+        ids = data.get('ids', []) or []
+        metadatas = data.get('metadatas', []) or []
+
+        posiciones = {}
+        tokens = {}
+        for pos, (chunk_id, meta) in enumerate(zip(ids, metadatas)):
+            posiciones[chunk_id] = pos
+            if not isinstance(meta, dict):
+                continue
+            campos = " ".join(str(meta.get(c, '')) for c in ('source', 'filename', 'type'))
+            for token in set(re.split(r'[^a-z0-9]+', normalizar_texto(campos))):
+                if token:
+                    tokens.setdefault(token, []).append(chunk_id)
+
+        prefijos = {}
+        for token, ids_token in tokens.items():
+            for n in range(_PREFIJO_MIN, len(token) + 1):
+                prefijos.setdefault(token[:n], set()).update(ids_token)
+
+        _INDICE_METADATA.update({"firma": firma, "posiciones": posiciones, "tokens": tokens, "prefijos": prefijos})
+    return _INDICE_METADATA
+
+def buscar_ids_por_metadata(vector, keywords, limite=20):
+    """
+    Devuelve los ids de chunks cuya metadata tiene algún token que empieza con una palabra clave.
+    Cada palabra es un lookup directo en el índice de prefijos (o de tokens si es muy corta).
+    """
+    collection = getattr(vector, '_collection', None)
+    if collection is None:
+        return []
 
-        data = collection.get(include=['metadatas', 'documents'])
-        metadatas = data.get('metadatas', [])
-        documents = data.get('documents', [])
+    if _INDICE_METADATA["firma"] != _firma_coleccion():
+        construir_indice_metadata(vector)
 
-        # Contar documentos por tipo
-        fuentes = {}
-        total_chunks = len(documents)
+    tokens = _INDICE_METADATA["tokens"]
+    prefijos = _INDICE_METADATA["prefijos"]
+    posiciones = _INDICE_METADATA["posiciones"]
 
-        for meta in metadatas:
-            if isinstance(meta, dict):
-                source = meta.get('source', 'Desconocido')
-                filename = source.split('/')[-1].split('\\')[-1]
+    encontrados = set()
+    for kw in keywords:
+        for parte in re.split(r'[^a-z0-9]+', normalizar_texto(kw)):
+            if len(parte) >= _PREFIJO_MIN:
+                encontrados.update(prefijos.get(parte, ()))
+            elif parte:
+                encontrados.update(tokens.get(parte, ()))
 
-                if filename not in fuentes:
-                    fuentes[filename] = {
-                        'nombre': filename,
-                        'chunks': 0,
-                        'tipo': 'CSV' if filename.endswith('.csv') else 'Jupyter' if filename.endswith('.ipynb') else 'PDF' if filename.endswith('.pdf') else 'Otro'
-                    }
-                fuentes[filename]['chunks'] += 1
+    return sorted(encontrados, key=lambda i: posiciones.get(i, 0))[:limite]
 
-        # Ordenar por número de chunks
-        fuentes_list = sorted(fuentes.values(), key=lambda x: x['chunks'], reverse=True)
+def obtener_estadisticas_rag(vector):
+    """
+    Obtiene estadísticas sobre el conocimiento almacenado en el RAG.
+    Los conteos vienen del catálogo materializado por los scripts de ingesta.
 
-        return {
-            "total_documentos": len(fuentes),
-            "total_chunks": total_chunks,
-            "fuentes": fuentes_list,
-            "tipos": {
-                "csv": len([f for f in fuentes_list if f['tipo'] == 'CSV']),
-                "jupyter": len([f for f in fuentes_list if f['tipo'] == 'Jupyter']),
-                "pdf": len([f for f in fuentes_list if f['tipo'] == 'PDF']),
-                "otros": len([f for f in fuentes_list if f['tipo'] == 'Otro'])
-            }
-        }
+    Args:
+        vector: El vector de ChromaDB
+
+    Returns:
+        dict con estadísticas del RAG
+    """
+    try:
+        catalogo = leer_catalogo(CHROMA_PATH)
+        if catalogo is None:
+            collection = getattr(vector, '_collection', None)
+            if collection is None:
+                return {"error": "No se pudo acceder a la colección"}
+
+            # Base creada antes del catálogo: se materializa una sola vez desde la metadata
+            data = collection.get(include=['metadatas'])
+            catalogo = reiniciar_catalogo(CHROMA_PATH, data.get('metadatas', []) or [])
+
+        return catalogo["resumen"]
     except Exception as e:
         return {"error": str(e)}
 
-def consultar(query, vector, modelo="llama3"):
+def version_coleccion():
+    """Versión de la colección según el catálogo; cambia con cada ingesta"""
+    return version_catalogo(CHROMA_PATH)
+
+def consultar(query, vector, modelo="llama3", usar_cache=True):
     """
-    Realiza la consulta RAG sobre los documentos que se han analizado
+    Realiza la consulta RAG sobre los documentos que se han analizado.
+    Las respuestas se cachean por pregunta normalizada, modelo y versión de la colección,
+    y las consultas idénticas concurrentes comparten un único cálculo en vuelo.
 
     Args:
         query: La consulta que se desea hacer sobre los documentos
         vector: El vector de ChromaDB que se ha creado para los documentos
         modelo: El modelo de Groq a utilizar (llama3, llama3-70b, mixtral, gemma)
+        usar_cache: Si consultar/guardar en la cache de respuestas
 
     Returns:
         dict con keys: result, sources, metadata
     """
-    modelo_groq = GROQ_MODELS.get(modelo, "llama-3.1-8b-instant")
-
-    # Inicializar el modelo de Groq (inferencia rápida en la nube)
-    llm = ChatGroq(
-        api_key=GROQ_API_KEY,
-        model_name=modelo_groq,
-        temperature=0.0
-    )
+    with medir("total"):
+        # Las preguntas que resuelve el router de intenciones no pasan por cache, embeddings ni LLM
+        directo = responder_directo(query)
+        if directo is not None:
+            return _contar_consulta(directo)
+
+        version = version_coleccion()
+        resultado, compartido = consultas_en_vuelo.ejecutar(
+            (normalizar_pregunta(query), modelo, version, usar_cache),
+            lambda: _consultar_con_cache(query, vector, modelo, version, usar_cache)
+        )
+        if compartido:
+            resultado = _marcar_compartido(resultado)
+        return _contar_consulta(resultado)
+
+def _consultar_con_cache(query, vector, modelo, version, usar_cache=True):
+    """Busca en la cache de respuestas y, si no está, ejecuta la consulta y la guarda"""
+    if not usar_cache:
+        return _consultar(query, vector, modelo)
+
+    with medir("cache"):
+        cacheado, embedding = _buscar_en_cache(query, vector, modelo, version)
+    if cacheado is not None:
+        return cacheado
+
+    resultado = _consultar(query, vector, modelo)
+    _guardar_en_cache(query, modelo, version, resultado, embedding)
+    return resultado
+
+def _marcar_compartido(resultado):
+    """Copia del resultado marcada como obtenida de un cálculo en vuelo de otra petición"""
+    return {**resultado, "metadata": {**resultado.get("metadata", {}), "coalesced": True}}
+
+def _contar_consulta(resultado):
+    """Cuenta la consulta según cómo se resolvió (cache, csv, rag o general)"""
+    metadata = resultado.get("metadata", {})
+    if metadata.get("cache_hit"):
+        tipo = "cache"
+    elif metadata.get("csv_direct") or metadata.get("fallback"):
+        tipo = "csv"
+    elif metadata.get("knowledge_type") == "general":
+        tipo = "general"
+    else:
+        tipo = "rag"
+    consultas.incrementar(tipo=tipo)
+    return resultado
+
+def _invocar_llm(plan, etapa="llm"):
+    """Llama al LLM del plan registrando latencia y tamaños de prompt/respuesta"""
+    modelo = getattr(plan["llm"], "model_name", "")
+    with medir(etapa, modelo=modelo):
+        resp = plan["llm"].invoke(plan["prompt"])
+    answer = getattr(resp, 'content', str(resp))
+    registrar_llm(plan["prompt"], answer, getattr(resp, 'usage_metadata', None), modelo=modelo)
+    return answer
+
+async def _invocar_llm_async(plan, limitador=None, etapa="llm"):
+    """Igual que _invocar_llm pero con ainvoke y acotado por `limitador`"""
+    modelo = getattr(plan["llm"], "model_name", "")
+    async with (limitador or contextlib.nullcontext()):
+        with medir(etapa, modelo=modelo):
+            resp = await plan["llm"].ainvoke(plan["prompt"])
+    answer = getattr(resp, 'content', str(resp))
+    registrar_llm(plan["prompt"], answer, getattr(resp, 'usage_metadata', None), modelo=modelo)
+    return answer
+
+def _buscar_en_cache(query, vector, modelo, version, embedding=None):
+    embedding_fn = getattr(getattr(vector, '_embedding_function', None), 'embed_query', None)
+    cacheado, embedding = cache_respuestas.obtener(query, modelo, version, embedding_fn, embedding)
+    if cacheado is not None:
+        cacheado = {**cacheado, "metadata": {**cacheado.get("metadata", {}), "cache_hit": True}}
+    return cacheado, embedding
+
+def _guardar_en_cache(query, modelo, version, resultado, embedding):
+    respuesta = resultado.get("result")
+    if isinstance(respuesta, str) and respuesta.strip() and not respuesta.startswith("Error"):
+        cache_respuestas.guardar(query, modelo, version, resultado, embedding)
+
+CSV_ESTADISTICAS = ["resumen_general_desercion_2022.csv", "desercion_por_sexo.csv", "desercion_por_tipo_institucion.csv"]
+
+def responder_directo(query):
+    """
+    Responde desde las tablas de estadísticas si el router de intenciones reconoce la pregunta
 
-    query_lower = query.lower()
+    Returns:
+        dict (result, sources, metadata) o None si la pregunta necesita RAG
+    """
+    csv_answer = answer_from_csvs(query)
+    if not csv_answer or csv_answer.startswith("Error"):
+        return None
+    return {
+        "result": csv_answer,
+        "sources": list(CSV_ESTADISTICAS),
+        "metadata": {"docs_found": 1, "used_rag_context": True, "csv_direct": True}
+    }
 
-    # DETECCION TEMPRANA: Si pregunta sobre Ecuador, estadísticas, tasa, deserción - usar CSVs directamente
-    es_pregunta_estadisticas = any(kw in query_lower for kw in [
-        'ecuador', '2022', 'tasa', 'desercion', 'deserción',
-        'abandonaron', 'matriculados', 'cuantos', 'cuántos',
-        'estadistica', 'estadística', 'porcentaje'
-    ])
+def buscar_hibrido(consultas, vector, k=K_EMPAQUE, vectores=None):
+    """
+    Recuperación híbrida para una o varias consultas en una sola pasada:
+    un embedding por lote, una consulta a ChromaDB con todos los vectores,
+    BM25 sobre el índice léxico y fusión de ambos rankings con RRF.
 
-    if es_pregunta_estadisticas:
-        csv_answer = answer_from_csvs(query)
-        if csv_answer and not csv_answer.startswith("Error"):
-            return {
-                "result": csv_answer,
-                "sources": ["resumen_general_desercion_2022.csv", "desercion_por_sexo.csv", "desercion_por_tipo_institucion.csv"],
-                "metadata": {"docs_found": 1, "used_rag_context": True, "csv_direct": True}
-            }
+    Args:
+        consultas: Lista de textos a buscar
+        vector: El vector de ChromaDB
+        k: Cantidad de chunks a devolver por consulta
+        vectores: Embeddings ya calculados de las consultas (se calculan si es None)
 
-    # Configuramos el retriever para obtener documentos relevantes
-    retriever = vector.as_retriever(search_kwargs={"k": 5})
+    Returns:
+        lista de listas de Document, en el mismo orden que consultas
+    """
+    if not consultas:
+        return []
+
+    collection = vector._collection
+    if vectores is None:
+        with medir("embedding"):
+            vectores = vector._embedding_function.embed_documents(list(consultas))
+    with medir("busqueda_vectorial"):
+        data = collection.query(
+            query_embeddings=vectores,
+            n_results=K_CANDIDATOS,
+            include=['documents', 'metadatas']
+        )
 
-    # Obtener documentos relevantes
+    conocidos = {}
+    for ids, documentos, metadatas in zip(data.get('ids', []), data.get('documents', []), data.get('metadatas', [])):
+        for chunk_id, doc, meta in zip(ids, documentos, metadatas):
+            conocidos[chunk_id] = (doc, meta or {})
+
+    indice = gestor_bm25.obtener(collection, CHROMA_PATH, version_coleccion())
+    seleccion = []
+    with medir("reranking"):
+        for consulta, ids_vector in zip(consultas, data.get('ids', [])):
+            ids_lexicos = [chunk_id for chunk_id, _ in indice.buscar(consulta, K_CANDIDATOS)]
+            seleccion.append(fusionar_rrf([ids_vector, ids_lexicos], k))
+
+    # Los chunks que solo aparecieron en el ranking léxico se traen en una sola llamada
+    faltantes = list({chunk_id for ids in seleccion for chunk_id in ids if chunk_id not in conocidos})
+    if faltantes:
+        with medir("busqueda_lexica_get"):
+            extra = collection.get(ids=faltantes, include=['documents', 'metadatas'])
+        for chunk_id, doc, meta in zip(extra.get('ids', []), extra.get('documents', []), extra.get('metadatas', [])):
+            conocidos[chunk_id] = (doc, meta or {})
+
+    return [
+        [Document(page_content=conocidos[i][0], metadata=conocidos[i][1]) for i in ids if i in conocidos]
+        for ids in seleccion
+    ]
+
+def _recuperar_docs(query, vector):
+    """Búsqueda híbrida y, si trae pocos resultados, complemento por metadata"""
     docs = []
     try:
-        # Si es pregunta de estadísticas, buscar con términos específicos
-        if es_pregunta_estadisticas:
-            docs = vector.similarity_search("ESTADISTICAS ECUADOR 2022 desercion abandono tasa estudiantes", k=10)
-        else:
-            docs = vector.similarity_search(query, k=5)
+        docs = buscar_hibrido([query], vector)[0]
     except Exception:
         pass
 
-    if not docs or len(docs) < 5:
-        try:
-            collection = getattr(vector, '_collection', None)
-            if collection is not None:
-                data = collection.get(include=['metadatas', 'documents'])
-                metadatas = data.get('metadatas', [])
-                documents = data.get('documents', [])
-
-                # Palabras clave para buscar en filenames
-                keywords = ['desercion', 'estadistica', 'sexo', '2022']
-                matched_indices = []
-                for i, m in enumerate(metadatas):
-                    if isinstance(m, dict):
-                        source = str(m.get('source', '')).lower().replace('ñ', 'n')
-                        if any(kw in source for kw in keywords):
-                            matched_indices.append(i)
-
-                # Agregar docs encontrados por metadata
-                if matched_indices:
-                    for i in matched_indices[:20]:
-                        docs.append(Document(page_content=documents[i], metadata=metadatas[i]))
-        except Exception:
-            pass
+    return _complementar_por_metadata(vector, docs)
 
-    if not docs:
-        llm_fallback = ChatGroq(
-            api_key=GROQ_API_KEY,
-            model_name=GROQ_MODELS.get(modelo, "llama-3.1-8b-instant"),
-            temperature=0.3
-        )
-        prompt_general = (
-            "Eres un asistente experto en educación y abandono estudiantil. "
-            "Responde la siguiente pregunta con tu conocimiento general. "
-            "Si la pregunta no está relacionada con educación, responde de manera útil y amigable.\n\n"
-            f"Pregunta: {query}\n\n"
-            "Respuesta:"
-        )
-        try:
-            resp = llm_fallback.invoke(prompt_general)
-            answer = getattr(resp, 'content', str(resp))
-        except Exception as e:
-            answer = f"Error al procesar: {e}"
+def _necesita_complemento(docs, minimo=K_CONTEXTO):
+    return not docs or len(docs) < minimo
 
-        return {
-            "result": answer,
-            "sources": [],
-            "metadata": {"docs_found": 0, "used_rag_context": False, "knowledge_type": "general"}
+def _docs_por_metadata(vector):
+    """Chunks encontrados por palabras clave en la metadata, en orden de la colección"""
+    try:
+        # Palabras clave para buscar en la metadata (lookup en el índice invertido)
+        keywords = ['desercion', 'estadistica', 'sexo', '2022']
+        with medir("fallback_metadata"):
+            matched_ids = buscar_ids_por_metadata(vector, keywords, limite=20)
+
+        # Traer solo los chunks encontrados por metadata
+        if not matched_ids:
+            return []
+        with medir("fallback_metadata_get"):
+            data = vector._collection.get(ids=matched_ids, include=['metadatas', 'documents'])
+        por_id = {
+            chunk_id: (doc, meta)
+            for chunk_id, doc, meta in zip(data.get('ids', []), data.get('documents', []), data.get('metadatas', []))
         }
+        return [
+            Document(page_content=por_id[chunk_id][0], metadata=por_id[chunk_id][1])
+            for chunk_id in matched_ids if chunk_id in por_id
+        ]
+    except Exception:
+        return []
 
-    # PRIORIZAR CSVs: separar docs CSV y otros, luego ordenar dando preferencia a CSVs
-    csv_docs = []
-    other_docs = []
-    for doc in docs:
-        meta = getattr(doc, 'metadata', None) or {}
-        source = str(meta.get('source', '')).lower() if isinstance(meta, dict) else ''
-        filename = source.split('/')[-1] if source else ''
-        is_csv = False
-        if isinstance(meta, dict) and str(meta.get('type', '')).lower() == 'csv':
-            is_csv = True
-        if filename.endswith('.csv') or source.endswith('.csv'):
-            is_csv = True
-        # También detectar si el contenido empieza con un header tipo 'Archivo: <name>.csv'
-        try:
-            pc = getattr(doc, 'page_content', '')
-            if not is_csv and isinstance(pc, str):
-                head = pc.strip()[:200].lower()
-                if head.startswith('archivo:') and '.csv' in head:
-                    is_csv = True
-        except Exception:
-            pass
-
-        if is_csv:
-            csv_docs.append(doc)
-        else:
-            other_docs.append(doc)
-
-    # Construir lista priorizada: CSVs primero, luego otros (limitar a 3 para tinyllama)
-    docs = (csv_docs + other_docs)[:3]
-
-    # FILTRAR documentos: priorizar los que contienen palabras clave
-    palabras_clave = ['desercion', 'abandono', 'tasa', 'estudiantes', 'matriculados']
-    docs_relevantes = []
-    for doc in docs:
-        content_lower = getattr(doc, 'page_content', '').lower()
-        coincidencias = sum(1 for kw in palabras_clave if kw in content_lower)
-        if coincidencias >= 1:
-            docs_relevantes.append((doc, coincidencias))
-
-    # Si hay docs con coincidencias, ordenar por coincidencias y tomar top 3
-    if docs_relevantes:
-        docs_relevantes.sort(key=lambda x: x[1], reverse=True)
-        docs_final = [doc for doc, _ in docs_relevantes[:3]]
-    else:
-        # fallback: tomar primeros 3 priorizados
-        docs_final = docs[:3]
+def _complementar_por_metadata(vector, docs, minimo=K_CONTEXTO, extra=None):
+    """
+    Si la búsqueda trajo menos de `minimo` docs, agrega chunks encontrados por metadata.
+    `extra` permite pasar esos chunks ya traídos (el lote los busca una sola vez).
+    """
+    if _necesita_complemento(docs, minimo):
+        docs.extend(_docs_por_metadata(vector) if extra is None else extra)
+
+    return docs
 
-    # Extraer fuentes únicas de los documentos utilizados
+def _fuentes_de(docs_final):
+    """Extrae los nombres de archivo únicos de los documentos utilizados"""
     sources = []
     for doc in docs_final:
         meta = getattr(doc, 'metadata', {}) or {}
@@ -249,9 +508,56 @@ def consultar(query, vector, modelo="llama3"):
                 filename = source.split('/')[-1].split('\\')[-1]
                 if filename not in sources:
                     sources.append(filename)
+    return sources
+
+def preparar_consulta(query, vector, modelo="llama3", docs=None, enrutada=False):
+    """
+    Ejecuta todas las etapas previas a la llamada al LLM: detección de estadísticas,
+    recuperación de documentos, priorización y armado del prompt.
+
+    Args:
+        query: La pregunta del usuario
+        vector: El vector de ChromaDB
+        modelo: El modelo de Groq a utilizar
+        docs: Documentos ya recuperados (si es None se buscan en el vector)
+        enrutada: True si quien llama ya pasó la pregunta por responder_directo (y no la resolvió)
+
+    Returns:
+        dict con keys:
+            resultado: respuesta final si no hace falta el LLM (CSV directo), si no None
+            llm, prompt, error: cliente, prompt y prefijo de error para la llamada al modelo
+            sources, docs_final, context, knowledge_type
+    """
+    # DETECCION TEMPRANA: si el router de intenciones reconoce la pregunta, se responde desde los CSVs
+    directo = None if enrutada else responder_directo(query)
+    if directo is not None:
+        return {"resultado": directo}
 
-    # Combinamos el contexto de los documentos (limitado para tinyllama)
-    context = "\n\n".join([getattr(doc, 'page_content', str(doc)) for doc in docs_final])[:1500]
+    if docs is None:
+        docs = _recuperar_docs(query, vector)
+
+    if not docs:
+        prompt_general = (
+            "Eres un asistente experto en educación y abandono estudiantil. "
+            "Responde la siguiente pregunta con tu conocimiento general. "
+            "Si la pregunta no está relacionada con educación, responde de manera útil y amigable.\n\n"
+            f"Pregunta: {query}\n\n"
+            "Respuesta:"
+        )
+        return {
+            "resultado": None,
+            "llm": obtener_llm(modelo, 0.3),
+            "prompt": prompt_general,
+            "error": "Error al procesar",
+            "sources": [],
+            "docs_final": [],
+            "context": "",
+            "knowledge_type": "general"
+        }
+
+    # Fusionamos chunks adyacentes, quitamos duplicados y empacamos hasta el presupuesto del modelo
+    inicio_prompt = time.perf_counter()
+    context, docs_final = empacar_contexto(docs[:K_EMPAQUE], TOKENS_CONTEXTO.get(modelo, TOKENS_CONTEXTO["llama3"]))
 
     # Creamos el prompt completo - Permite respuesta híbrida RAG + conocimiento general
     prompt_text = (
@@ -265,21 +571,29 @@ def consultar(query, vector, modelo="llama3"):
         f"Pregunta: {query}\n\n"
         "Respuesta:"
     )
+    duracion_etapas.observar(time.perf_counter() - inicio_prompt, etapa="armado_prompt")
 
-    # Ejecutamos la consulta con el LLM
-    answer = None
-    try:
-        resp = llm(prompt_text)
-        if isinstance(resp, str):
-            answer = resp
-        else:
-            answer = getattr(resp, 'content', str(resp))
-    except Exception:
-        try:
-            resp = llm.invoke(prompt_text)
-            answer = getattr(resp, 'content', str(resp))
-        except Exception as e:
-            answer = f"Error al invocar el modelo: {e}"
+    return {
+        "resultado": None,
+        "llm": obtener_llm(modelo, 0.0),
+        "prompt": prompt_text,
+        "error": "Error al invocar el modelo",
+        "sources": _fuentes_de(docs_final),
+        "docs_final": docs_final,
+        "context": context,
+        "knowledge_type": "rag"
+    }
+
+def completar_consulta(plan, answer, query):
+    """Arma el dict final (result, sources, metadata) a partir de la respuesta del LLM"""
+    if plan["knowledge_type"] == "general":
+        return {
+            "result": answer,
+            "sources": [],
+            "metadata": {"docs_found": 0, "used_rag_context": False, "knowledge_type": "general"}
+        }
+
+    docs_final = plan["docs_final"]
 
     # Solo usar fallback de CSVs si la respuesta está completamente vacía
     if isinstance(answer, str) and answer.strip() == "":
@@ -287,16 +601,16 @@ def consultar(query, vector, modelo="llama3"):
         if csv_ans:
             return {
                 "result": csv_ans,
-                "sources": ["resumen_general_desercion_2022.csv", "desercion_por_sexo.csv", "desercion_por_tipo_institucion.csv"],
+                "sources": list(CSV_ESTADISTICAS),
                 "metadata": {"fallback": True, "docs_found": len(docs_final)}
             }
 
     # Determinar si la respuesta usó contexto RAG o conocimiento general
-    used_rag_context = len(docs_final) > 0 and len(context.strip()) > 100
+    used_rag_context = len(docs_final) > 0 and len(plan["context"].strip()) > 100
 
     return {
         "result": answer,
-        "sources": sources,
+        "sources": plan["sources"],
         "metadata": {
             "docs_found": len(docs_final),
             "used_rag_context": used_rag_context,
@@ -305,17 +619,260 @@ def consultar(query, vector, modelo="llama3"):
         }
     }
 
-def generar_insights(vector, modelo="llama3"):
+def _consultar(query, vector, modelo="llama3"):
+    """Ejecuta la consulta RAG completa, sin pasar por la cache de respuestas (consultar() ya la enrutó)"""
+    plan = preparar_consulta(query, vector, modelo, enrutada=True)
+    if plan["resultado"] is not None:
+        return plan["resultado"]
+
+    # Ejecutamos la consulta con el LLM
+    try:
+        answer = _invocar_llm(plan)
+    except Exception as e:
+        answer = f"{plan['error']}: {e}"
+
+    return completar_consulta(plan, answer, query)
+
+def consultar_stream(query, vector, modelo="llama3"):
     """
-    Genera insights automáticos analizando todos los datos disponibles en el RAG
+    Variante en streaming de consultar().
+
+    Genera tuplas (evento, datos):
+        ("sources", list): fuentes recuperadas, antes de llamar al LLM
+        ("token", str): fragmentos de la respuesta a medida que llegan
+        ("final", dict): el mismo dict (result, sources, metadata) que devuelve consultar()
+    """
+    directo = responder_directo(query)
+    if directo is not None:
+        # Respuesta desde los CSVs: se envía en un solo token, sin cache ni embeddings
+        yield "sources", directo["sources"]
+        yield "token", directo["result"]
+        yield "final", directo
+        return
+
+    version = version_coleccion()
+    cacheado, embedding = _buscar_en_cache(query, vector, modelo, version)
+    plan = None if cacheado is not None else preparar_consulta(query, vector, modelo, enrutada=True)
+
+    resultado = cacheado if cacheado is not None else plan["resultado"]
+    if resultado is not None:
+        # Respuesta ya disponible (cache o CSV directo): se envía en un solo token
+        yield "sources", resultado.get("sources", [])
+        yield "token", resultado["result"]
+        yield "final", resultado
+        if cacheado is None:
+            _guardar_en_cache(query, modelo, version, resultado, embedding)
+        return
+
+    yield "sources", plan["sources"]
+
+    partes = []
+    modelo_groq = getattr(plan["llm"], "model_name", "")
+    inicio = time.perf_counter()
+    try:
+        for chunk in plan["llm"].stream(plan["prompt"]):
+            texto = getattr(chunk, 'content', str(chunk))
+            if texto:
+                if not partes:
+                    duracion_etapas.observar(time.perf_counter() - inicio, etapa="llm_primer_token", modelo=modelo_groq)
+                partes.append(texto)
+                yield "token", texto
+    except Exception as e:
+        error = f"{plan['error']}: {e}"
+        partes.append(error)
+        yield "token", error
+    duracion_etapas.observar(time.perf_counter() - inicio, etapa="llm_stream", modelo=modelo_groq)
+
+    answer = "".join(partes)
+    registrar_llm(plan["prompt"], answer, modelo=modelo_groq)
+    resultado = completar_consulta(plan, answer, query)
+    if resultado["result"] != answer:
+        # La respuesta vacía se reemplazó por la de los CSVs
+        yield "token", resultado["result"]
+    yield "final", resultado
+    _guardar_en_cache(query, modelo, version, resultado, embedding)
+
+def consultar_lote(preguntas, vector, modelo="llama3", max_concurrencia=4, usar_cache=True):
     """
+    Responde varias preguntas a la vez: un solo embedding por lote, una sola consulta
+    a ChromaDB con todos los vectores y llamadas al LLM concurrentes (acotadas).
 
-    modelo_groq = GROQ_MODELS.get(modelo, "llama-3.1-8b-instant")
-    llm = ChatGroq(
-        api_key=GROQ_API_KEY,
-        model_name=modelo_groq,
-        temperature=0.2
+    Args:
+        preguntas: Lista de preguntas
+        vector: El vector de ChromaDB
+        modelo: El modelo de Groq a utilizar
+        max_concurrencia: Máximo de llamadas simultáneas al LLM
+        usar_cache: Si consultar/guardar en la cache de respuestas
+
+    Returns:
+        lista (en el orden de entrada) de dicts con keys: success, pregunta y
+        result/sources/metadata o error
+    """
+    version = version_coleccion()
+    resultados = [None] * len(preguntas)
+    embeddings_cache = {}
+    candidatas = []
+
+    for i, pregunta in enumerate(preguntas):
+        if not isinstance(pregunta, str) or not pregunta.strip():
+            resultados[i] = {"success": False, "pregunta": pregunta, "error": "La pregunta no puede estar vacía"}
+            continue
+        # Las preguntas respondidas desde los CSVs no necesitan cache, búsqueda ni LLM
+        directo = responder_directo(pregunta)
+        if directo is not None:
+            resultados[i] = {"success": True, "pregunta": pregunta, **directo}
+            continue
+        candidatas.append(i)
+
+    # Un solo embedding por lote: lo usan la cache semántica y la búsqueda híbrida
+    vectores = {}
+    if candidatas:
+        try:
+            with medir("embedding"):
+                calculados = vector._embedding_function.embed_documents([preguntas[i] for i in candidatas])
+            vectores = dict(zip(candidatas, calculados))
+        except Exception as e:
+            print(f"Falló el embedding del lote de {len(candidatas)} preguntas: {e}")
+
+    pendientes = []
+    for i in candidatas:
+        if usar_cache:
+            cacheado, embedding = _buscar_en_cache(preguntas[i], vector, modelo, version, vectores.get(i))
+            if cacheado is not None:
+                resultados[i] = {"success": True, "pregunta": preguntas[i], **cacheado}
+                continue
+            embeddings_cache[i] = embedding
+        pendientes.append(i)
+
+    planes = {}
+    docs_por_pregunta = {}
+    if pendientes:
+        try:
+            lote = buscar_hibrido(
+                [preguntas[i] for i in pendientes], vector,
+                vectores=[vectores[i] for i in pendientes] if len(vectores) == len(candidatas) else None
+            )
+            docs_por_pregunta = dict(zip(pendientes, lote))
+        except Exception as e:
+            # Si falla la búsqueda del lote, se reintenta pregunta por pregunta
+            # para que un error no deje a todas sin contexto
+            print(f"Falló la búsqueda híbrida del lote de {len(pendientes)} preguntas: {e}")
+            for i in pendientes:
+                try:
+                    embedding = [vectores[i]] if i in vectores else None
+                    docs_por_pregunta[i] = buscar_hibrido([preguntas[i]], vector, vectores=embedding)[0]
+                except Exception as e_pregunta:
+                    resultados[i] = {"success": False, "pregunta": preguntas[i], "error": f"Error en la búsqueda: {e_pregunta}"}
+
+    # Los chunks de metadata son los mismos para todas las preguntas: se traen una sola vez
+    extra = None
+    if any(_necesita_complemento(docs) for docs in docs_por_pregunta.values()):
+        extra = _docs_por_metadata(vector)
+
+    for i, docs in docs_por_pregunta.items():
+        try:
+            docs = _complementar_por_metadata(vector, docs, extra=extra)
+            planes[i] = preparar_consulta(preguntas[i], vector, modelo, docs=docs, enrutada=True)
+        except Exception as e:
+            resultados[i] = {"success": False, "pregunta": preguntas[i], "error": str(e)}
+
+    def ejecutar(i):
+        plan = planes[i]
+        if plan["resultado"] is not None:
+            return plan["resultado"]
+        try:
+            answer = _invocar_llm(plan)
+        except Exception as e:
+            answer = f"{plan['error']}: {e}"
+        return completar_consulta(plan, answer, preguntas[i])
+
+    with ThreadPoolExecutor(max_workers=max(1, max_concurrencia)) as executor:
+        futuros = {i: executor.submit(ejecutar, i) for i in planes}
+        for i, futuro in futuros.items():
+            try:
+                resultado = futuro.result()
+            except Exception as e:
+                resultados[i] = {"success": False, "pregunta": preguntas[i], "error": str(e)}
+                continue
+            if usar_cache:
+                _guardar_en_cache(preguntas[i], modelo, version, resultado, embeddings_cache.get(i))
+            resultados[i] = {"success": True, "pregunta": preguntas[i], **resultado}
+
+    return resultados
+
+async def consultar_async(query, vector, modelo="llama3", limitador=None):
+    """
+    Variante asíncrona de consultar() para el servidor ASGI.
+    Embedding y búsqueda corren en un hilo; la llamada a Groq es nativa async
+    y, si se pasa `limitador` (context manager async), queda acotada por él.
+    """
+    directo = responder_directo(query)
+    if directo is not None:
+        return _contar_consulta(directo)
+
+    version = version_coleccion()
+    resultado, compartido = await consultas_en_vuelo.ejecutar_async(
+        (normalizar_pregunta(query), modelo, version, True),
+        lambda: _consultar_con_cache_async(query, vector, modelo, version, limitador)
     )
+    if compartido:
+        resultado = _marcar_compartido(resultado)
+    return _contar_consulta(resultado)
+
+async def _consultar_con_cache_async(query, vector, modelo, version, limitador=None):
+    cacheado, embedding = await asyncio.to_thread(_buscar_en_cache, query, vector, modelo, version)
+    if cacheado is not None:
+        return cacheado
+
+    plan = await asyncio.to_thread(preparar_consulta, query, vector, modelo, enrutada=True)
+    if plan["resultado"] is not None:
+        resultado = plan["resultado"]
+    else:
+        try:
+            answer = await _invocar_llm_async(plan, limitador)
+        except LLMSaturado:
+            raise
+        except Exception as e:
+            answer = f"{plan['error']}: {e}"
+        resultado = completar_consulta(plan, answer, query)
+
+    _guardar_en_cache(query, modelo, version, resultado, embedding)
+    return resultado
+
+def generar_insights(vector, modelo="llama3"):
+    """
+    Genera insights automáticos analizando todos los datos disponibles en el RAG.
+    Las llamadas concurrentes para el mismo modelo y versión comparten una sola generación.
+    """
+    resultado, _ = insights_en_vuelo.ejecutar(
+        (modelo, version_coleccion()),
+        lambda: _generar_insights(vector, modelo)
+    )
+    return resultado
+
+def _generar_insights(vector, modelo="llama3"):
+    plan = preparar_insights(vector, modelo)
+    if plan["resultado"] is not None:
+        return plan["resultado"]
+
+    try:
+        answer = _invocar_llm(plan, etapa="insights_llm")
+        return completar_insights(answer, plan["docs"])
+    except Exception as e:
+        return {
+            "success": False,
+            "insights": [],
+            "error": str(e)
+        }
+
+def preparar_insights(vector, modelo="llama3"):
+    """
+    Selecciona los documentos y arma el prompt de insights, sin llamar al LLM
+
+    Returns:
+        dict con keys: resultado (error si no hay datos, si no None), llm, prompt, docs
+    """
+    llm = obtener_llm(modelo, 0.2)
 
     # Obtener documentos globales del RAG (no dependiente de query)
     try:
@@ -323,7 +880,8 @@ def generar_insights(vector, modelo="llama3"):
         if collection is None:
             docs = []
         else:
-            data = collection.get(include=["documents", "metadatas"])
+            with medir("insights_escaneo"):
+                data = collection.get(include=["documents", "metadatas"])
             raw_docs = zip(
             data.get("documents", []),
             data.get("metadatas", [])
@@ -348,9 +906,11 @@ def generar_insights(vector, modelo="llama3"):
 
     if not docs:
         return {
-            "success": False,
-            "insights": [],
-            "error": "No hay suficientes datos para generar insights"
+            "resultado": {
+                "success": False,
+                "insights": [],
+                "error": "No hay suficientes datos para generar insights"
+            }
         }
 
     # Combinar contexto
@@ -371,129 +931,33 @@ Responde con exactamente 3 hallazgos, uno por línea, numerados 1., 2., 3.
 
 Hallazgos:"""
 
-    try:
-        resp = llm.invoke(prompt)
-        answer = getattr(resp, 'content', str(resp))
-
-        # Parsear insights
-        lines = [l.strip() for l in answer.split('\n') if l.strip()]
-        insights = []
-        for line in lines:
-            # Remover numeración si existe
-            clean = re.sub(r'^\d+[\.\)]\s*', '', line)
-            if clean and len(clean) > 20:
-                insights.append(clean)
+    return {"resultado": None, "llm": llm, "prompt": prompt, "docs": docs}
 
-        return {
-            "success": True,
-            "insights": insights[:3],
-            "sources": list(set([getattr(doc, 'metadata', {}).get('source', '').split('/')[-1] for doc in docs if getattr(doc, 'metadata', {}).get('source')]))
-        }
-    except Exception as e:
-        return {
-            "success": False,
-            "insights": [],
-            "error": str(e)
-        }
+def completar_insights(answer, docs):
+    """Parsea la respuesta del LLM en una lista de insights"""
+    # Parsear insights
+    lines = [l.strip() for l in answer.split('\n') if l.strip()]
+    insights = []
+    for line in lines:
+        # Remover numeración si existe
+        clean = re.sub(r'^\d+[\.\)]\s*', '', line)
+        if clean and len(clean) > 20:
+            insights.append(clean)
+
+    return {
+        "success": True,
+        "insights": insights[:3],
+        "sources": list(set([getattr(doc, 'metadata', {}).get('source', '').split('/')[-1] for doc in docs if getattr(doc, 'metadata', {}).get('source')]))
+    }
 
 def answer_from_csvs(query):
-    """Responde consultas sobre estadísticas de Ecuador directamente desde los CSVs procesados."""
-    base = "../data/processed/estadisticas_ecuador"
+    """Responde consultas sobre estadísticas de Ecuador desde las tablas residentes de los CSVs procesados."""
     try:
-        resumen_path = os.path.join(base, "resumen_general_desercion_2022.csv")
-        sexo_path = os.path.join(base, "desercion_por_sexo.csv")
-        tipo_path = os.path.join(base, "desercion_por_tipo_institucion.csv")
-
-        q = query.lower()
-
-        # Tasa de deserción general
-        if re.search(r"tasa|porcentaje", q) and re.search(r"desercion|deserción|abandon", q):
-            if os.path.exists(resumen_path):
-                df = pd.read_csv(resumen_path)
-                if 'Indicador' in df.columns and 'Valor' in df.columns:
-                    # Buscar tasa de deserción
-                    row_tasa = df[df['Indicador'].str.contains('Tasa de Deserción', case=False, na=False)]
-                    row_total = df[df['Indicador'].str.contains('Total Estudiantes Matriculados', case=False, na=False)]
-                    row_abandon = df[df['Indicador'].str.contains('Total Estudiantes que Abandonaron', case=False, na=False)]
-
-                    respuesta = "Según los datos de Ecuador 2022:\n"
-                    if not row_tasa.empty:
-                        respuesta += f"- Tasa de Deserción: {row_tasa['Valor'].iloc[0]}%\n"
-                    if not row_total.empty:
-                        respuesta += f"- Total Estudiantes Matriculados: {int(row_total['Valor'].iloc[0]):,}\n"
-                    if not row_abandon.empty:
-                        respuesta += f"- Total Estudiantes que Abandonaron: {int(row_abandon['Valor'].iloc[0]):,}\n"
-
-                    row_ret = df[df['Indicador'].str.contains('Tasa de Retención', case=False, na=False)]
-                    if not row_ret.empty:
-                        respuesta += f"- Tasa de Retención: {row_ret['Valor'].iloc[0]}%"
-
-                    return respuesta
-
-        # Total abandonaron
-        if re.search(r"cuant[oa]|cuánt[oa]|numero|número|total", q) and re.search(r"abandon|desercion|deserción", q):
-            if os.path.exists(resumen_path):
-                df = pd.read_csv(resumen_path)
-                if 'Indicador' in df.columns and 'Valor' in df.columns:
-                    row = df[df['Indicador'].str.contains('Total Estudiantes que Abandonaron', case=False, na=False)]
-                    if not row.empty:
-                        val = int(row['Valor'].iloc[0])
-                        row_total = df[df['Indicador'].str.contains('Total Estudiantes Matriculados', case=False, na=False)]
-                        total = int(row_total['Valor'].iloc[0]) if not row_total.empty else None
-                        if total:
-                            return f"En Ecuador 2022, abandonaron {val:,} estudiantes de un total de {total:,} matriculados."
-                        return f"En Ecuador 2022, abandonaron {val:,} estudiantes."
-                return "No pude leer el resumen de abandono correctamente."
-
-        # Desercion por sexo
-        if 'sexo' in q or 'mujer' in q or 'hombre' in q or 'genero' in q or 'género' in q:
-            if os.path.exists(sexo_path):
-                df = pd.read_csv(sexo_path)
-                lines = ["Deserción por sexo en Ecuador 2022:"]
-                for _, r in df.iterrows():
-                    s = r.iloc[0]
-                    aban = r.iloc[1]
-                    total = r.iloc[2] if len(r) > 2 else None
-                    tasa = r.iloc[3] if len(r) > 3 else None
-                    if tasa:
-                        lines.append(f"- {s}: {int(aban):,} abandonaron de {int(total):,} matriculados (tasa: {tasa}%)")
-                    else:
-                        lines.append(f"- {s}: {int(aban):,} abandonaron")
-                return "\n".join(lines)
-
-        # Desercion por tipo de institucion
-        if 'tipo' in q or 'institucion' in q or 'institución' in q:
-            if os.path.exists(tipo_path):
-                df = pd.read_csv(tipo_path)
-                lines = ["Deserción por tipo de institución en Ecuador 2022:"]
-                for _, r in df.iterrows():
-                    lines.append("- " + " - ".join([str(x) for x in r.values]))
-                return "\n".join(lines[:20])
-
-        # Pregunta general sobre estadísticas Ecuador
-        if 'ecuador' in q or '2022' in q:
-            if os.path.exists(resumen_path):
-                df = pd.read_csv(resumen_path)
-                if 'Indicador' in df.columns and 'Valor' in df.columns:
-                    respuesta = "Resumen de deserción estudiantil en Ecuador 2022:\n"
-                    for _, row in df.iterrows():
-                        indicador = row['Indicador']
-                        valor = row['Valor']
-                        if pd.notna(valor):
-                            if 'Tasa' in indicador or '%' in str(indicador):
-                                respuesta += f"- {indicador}: {valor}%\n"
-                            else:
-                                try:
-                                    respuesta += f"- {indicador}: {int(valor):,}\n"
-                                except ValueError:
-                                    respuesta += f"- {indicador}: {valor}\n"
-                    return respuesta.strip()
-
+        with medir("respuesta_csv"):
+            return responder_estadisticas(query)
     except Exception as e:
         return f"Error leyendo CSVs: {e}"
 
-    return None
-
 def main():
     """Función principal para ejecución CLI"""
     parser = argparse.ArgumentParser(description="Consulta documentos procesados usando RAG")
@@ -0,0 +1,225 @@
+'''
+Tablas de estadísticas de Ecuador 2022 residentes en memoria
+Los CSVs procesados se leen una sola vez y se recargan solo si cambia su mtime.
+Las respuestas se arman desde estructuras simples, sin pandas en el camino de la consulta.
+'''
+import csv
+import os
+import threading
+
+from rag_intenciones import normalizar, router_intenciones
+
+ESTADISTICAS_PATH = "../data/processed/estadisticas_ecuador"
+RESUMEN_CSV = "resumen_general_desercion_2022.csv"
+SEXO_CSV = "desercion_por_sexo.csv"
+TIPO_CSV = "desercion_por_tipo_institucion.csv"
+
+def _numero(valor):
+    """Convierte un texto del CSV a int o float; si no es número lo deja como texto"""
+    valor = valor.strip()
+    try:
+        return int(valor)
+    except ValueError:
+        pass
+    try:
+        return float(valor)
+    except ValueError:
+        return valor
+
+def _leer_filas(ruta):
+    with open(ruta, 'r', encoding='utf-8-sig', newline='') as f:
+        lector = csv.reader(f)
+        encabezado = next(lector, [])
+        filas = [[_numero(v) for v in fila] for fila in lector if fila]
+    return encabezado, filas
+
+class TablasEstadisticas:
+    """
+    Mantiene en memoria el resumen general, la deserción por sexo y por tipo de institución.
+
+    - resumen: dict Indicador -> Valor (en orden del CSV)
+    - indicadores: accesos directos (tasa, matriculados, abandonaron, retencion)
+    - sexo / tipo: listas de filas ya convertidas a números
+    """
+
+    def __init__(self, base=ESTADISTICAS_PATH):
+        self.base = base
+        self._lock = threading.Lock()
+        self._mtimes = None
+        self._respuestas = {}
+        self.resumen = None
+        self.indicadores = {}
+        self.sexo = None
+        self.tipo = None
+
+    def _ruta(self, nombre):
+        return os.path.join(self.base, nombre)
+
+    def _mtimes_actuales(self):
+        mtimes = []
+        for nombre in (RESUMEN_CSV, SEXO_CSV, TIPO_CSV):
+            try:
+                mtimes.append(os.stat(self._ruta(nombre)).st_mtime_ns)
+            except OSError:
+                mtimes.append(None)
+        return tuple(mtimes)
+
+    def actualizar(self):
+        """Recarga las tablas solo si alguno de los CSVs cambió (o apareció/desapareció)"""
+        mtimes = self._mtimes_actuales()
+        if mtimes == self._mtimes:
+            return
+        with self._lock:
+            if mtimes == self._mtimes:
+                return
+            self._cargar(mtimes)
+
+    def _cargar(self, mtimes):
+        resumen = None
+        indicadores = {}
+        if mtimes[0] is not None:
+            encabezado, filas = _leer_filas(self._ruta(RESUMEN_CSV))
+            if 'Indicador' in encabezado and 'Valor' in encabezado:
+                i_ind, i_val = encabezado.index('Indicador'), encabezado.index('Valor')
+                resumen = {}
+                for fila in filas:
+                    if len(fila) > max(i_ind, i_val):
+                        resumen[str(fila[i_ind])] = fila[i_val]
+
+                buscados = {
+                    "tasa": 'tasa de deserción',
+                    "matriculados": 'total estudiantes matriculados',
+                    "abandonaron": 'total estudiantes que abandonaron',
+                    "retencion": 'tasa de retención'
+                }
+                for clave, texto in buscados.items():
+                    for indicador, valor in resumen.items():
+                        if texto in indicador.lower():
+                            indicadores[clave] = valor
+                            break
+
+        sexo = _leer_filas(self._ruta(SEXO_CSV))[1] if mtimes[1] is not None else None
+        tipo = _leer_filas(self._ruta(TIPO_CSV))[1] if mtimes[2] is not None else None
+
+        self.resumen, self.indicadores, self.sexo, self.tipo = resumen, indicadores, sexo, tipo
+        self._respuestas = {}
+        self._mtimes = mtimes
+
+    def respuesta(self, clave, construir):
+        """Devuelve la respuesta ya renderizada para `clave`, construyéndola una vez por versión de las tablas"""
+        self.actualizar()
+        respuestas = self._respuestas
+        if clave not in respuestas:
+            respuestas[clave] = construir(self)
+        return respuestas[clave]
+
+def _texto_tasa(t, slots=None):
+    if t.resumen is None:
+        return None
+    ind = t.indicadores
+    respuesta = "Según los datos de Ecuador 2022:\n"
+    if "tasa" in ind:
+        respuesta += f"- Tasa de Deserción: {ind['tasa']}%\n"
+    if "matriculados" in ind:
+        respuesta += f"- Total Estudiantes Matriculados: {int(ind['matriculados']):,}\n"
+    if "abandonaron" in ind:
+        respuesta += f"- Total Estudiantes que Abandonaron: {int(ind['abandonaron']):,}\n"
+    if "retencion" in ind:
+        respuesta += f"- Tasa de Retención: {ind['retencion']}%"
+    return respuesta
+
+def _texto_total(t, slots=None):
+    if t.resumen is None:
+        return None
+    ind = t.indicadores
+    if "abandonaron" not in ind:
+        return "No pude leer el resumen de abandono correctamente."
+    val = int(ind["abandonaron"])
+    total = int(ind["matriculados"]) if "matriculados" in ind else None
+    if total:
+        return f"En Ecuador 2022, abandonaron {val:,} estudiantes de un total de {total:,} matriculados."
+    return f"En Ecuador 2022, abandonaron {val:,} estudiantes."
+
+def _filtrar(filas, valor):
+    """Filas cuya primera columna coincide con el slot (sin acentos); todas si no hay coincidencias"""
+    if not valor:
+        return filas
+    elegidas = [r for r in filas if normalizar(r[0]).upper() == valor]
+    return elegidas or filas
+
+def _texto_sexo(t, slots=None):
+    if t.sexo is None:
+        return None
+    lines = ["Deserción por sexo en Ecuador 2022:"]
+    for r in _filtrar(t.sexo, (slots or {}).get("sexo")):
+        s = r[0]
+        aban = r[1]
+        total = r[2] if len(r) > 2 else None
+        tasa = r[3] if len(r) > 3 else None
+        if tasa:
+            lines.append(f"- {s}: {int(aban):,} abandonaron de {int(total):,} matriculados (tasa: {tasa}%)")
+        else:
+            lines.append(f"- {s}: {int(aban):,} abandonaron")
+    return "\n".join(lines)
+
+def _texto_tipo(t, slots=None):
+    if t.tipo is None:
+        return None
+    lines = ["Deserción por tipo de institución en Ecuador 2022:"]
+    for r in _filtrar(t.tipo, (slots or {}).get("tipo_institucion")):
+        lines.append("- " + " - ".join([str(x) for x in r]))
+    return "\n".join(lines[:20])
+
+def _texto_resumen(t, slots=None):
+    if t.resumen is None:
+        return None
+    respuesta = "Resumen de deserción estudiantil en Ecuador 2022:\n"
+    for indicador, valor in t.resumen.items():
+        if valor == '':
+            continue
+        if 'Tasa' in indicador or '%' in str(indicador):
+            respuesta += f"- {indicador}: {valor}%\n"
+        else:
+            try:
+                respuesta += f"- {indicador}: {int(valor):,}\n"
+            except ValueError:
+                respuesta += f"- {indicador}: {valor}\n"
+    return respuesta.strip()
+
+RESPUESTAS = {
+    "tasa": _texto_tasa,
+    "total": _texto_total,
+    "sexo": _texto_sexo,
+    "tipo": _texto_tipo,
+    "resumen": _texto_resumen
+}
+
+# Tablas compartidas por el proceso
+tablas_estadisticas = TablasEstadisticas()
+
+# Slots que cambian la respuesta de cada intención (forman parte de la clave memoizada)
+SLOTS_POR_INTENCION = {
+    "sexo": ("sexo",),
+    "tipo": ("tipo_institucion",)
+}
+
+def responder_estadisticas(query, tablas=tablas_estadisticas, router=router_intenciones):
+    """
+    Responde consultas sobre estadísticas de Ecuador desde las tablas en memoria.
+    El router de intenciones decide qué tabla usar; se toma la primera intención
+    (en orden de prioridad) cuya tabla esté disponible.
+
+    Returns:
+        str con la respuesta, o None si la pregunta no corresponde a estas tablas
+    """
+    for ruta in router.enrutar(query):
+        intencion = ruta["intencion"]
+        construir = RESPUESTAS.get(intencion)
+        if construir is None:
+            continue
+        slots = {s: ruta["slots"][s] for s in SLOTS_POR_INTENCION.get(intencion, ()) if s in ruta["slots"]}
+        clave = (intencion,) + tuple(sorted(slots.items()))
+        respuesta = tablas.respuesta(clave, lambda t: construir(t, slots))
+        if respuesta is not None:
+            return respuesta
+    return None
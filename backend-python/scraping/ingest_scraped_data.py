@@ -3,16 +3,25 @@ Script de Ingesta de Datos Scraped a ChromaDB
 Procesa y almacena papers y recursos en la base de conocimiento RAG
 """
 import os
+import sys
 import json
 import logging
 from pathlib import Path
-from typing import List, Dict
+from typing import Dict, Iterable, Iterator, List
 import chromadb
 from chromadb.config import Settings
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_core.documents import Document
 from datetime import datetime
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'rag'))
+from rag_catalogo import publicar_version, registrar_chunks, reiniciar_catalogo, version_catalogo
+from rag_hibrido import construir_bm25_desde_coleccion
+from rag_embeddings import asegurar_embeddings, crear_embeddings
+from rag_manifiesto import borrar_manifiesto
+from rag_escritor import EscritorEmbeddings, escritor_de_coleccion
+from rag_npstore import ColeccionNumpy, backend_vectorstore, escritura_diferida, ruta_npstore
+
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(levelname)s - %(message)s'
@@ -44,17 +53,26 @@ class ScrapedDataIngestor:
         # Crear directorio de ChromaDB
         self.chroma_dir.mkdir(parents=True, exist_ok=True)
         
-        # Inicializar ChromaDB
-        self.client = chromadb.PersistentClient(
-            path=str(self.chroma_dir),
-            settings=Settings(anonymized_telemetry=False)
-        )
+        if backend_vectorstore() == "numpy":
+            # Store NumPy memory-mapped (RAG_VECTORSTORE=numpy), con la misma API de colección
+            self.client = None
+            self.collection = ColeccionNumpy(ruta_npstore(self.chroma_dir))
+        else:
+            # Inicializar ChromaDB
+            self.client = chromadb.PersistentClient(
+                path=str(self.chroma_dir),
+                settings=Settings(anonymized_telemetry=False)
+            )
+            
+            # Crear o obtener colección
+            self.collection = self.client.get_or_create_collection(
+                name=self.collection_name,
+                metadata={"description": "Knowledge base for student dropout RAG system"}
+            )
         
-        # Crear o obtener colección
-        self.collection = self.client.get_or_create_collection(
-            name=self.collection_name,
-            metadata={"description": "Knowledge base for student dropout RAG system"}
-        )
+        # Mismo proveedor de embeddings que rag_ingest y rag_query (no el de Chroma por defecto)
+        self.embeddings = crear_embeddings()
+        self._embeddings_verificados = False
         
         # Configurar text splitter
         self.text_splitter = RecursiveCharacterTextSplitter(
@@ -83,10 +101,36 @@ class ScrapedDataIngestor:
             with open(filepath, 'r', encoding='utf-8') as f:
                 papers = json.load(f)
             
-            documents = []
-            for i, paper in enumerate(papers):
-                # Crear contenido del documento
-                content = f"""
+            # Dividir paper por paper a medida que se embeben, sin armar todos los chunks antes
+            chunks = (
+                chunk
+                for doc in self._paper_documents(papers)
+                for chunk in self.text_splitter.split_documents([doc])
+            )
+            
+            # Agregar a ChromaDB
+            total_chunks = self._add_chunks_to_collection(chunks, source='academic_papers')
+            
+            logger.info(f"✅ {len(papers)} papers → {total_chunks} chunks ingestados")
+            return total_chunks
+            
+        except Exception as e:
+            logger.error(f"❌ Error al ingestar papers: {e}")
+            return 0
+    
+    def _paper_documents(self, papers: List[Dict]) -> Iterator[Document]:
+        """
+        Genera un documento por paper
+        
+        Args:
+            papers: Papers leídos del JSON
+            
+        Returns:
+            Generador de documentos con metadata
+        """
+        for paper in papers:
+            # Crear contenido del documento
+            content = f"""
 Título: {paper.get('title', 'N/A')}
 
 Autores: {', '.join(paper.get('authors', []))}
@@ -101,34 +145,21 @@ Venue: {paper.get('venue', 'N/A')}
 
 URL: {paper.get('url', 'N/A')}
 """
-                
-                # Crear documento con metadata
-                doc = Document(
-                    page_content=content,
-                    metadata={
-                        'source': 'academic_papers',
-                        'type': 'academic_paper',
-                        'title': paper.get('title', 'N/A'),
-                        'year': str(paper.get('year', 'N/A')),
-                        'citations': paper.get('citations', 0),
-                        'query': paper.get('query', ''),
-                        'ingested_at': datetime.now().isoformat()
-                    }
-                )
-                documents.append(doc)
             
-            # Dividir en chunks
-            chunks = self.text_splitter.split_documents(documents)
-            
-            # Agregar a ChromaDB
-            self._add_chunks_to_collection(chunks, source='academic_papers')
-            
-            logger.info(f"✅ {len(papers)} papers → {len(chunks)} chunks ingestados")
-            return len(chunks)
-            
-        except Exception as e:
-            logger.error(f"❌ Error al ingestar papers: {e}")
-            return 0
+            # Crear documento con metadata
+            doc = Document(
+                page_content=content,
+                metadata={
+                    'source': 'academic_papers',
+                    'type': 'academic_paper',
+                    'title': paper.get('title', 'N/A'),
+                    'year': str(paper.get('year', 'N/A')),
+                    'citations': paper.get('citations', 0),
+                    'query': paper.get('query', ''),
+                    'ingested_at': datetime.now().isoformat()
+                }
+            )
+            yield doc
     
     def ingest_text_file(self, filepath: str, source_type: str, doc_type: str) -> int:
         """
@@ -163,36 +194,50 @@ URL: {paper.get('url', 'N/A')}
             chunks = self.text_splitter.split_documents([doc])
             
             # Agregar a ChromaDB
-            self._add_chunks_to_collection(chunks, source=source_type)
+            total_chunks = self._add_chunks_to_collection(chunks, source=source_type)
             
-            logger.info(f"✅ {len(chunks)} chunks ingestados desde {source_type}")
-            return len(chunks)
+            logger.info(f"✅ {total_chunks} chunks ingestados desde {source_type}")
+            return total_chunks
             
         except Exception as e:
             logger.error(f"❌ Error al ingestar {source_type}: {e}")
             return 0
     
-    def _add_chunks_to_collection(self, chunks: List[Document], source: str):
+    def _add_chunks_to_collection(self, chunks: Iterable[Document], source: str) -> int:
         """
-        Agrega chunks a la colección de ChromaDB
+        Agrega chunks a la colección de ChromaDB en lotes acotados, embebiendo
+        varios lotes a la vez mientras se escriben los que ya terminaron
         
         Args:
-            chunks: Lista de documentos chunkeados
+            chunks: Documentos chunkeados (lista o generador)
             source: Fuente de los documentos
+            
+        Returns:
+            Número de chunks agregados
         """
+        # No mezclar vectores de otro modelo en la misma colección
+        if not self._embeddings_verificados:
+            asegurar_embeddings(self.chroma_dir, self.embeddings, coleccion_vacia=self.collection.count() == 0)
+            self._embeddings_verificados = True
+        
         # Preparar datos para ChromaDB
-        ids = [f"{source}_{i}_{datetime.now().timestamp()}" for i in range(len(chunks))]
-        documents = [chunk.page_content for chunk in chunks]
-        metadatas = [chunk.metadata for chunk in chunks]
-        
-        # Agregar a la colección
-        self.collection.add(
-            ids=ids,
-            documents=documents,
-            metadatas=metadatas
+        marca = datetime.now().timestamp()
+        items = (
+            (f"{source}_{i}_{marca}", chunk.page_content, chunk.metadata)
+            for i, chunk in enumerate(chunks)
+        )
+        
+        # Mantener al día los conteos por fuente que sirve /api/rag/stats (solo ids nuevos)
+        escribir = escritor_de_coleccion(
+            self.collection,
+            al_insertar=lambda metadatas: registrar_chunks(self.chroma_dir, metadatas, publicar=False)
         )
+        escritor = EscritorEmbeddings(self.embeddings, escribir, intervalo_progreso=0)
+        estadisticas = escritor.ejecutar(items)
         
-        logger.info(f"   └─ Agregados {len(chunks)} chunks a ChromaDB")
+        logger.info(f"   └─ Agregados {estadisticas['chunks']} chunks a ChromaDB "
+                    f"({estadisticas['chunks_por_segundo']} chunks/s)")
+        return estadisticas['chunks']
     
     def ingest_all(self, clear_collection: bool = True) -> Dict[str, int]:
         """
@@ -208,65 +253,81 @@ URL: {paper.get('url', 'N/A')}
         logger.info("🚀 INICIANDO INGESTA DE DATOS SCRAPED A CHROMADB")
         logger.info("="*80)
         
-        # Limpiar colección si se solicita
-        if clear_collection:
-            logger.info("🧹 Limpiando colección existente...")
-            try:
-                # Obtener todos los IDs y eliminarlos
-                all_docs = self.collection.get()
-                if all_docs['ids']:
-                    self.collection.delete(ids=all_docs['ids'])
-                    logger.info(f"✅ Eliminados {len(all_docs['ids'])} documentos existentes")
-                else:
-                    logger.info("✅ Colección ya estaba vacía")
-            except Exception as e:
-                logger.warning(f"⚠️  No se pudo limpiar colección: {e}")
-        
-        results = {}
-        
-        # 1. Papers académicos (JSON)
-        papers_file = self.papers_dir / 'papers_desercion.json'
-        if papers_file.exists():
-            results['academic_papers'] = self.ingest_papers_json(str(papers_file))
-        else:
-            logger.warning(f"⚠️  No encontrado: {papers_file}")
-            results['academic_papers'] = 0
-        
-        # 2. Repositorios ecuatorianos (TXT)
-        repos_file = self.papers_dir / 'repositorios_ecuador.txt'
-        if repos_file.exists():
-            results['repositorios'] = self.ingest_text_file(
-                str(repos_file), 
-                'repositorios_ecuador', 
-                'institutional_document'
-            )
-        else:
-            logger.warning(f"⚠️  No encontrado: {repos_file}")
-            results['repositorios'] = 0
-        
-        # 3. Políticas de becas (TXT)
-        becas_file = self.papers_dir / 'politicas_becas.txt'
-        if becas_file.exists():
-            results['becas'] = self.ingest_text_file(
-                str(becas_file), 
-                'politicas_becas', 
-                'scholarship_policy'
-            )
-        else:
-            logger.warning(f"⚠️  No encontrado: {becas_file}")
-            results['becas'] = 0
-        
-        # 4. Recursos de orientación (TXT)
-        recursos_file = self.papers_dir / 'recursos_orientacion.txt'
-        if recursos_file.exists():
-            results['recursos'] = self.ingest_text_file(
-                str(recursos_file), 
-                'recursos_educativos', 
-                'educational_resource'
-            )
-        else:
-            logger.warning(f"⚠️  No encontrado: {recursos_file}")
-            results['recursos'] = 0
+        # En el store NumPy, ids y metadata se guardan una sola vez al terminar
+        with escritura_diferida(self.collection):
+            # Limpiar colección si se solicita
+            if clear_collection:
+                logger.info("🧹 Limpiando colección existente...")
+                try:
+                    # Obtener todos los IDs y eliminarlos
+                    all_docs = self.collection.get()
+                    if all_docs['ids']:
+                        self.collection.delete(ids=all_docs['ids'])
+                        reiniciar_catalogo(self.chroma_dir, publicar=False)
+                        logger.info(f"✅ Eliminados {len(all_docs['ids'])} documentos existentes")
+                    else:
+                        logger.info("✅ Colección ya estaba vacía")
+                    # El manifiesto de rag_ingest ya no describe la colección: sin él, la
+                    # próxima ingesta incremental vuelve a cargar todos los documentos
+                    borrar_manifiesto(self.chroma_dir)
+                except Exception as e:
+                    logger.warning(f"⚠️  No se pudo limpiar colección: {e}")
+        
+            results = {}
+        
+            # 1. Papers académicos (JSON)
+            papers_file = self.papers_dir / 'papers_desercion.json'
+            if papers_file.exists():
+                results['academic_papers'] = self.ingest_papers_json(str(papers_file))
+            else:
+                logger.warning(f"⚠️  No encontrado: {papers_file}")
+                results['academic_papers'] = 0
+        
+            # 2. Repositorios ecuatorianos (TXT)
+            repos_file = self.papers_dir / 'repositorios_ecuador.txt'
+            if repos_file.exists():
+                results['repositorios'] = self.ingest_text_file(
+                    str(repos_file), 
+                    'repositorios_ecuador', 
+                    'institutional_document'
+                )
+            else:
+                logger.warning(f"⚠️  No encontrado: {repos_file}")
+                results['repositorios'] = 0
+        
+            # 3. Políticas de becas (TXT)
+            becas_file = self.papers_dir / 'politicas_becas.txt'
+            if becas_file.exists():
+                results['becas'] = self.ingest_text_file(
+                    str(becas_file), 
+                    'politicas_becas', 
+                    'scholarship_policy'
+                )
+            else:
+                logger.warning(f"⚠️  No encontrado: {becas_file}")
+                results['becas'] = 0
+        
+            # 4. Recursos de orientación (TXT)
+            recursos_file = self.papers_dir / 'recursos_orientacion.txt'
+            if recursos_file.exists():
+                results['recursos'] = self.ingest_text_file(
+                    str(recursos_file), 
+                    'recursos_educativos', 
+                    'educational_resource'
+                )
+            else:
+                logger.warning(f"⚠️  No encontrado: {recursos_file}")
+                results['recursos'] = 0
+
+        # Reconstruir el índice BM25 de la recuperación híbrida con la versión nueva
+        # y publicarla una sola vez, ya con la colección completa
+        version = version_catalogo(self.chroma_dir) + 1
+        try:
+            construir_bm25_desde_coleccion(self.collection, self.chroma_dir, version)
+            logger.info("✅ Índice BM25 actualizado")
+        except Exception as e:
+            logger.warning(f"⚠️  No se pudo actualizar el índice BM25: {e}")
+        publicar_version(self.chroma_dir, version)
         
         # Mostrar resumen
         self._print_ingestion_summary(results)
@@ -304,7 +365,7 @@ URL: {paper.get('url', 'N/A')}
         
         try:
             results = self.collection.query(
-                query_texts=[query],
+                query_embeddings=[self.embeddings.embed_query(query)],
                 n_results=n_results
             )
             
@@ -339,7 +400,7 @@ URL: {paper.get('url', 'N/A')}
         try:
             # Primero buscar en fuentes preferidas
             results = self.collection.query(
-                query_texts=[query],
+                query_embeddings=[self.embeddings.embed_query(query)],
                 n_results=n_results * 2,  # Más resultados para tener opciones
                 where={"source": {"$in": preferred_sources}}
             )
@@ -355,7 +416,7 @@ URL: {paper.get('url', 'N/A')}
                 # Si no hay resultados en fuentes preferidas, buscar en todas las fuentes
                 logger.info(f"\n⚠️  No se encontraron resultados en fuentes preferidas, buscando en todas las fuentes...")
                 results = self.collection.query(
-                    query_texts=[query],
+                    query_embeddings=[self.embeddings.embed_query(query)],
                     n_results=n_results
                 )
                 docs_to_show = results['documents'][0]
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Los módulos del RAG se importan como en producción: `from rag_x import ...`
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'rag'))
@@ -0,0 +1,63 @@
+"""Cache de respuestas: TTL, desalojo LRU, invalidación por versión y paráfrasis"""
+from rag_cache import CacheRespuestas, normalizar_pregunta
+
+def test_normalizar_pregunta_ignora_acentos_mayusculas_y_puntuacion():
+    assert normalizar_pregunta("  ¿Cuál es la DESERCIÓN?  ") == "cual es la desercion"
+
+def test_acierto_con_la_pregunta_normalizada():
+    cache = CacheRespuestas()
+    cache.guardar("¿Qué es la deserción?", "llama3", 1, {"result": "r"})
+    resultado, _ = cache.obtener("que es la desercion", "llama3", 1)
+    assert resultado == {"result": "r"}
+    assert cache.obtener("que es la desercion", "mixtral", 1)[0] is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+def test_entrada_vencida_por_ttl(monkeypatch):
+    reloj = [1000.0]
+    monkeypatch.setattr("rag_cache.time.time", lambda: reloj[0])
+    cache = CacheRespuestas(ttl=10)
+    cache.guardar("p", "m", 1, {"result": "r"})
+    reloj[0] += 10
+    assert cache.obtener("p", "m", 1)[0] is not None
+    reloj[0] += 1
+    assert cache.obtener("p", "m", 1)[0] is None
+    assert cache.estadisticas()["entradas"] == 0
+
+def test_desaloja_la_menos_usada():
+    cache = CacheRespuestas(max_entradas=2)
+    cache.guardar("a", "m", 1, {"result": "a"})
+    cache.guardar("b", "m", 1, {"result": "b"})
+    # Leer "a" la vuelve la más reciente: al entrar "c" sale "b"
+    cache.obtener("a", "m", 1)
+    cache.guardar("c", "m", 1, {"result": "c"})
+    assert cache.obtener("b", "m", 1)[0] is None
+    assert cache.obtener("a", "m", 1)[0] == {"result": "a"}
+    assert cache.obtener("c", "m", 1)[0] == {"result": "c"}
+    assert cache.evictions == 1
+
+def test_cambio_de_version_invalida_todo():
+    cache = CacheRespuestas()
+    cache.guardar("a", "m", 1, {"result": "a"})
+    assert cache.obtener("a", "m", 2)[0] is None
+    assert cache.estadisticas()["entradas"] == 0
+    # Volver a la versión anterior no resucita las entradas
+    assert cache.obtener("a", "m", 1)[0] is None
+
+def test_parafrasis_por_similitud_con_embedding_precalculado():
+    cache = CacheRespuestas(umbral_similitud=0.9)
+    cache.guardar("tasa de desercion", "m", 1, {"result": "r"}, [1.0, 0.0])
+
+    llamadas = []
+    def embedding_fn(texto):
+        llamadas.append(texto)
+        return [0.0, 1.0]
+
+    resultado, embedding = cache.obtener("porcentaje de abandono", "m", 1, embedding_fn, [2.0, 0.1])
+    assert resultado == {"result": "r"}
+    assert llamadas == []
+    assert abs(float(embedding @ embedding) - 1.0) < 1e-6
+    assert cache.hits_semanticos == 1
+
+    resultado, _ = cache.obtener("becas", "m", 1, embedding_fn)
+    assert resultado is None
+    assert llamadas == ["becas"]
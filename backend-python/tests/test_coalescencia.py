@@ -0,0 +1,103 @@
+"""Coalescedor: una sola ejecución por clave en vuelo, con resultado o error compartido"""
+import asyncio
+import threading
+
+import pytest
+
+from rag_coalescencia import Coalescedor
+
+def _en_hilos(coalescedor, clave, funcion, n):
+    resultados = [None] * n
+    def correr(i):
+        try:
+            resultados[i] = coalescedor.ejecutar(clave, funcion)
+        except Exception as e:
+            resultados[i] = e
+    hilos = [threading.Thread(target=correr, args=(i,)) for i in range(n)]
+    for hilo in hilos:
+        hilo.start()
+    return hilos, resultados
+
+def _esperar_seguidores(coalescedor, n):
+    for _ in range(500):
+        if coalescedor.compartidas == n:
+            return
+        threading.Event().wait(0.01)
+
+def test_llamadas_concurrentes_ejecutan_una_vez():
+    coalescedor = Coalescedor()
+    liberar = threading.Event()
+    llamadas = []
+    def funcion():
+        llamadas.append(1)
+        liberar.wait(5)
+        return "respuesta"
+
+    hilos, resultados = _en_hilos(coalescedor, "clave", funcion, 8)
+    _esperar_seguidores(coalescedor, 7)
+    liberar.set()
+    for hilo in hilos:
+        hilo.join(5)
+
+    assert len(llamadas) == 1
+    assert sorted(compartido for _, compartido in resultados) == [False] + [True] * 7
+    assert all(resultado == "respuesta" for resultado, _ in resultados)
+    assert (coalescedor.ejecutadas, coalescedor.compartidas, coalescedor.en_vuelo()) == (1, 7, 0)
+
+def test_el_error_llega_a_todos_y_no_queda_en_vuelo():
+    coalescedor = Coalescedor()
+    liberar = threading.Event()
+    def funcion():
+        liberar.wait(5)
+        raise ValueError("falló Groq")
+
+    hilos, resultados = _en_hilos(coalescedor, "clave", funcion, 4)
+    _esperar_seguidores(coalescedor, 3)
+    liberar.set()
+    for hilo in hilos:
+        hilo.join(5)
+
+    assert all(isinstance(r, ValueError) for r in resultados)
+    # Tras el error la clave se libera: la siguiente llamada vuelve a ejecutar
+    assert coalescedor.ejecutar("clave", lambda: "ok") == ("ok", False)
+
+def test_claves_distintas_no_se_agrupan():
+    coalescedor = Coalescedor()
+    assert coalescedor.ejecutar("a", lambda: 1) == (1, False)
+    assert coalescedor.ejecutar("b", lambda: 2) == (2, False)
+    assert coalescedor.compartidas == 0
+
+def test_async_comparte_la_corrutina_en_vuelo():
+    coalescedor = Coalescedor()
+    llamadas = []
+
+    async def calcular():
+        llamadas.append(1)
+        await asyncio.sleep(0.05)
+        return "respuesta"
+
+    async def principal():
+        return await asyncio.gather(*(coalescedor.ejecutar_async("clave", calcular) for _ in range(5)))
+
+    resultados = asyncio.run(principal())
+    assert len(llamadas) == 1
+    assert [compartido for _, compartido in resultados] == [False] + [True] * 4
+    assert coalescedor.en_vuelo() == 0
+
+def test_async_propaga_el_error():
+    coalescedor = Coalescedor()
+
+    async def fallar():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("sin conexión")
+
+    async def principal():
+        return await asyncio.gather(
+            *(coalescedor.ejecutar_async("clave", fallar) for _ in range(3)),
+            return_exceptions=True
+        )
+
+    resultados = asyncio.run(principal())
+    assert all(isinstance(r, RuntimeError) for r in resultados)
+    with pytest.raises(RuntimeError):
+        asyncio.run(coalescedor.ejecutar_async("clave", fallar))
@@ -0,0 +1,26 @@
+"""Recorte de fragmentos al presupuesto de contexto (rag_contexto)"""
+import pytest
+
+from rag_contexto import _recortar
+
+@pytest.mark.parametrize("max_caracteres", [1, 2, 5, 10, 11, 40])
+def test_recorte_sin_espacios_respeta_el_presupuesto_con_elipsis(max_caracteres):
+    recortado = _recortar("a" * 50, max_caracteres)
+    assert len(recortado) == max_caracteres
+    assert recortado.endswith("…")
+
+@pytest.mark.parametrize("max_caracteres", range(1, 20))
+def test_recorte_en_espacio_nunca_supera_el_presupuesto(max_caracteres):
+    recortado = _recortar("uno dos tres cuatro cinco", max_caracteres)
+    assert len(recortado) <= max_caracteres
+
+def test_recorte_en_espacio_justo_en_el_limite():
+    assert _recortar("uno dos tres cuatro", 8) == "uno dos…"
+
+def test_recorte_en_fin_de_oracion_no_agrega_elipsis():
+    texto = "Primera oración completa. Segunda oración que no entra"
+    assert _recortar(texto, 30) == "Primera oración completa."
+
+def test_texto_que_entra_y_presupuesto_nulo():
+    assert _recortar("corto", 5) == "corto"
+    assert _recortar("corto", 0) == ""
@@ -0,0 +1,38 @@
+"""GestorBM25: la actualización a una versión nueva no bloquea a quien consulta"""
+import threading
+import time
+
+from rag_hibrido import GestorBM25, IndiceBM25, ruta_bm25
+
+class ColeccionLenta:
+    """Colección mínima cuyo get() espera a que el test lo libere"""
+
+    def __init__(self, textos):
+        self.textos = textos
+        self.liberar = threading.Event()
+        self.bloquear = False
+
+    def get(self, include=None):
+        if self.bloquear:
+            self.liberar.wait(5)
+        return {"ids": [f"c{i}" for i in range(len(self.textos))], "documents": self.textos}
+
+def test_version_nueva_sirve_el_indice_anterior_mientras_se_reconstruye(tmp_path):
+    collection = ColeccionLenta(["deserción estudiantil", "becas universitarias"])
+    gestor = GestorBM25()
+    primero = gestor.obtener(collection, tmp_path, 1)
+    assert primero.version == 1
+
+    collection.textos = collection.textos + ["abandono en primer año"]
+    collection.bloquear = True
+    # La reconstrucción queda bloqueada en segundo plano: se sigue sirviendo la versión 1
+    assert gestor.obtener(collection, tmp_path, 2) is primero
+
+    collection.liberar.set()
+    for _ in range(100):
+        if gestor.indice.version == 2:
+            break
+        time.sleep(0.05)
+    assert gestor.obtener(collection, tmp_path, 2).version == 2
+    assert len(gestor.indice.ids) == 3
+    assert IndiceBM25.cargar(ruta_bm25(tmp_path)).version == 2
@@ -0,0 +1,97 @@
+"""
+Ingesta incremental (rag_ingest) tras limpiar la colección: el manifiesto no debe
+hacer que se salteen archivos cuyos chunks ya no están.
+"""
+import pytest
+
+@pytest.fixture
+def base(tmp_path, monkeypatch):
+    """Directorio rag/ temporal con dos documentos, embeddings por hash y vectorstore NumPy"""
+    monkeypatch.setenv("RAG_EMBEDDINGS", "hash")
+    monkeypatch.setenv("RAG_VECTORSTORE", "numpy")
+    monkeypatch.setenv("RAG_INGESTA_PROCESOS", "1")
+    rag = tmp_path / "rag"
+    documentos = rag / "documents_raw"
+    documentos.mkdir(parents=True)
+    (documentos / "desercion.txt").write_text(
+        "La deserción estudiantil en Ecuador afecta sobre todo al primer año de carrera. " * 20, encoding="utf-8")
+    (documentos / "becas.txt").write_text(
+        "Las becas y el acompañamiento académico reducen el abandono universitario. " * 20, encoding="utf-8")
+    monkeypatch.chdir(rag)
+    return rag
+
+def _ids_en_coleccion():
+    from rag_ingest import CHROMA_PATH
+    from rag_npstore import ColeccionNumpy, ruta_npstore
+    return set(ColeccionNumpy(ruta_npstore(CHROMA_PATH)).get(include=[])['ids'])
+
+def _limpiar_coleccion():
+    from rag_ingest import CHROMA_PATH
+    from rag_npstore import ColeccionNumpy, ruta_npstore
+    collection = ColeccionNumpy(ruta_npstore(CHROMA_PATH))
+    collection.delete(ids=collection.get(include=[])['ids'])
+
+def test_reingesta_sin_cambios_no_reescribe(base):
+    from rag_ingest import ingestar
+    primera = ingestar()
+    segunda = ingestar()
+    assert primera["nuevos"] == 2
+    assert segunda["sin_cambios"] == 2
+    assert segunda["chunks_agregados"] == 0
+
+def test_limpiar_y_reingestar_restaura_los_documentos(base):
+    from rag_ingest import ingestar
+    ingestar()
+    ids = _ids_en_coleccion()
+    assert ids
+
+    # Colección vaciada por fuera de rag_ingest: el manifiesto sigue diciendo "sin cambios"
+    _limpiar_coleccion()
+    assert not _ids_en_coleccion()
+
+    resumen = ingestar()
+    assert resumen["restaurados"] == 2
+    assert resumen["sin_cambios"] == 0
+    assert _ids_en_coleccion() == ids
+
+def test_limpiar_y_borrar_manifiesto_reingesta_todo(base):
+    from rag_ingest import CHROMA_PATH, ingestar
+    from rag_manifiesto import borrar_manifiesto
+    ingestar()
+    ids = _ids_en_coleccion()
+
+    # Lo que hace ingest_scraped_data con clear_collection=True
+    _limpiar_coleccion()
+    borrar_manifiesto(CHROMA_PATH)
+
+    resumen = ingestar()
+    assert resumen["nuevos"] == 2
+    assert _ids_en_coleccion() == ids
+
+def test_restaurar_no_infla_los_conteos_del_catalogo(base):
+    from rag_catalogo import leer_catalogo
+    from rag_ingest import CHROMA_PATH, _eliminar_chunks, ingestar
+    from rag_npstore import ColeccionNumpy, ruta_npstore
+    ingestar()
+    total = leer_catalogo(CHROMA_PATH)["resumen"]["total_chunks"]
+
+    # Falta un solo chunk: el archivo se reingiere entero, pero solo ese id es nuevo
+    collection = ColeccionNumpy(ruta_npstore(CHROMA_PATH))
+    _eliminar_chunks(collection, sorted(_ids_en_coleccion())[:1])
+    assert leer_catalogo(CHROMA_PATH)["resumen"]["total_chunks"] == total - 1
+
+    resumen = ingestar()
+    assert resumen["restaurados"] == 1
+    assert leer_catalogo(CHROMA_PATH)["resumen"]["total_chunks"] == total
+
+def test_la_version_se_publica_una_vez_por_ingesta(base):
+    from rag_catalogo import version_catalogo
+    from rag_hibrido import IndiceBM25, ruta_bm25
+    from rag_ingest import CHROMA_PATH, ingestar
+    ingestar()
+    assert version_catalogo(CHROMA_PATH) == 1
+    # El índice BM25 ya quedó guardado con la versión publicada
+    assert IndiceBM25.cargar(ruta_bm25(CHROMA_PATH)).version == 1
+
+    ingestar()
+    assert version_catalogo(CHROMA_PATH) == 1
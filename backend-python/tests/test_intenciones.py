@@ -0,0 +1,44 @@
+"""Router de intenciones: reglas en orden de prioridad y extracción de slots"""
+import json
+
+from rag_intenciones import RouterIntenciones, cargar_router
+
+def _intenciones(router, pregunta):
+    return [r["intencion"] for r in router.enrutar(pregunta)]
+
+def test_pregunta_de_tasa_ignora_acentos():
+    router = RouterIntenciones()
+    assert _intenciones(router, "¿Cuál es la TASA de DESERCIÓN?") == ["tasa"]
+
+def test_sexo_tiene_prioridad_y_extrae_el_slot():
+    router = RouterIntenciones()
+    rutas = router.enrutar("¿Cuántas mujeres abandonaron en Ecuador 2022?")
+    assert [r["intencion"] for r in rutas] == ["sexo", "total", "resumen"]
+    assert rutas[0]["slots"] == {"sexo": "MUJER", "anio": "2022"}
+
+def test_tipo_de_institucion_con_slot():
+    router = RouterIntenciones()
+    rutas = router.enrutar("deserción en universidades cofinanciadas")
+    assert rutas[0] == {"intencion": "tipo", "slots": {"tipo_institucion": "PARTICULAR COFINANCIADA"}}
+
+def test_concepto_sin_contexto_estadistico_no_enruta():
+    router = RouterIntenciones()
+    # "mujeres" solo no alcanza: la regla de sexo pide algún concepto estadístico
+    assert router.enrutar("¿Qué carreras eligen las mujeres?") == []
+    assert router.enrutar("¿Cómo funciona el sistema de becas?") == []
+
+def test_palabras_completas_solamente():
+    router = RouterIntenciones()
+    # "totalitario" no es "total" ni "publicaciones" es "publica"
+    assert router.enrutar("régimen totalitario y publicaciones") == []
+
+def test_reglas_desde_json(tmp_path):
+    ruta = tmp_path / "intenciones.json"
+    ruta.write_text(json.dumps({
+        "conceptos": {"beca": ["becas?"]},
+        "reglas": [{"intencion": "becas", "requiere": ["beca"]}],
+        "slots": {}
+    }), encoding="utf-8")
+    router = cargar_router(str(ruta))
+    assert _intenciones(router, "¿Hay becas?") == ["becas"]
+    assert router.enrutar("tasa de deserción") == []
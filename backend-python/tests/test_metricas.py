@@ -0,0 +1,56 @@
+"""Exportación de métricas en formato de texto Prometheus"""
+import pytest
+
+from rag_metricas import Registro, medir
+
+def test_histograma_acumulativo_con_etiquetas():
+    registro = Registro()
+    histograma = registro.histograma("rag_prueba_segundos", "Prueba", buckets=(0.1, 1))
+    histograma.observar(0.05, etapa="embedding")
+    histograma.observar(0.5, etapa="embedding")
+    histograma.observar(2, etapa="embedding")
+
+    lineas = registro.exportar().splitlines()
+    assert lineas[:2] == ["# HELP rag_prueba_segundos Prueba", "# TYPE rag_prueba_segundos histogram"]
+    assert 'rag_prueba_segundos_bucket{etapa="embedding",le="0.1"} 1' in lineas
+    assert 'rag_prueba_segundos_bucket{etapa="embedding",le="1"} 2' in lineas
+    assert 'rag_prueba_segundos_bucket{etapa="embedding",le="+Inf"} 3' in lineas
+    assert 'rag_prueba_segundos_sum{etapa="embedding"} 2.55' in lineas
+    assert 'rag_prueba_segundos_count{etapa="embedding"} 3' in lineas
+
+def test_contador_escapa_etiquetas():
+    registro = Registro()
+    contador = registro.contador("rag_prueba_total", "Prueba")
+    contador.incrementar(origen='cache "exacta"')
+    contador.incrementar(2, origen='cache "exacta"')
+    assert 'rag_prueba_total{origen="cache \\"exacta\\""} 3' in registro.exportar().splitlines()
+
+def test_medidor_se_lee_al_exportar_y_omite_los_que_fallan():
+    registro = Registro()
+    valor = [1]
+    registro.medidor("rag_prueba_entradas", "Prueba", lambda: valor[0])
+    registro.medidor("rag_prueba_roto", "Roto", lambda: 1 / 0)
+    valor[0] = 7
+
+    texto = registro.exportar()
+    assert "rag_prueba_entradas 7\n" in texto
+    assert "rag_prueba_roto" not in texto
+    assert texto.endswith("\n")
+
+def test_medir_registra_la_duracion_y_los_errores(monkeypatch):
+    import rag_metricas
+    registro = Registro()
+    monkeypatch.setattr(rag_metricas, "duracion_etapas", registro.histograma("d", "Duración"))
+    monkeypatch.setattr(rag_metricas, "errores", registro.contador("e", "Errores"))
+
+    with medir("busqueda"):
+        pass
+    with pytest.raises(ValueError):
+        with medir("llm"):
+            raise ValueError()
+
+    lineas = registro.exportar().splitlines()
+    assert 'd_count{etapa="busqueda"} 1' in lineas
+    assert 'd_count{etapa="llm"} 1' in lineas
+    assert 'e{etapa="llm"} 1' in lineas
+    assert not any(l.startswith('e{etapa="busqueda"}') for l in lineas)
@@ -0,0 +1,142 @@
+"""Store NumPy: escritura por anexado, filas borradas, compactación y recarga por versión"""
+import os
+
+import numpy as np
+import pytest
+
+from rag_catalogo import publicar_version
+from rag_npstore import AlmacenNumpy, ColeccionNumpy, ruta_npstore
+
+DIMENSION = 8
+
+def _vectores(n, semilla=0):
+    return np.random.default_rng(semilla).normal(size=(n, DIMENSION)).tolist()
+
+def _agregar(collection, inicio, n, semilla=0):
+    ids = [f"c{i}" for i in range(inicio, inicio + n)]
+    collection.upsert(ids=ids, embeddings=_vectores(n, semilla), documents=[f"texto {i}" for i in ids],
+                      metadatas=[{"source": f"{i}.txt"} for i in ids])
+    return ids
+
+@pytest.mark.parametrize("tipo", ["float16", "int8"])
+def test_escritura_diferida_guarda_una_vez_y_se_relee(tmp_path, tipo):
+    collection = ColeccionNumpy(tmp_path, tipo)
+    with collection.escritura():
+        for lote in range(5):
+            _agregar(collection, lote * 10, 10, semilla=lote)
+        # Dentro del bloque nada llegó a metadatos.json
+        assert ColeccionNumpy(tmp_path, tipo).count() == 0
+        assert collection.count() == 50
+
+    releida = ColeccionNumpy(tmp_path, tipo)
+    assert releida.count() == 50
+    data = releida.get(ids=["c0", "c49"], include=["documents", "metadatas"])
+    assert data["documents"] == ["texto c0", "texto c49"]
+    assert data["metadatas"][1] == {"source": "c49.txt"}
+
+def test_upsert_reemplaza_sin_pisar_filas_guardadas(tmp_path):
+    collection = ColeccionNumpy(tmp_path)
+    _agregar(collection, 0, 10)
+    lector = ColeccionNumpy(tmp_path)
+    antes = lector.get(ids=["c3"], include=["embeddings"])["embeddings"][0]
+
+    collection.upsert(ids=["c3"], embeddings=_vectores(1, semilla=9), documents=["nuevo"], metadatas=[{}])
+    assert collection.count() == 10
+    assert collection.get(ids=["c3"])["documents"] == ["nuevo"]
+    # Quien ya tenía el store abierto sigue viendo la fila anterior
+    assert lector.get(ids=["c3"], include=["embeddings"])["embeddings"][0] == antes
+    assert ColeccionNumpy(tmp_path).get(ids=["c3"])["documents"] == ["nuevo"]
+
+def test_query_ignora_filas_borradas(tmp_path):
+    collection = ColeccionNumpy(tmp_path)
+    _agregar(collection, 0, 10)
+    consulta = collection.get(ids=["c2"], include=["embeddings"])["embeddings"]
+    collection.delete(ids=["c2"])
+    resultado = collection.query(query_embeddings=consulta, n_results=10)
+    assert "c2" not in resultado["ids"][0]
+    assert len(resultado["ids"][0]) == 9
+    assert "c2" not in collection.get(include=[])["ids"]
+
+def test_muchas_filas_borradas_compactan(tmp_path):
+    collection = ColeccionNumpy(tmp_path)
+    _agregar(collection, 0, 20)
+    collection.delete(ids=[f"c{i}" for i in range(10)])
+    releida = ColeccionNumpy(tmp_path)
+    assert releida.count() == 10
+    assert releida._filas == 10
+    assert sorted(releida.get(include=[])["ids"]) == sorted(f"c{i}" for i in range(10, 20))
+    # Solo quedan los archivos de la generación vigente
+    assert len([n for n in os.listdir(tmp_path) if n.startswith("vectores")]) == 1
+
+def test_escritura_interrumpida_no_deja_textos_corridos(tmp_path):
+    collection = ColeccionNumpy(tmp_path)
+    _agregar(collection, 0, 5)
+    with pytest.raises(RuntimeError):
+        with collection.escritura():
+            _agregar(collection, 5, 5)
+            collection._pendiente = False  # como si el proceso muriera antes de guardar
+            raise RuntimeError()
+
+    collection = ColeccionNumpy(tmp_path)
+    assert collection.count() == 5
+    _agregar(collection, 10, 2)
+    releida = ColeccionNumpy(tmp_path)
+    assert releida.get(ids=["c10", "c11"])["documents"] == ["texto c10", "texto c11"]
+
+def test_almacen_recarga_cuando_se_publica_una_version(tmp_path):
+    chroma_path = tmp_path / "chroma_db"
+    almacen = AlmacenNumpy(str(chroma_path), embedding_function=None)
+    assert almacen._collection.count() == 0
+
+    ingesta = ColeccionNumpy(ruta_npstore(chroma_path))
+    with ingesta.escritura():
+        _agregar(ingesta, 0, 4)
+    assert almacen._collection.count() == 0
+
+    publicar_version(str(chroma_path))
+    assert almacen._collection.count() == 4
+
+def test_store_anterior_se_migra_al_escribir(tmp_path):
+    import json
+    from rag_npstore import cuantizar
+    matriz, _ = cuantizar(_vectores(3), "float16")
+    np.save(tmp_path / "vectores.npy", matriz)
+    (tmp_path / "documentos.json").write_text(json.dumps(["a", "b", "c"]), encoding="utf-8")
+    (tmp_path / "metadatos.json").write_text(json.dumps({
+        "tipo": "float16", "dimension": DIMENSION, "ids": ["x", "y", "z"], "columnas": {"source": ["1", "2", "3"]}
+    }), encoding="utf-8")
+
+    collection = ColeccionNumpy(tmp_path)
+    assert collection.get(ids=["y"])["documents"] == ["b"]
+    _agregar(collection, 0, 2)
+    releida = ColeccionNumpy(tmp_path)
+    assert releida.count() == 5
+    assert releida.get(ids=["z", "c1"])["documents"] == ["c", "texto c1"]
+    assert not (tmp_path / "documentos.json").exists()
+
+@pytest.mark.parametrize("tipo", ["float16", "int8"])
+def test_crecer_mas_alla_de_la_capacidad_inicial(tmp_path, tipo):
+    from rag_npstore import CAPACIDAD_INICIAL
+    collection = ColeccionNumpy(tmp_path, tipo)
+    _agregar(collection, 0, 10)
+    lector = ColeccionNumpy(tmp_path, tipo)
+    antes = lector.get(ids=["c5"], include=["embeddings"])["embeddings"][0]
+
+    total = CAPACIDAD_INICIAL + 300
+    with collection.escritura():
+        for inicio in range(10, total, 250):
+            _agregar(collection, inicio, min(250, total - inicio), semilla=inicio)
+    assert collection._vectores.shape[0] >= total
+
+    releida = ColeccionNumpy(tmp_path, tipo)
+    assert releida.count() == total
+    ultimo = f"c{total - 1}"
+    data = releida.get(ids=["c5", ultimo], include=["embeddings", "documents"])
+    assert data["documents"] == ["texto c5", f"texto {ultimo}"]
+    assert np.allclose(data["embeddings"][0], antes, atol=1e-2)
+    consulta = releida.query(query_embeddings=[data["embeddings"][1]], n_results=1)
+    assert consulta["ids"][0] == [ultimo]
+    # Quien tenía el store abierto antes de crecer sigue leyendo sus filas
+    assert lector.get(ids=["c5"], include=["embeddings"])["embeddings"][0] == antes
+    # Solo queda la matriz vigente
+    assert len([n for n in os.listdir(tmp_path) if n.startswith("vectores")]) == 1
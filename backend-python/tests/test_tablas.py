@@ -0,0 +1,55 @@
+"""Tablas de estadísticas residentes: respuestas memoizadas y recarga por mtime"""
+import os
+
+import pytest
+
+from rag_tablas import RESUMEN_CSV, SEXO_CSV, TIPO_CSV, TablasEstadisticas, responder_estadisticas
+
+RESUMEN = "Indicador,Valor\nTasa de Deserción,12.5\nTotal Estudiantes Matriculados,1000\nTotal Estudiantes que Abandonaron,125\n"
+SEXO = "Sexo,Abandonaron,Matriculados,Tasa\nMUJER,60,520,11.5\nHOMBRE,65,480,13.5\n"
+TIPO = "Tipo,Abandonaron\nPÚBLICA,80\nPARTICULAR COFINANCIADA,30\nPARTICULAR AUTOFINANCIADA,15\n"
+
+@pytest.fixture
+def tablas(tmp_path):
+    for nombre, contenido in ((RESUMEN_CSV, RESUMEN), (SEXO_CSV, SEXO), (TIPO_CSV, TIPO)):
+        (tmp_path / nombre).write_text(contenido, encoding="utf-8")
+    return TablasEstadisticas(str(tmp_path))
+
+def test_carga_indicadores_y_filas_numericas(tablas):
+    tablas.actualizar()
+    assert tablas.indicadores == {"tasa": 12.5, "matriculados": 1000, "abandonaron": 125}
+    assert tablas.sexo[0] == ["MUJER", 60, 520, 11.5]
+
+def test_respuestas_desde_el_router(tablas):
+    assert "Tasa de Deserción: 12.5%" in responder_estadisticas("¿Cuál es la tasa de deserción?", tablas)
+    assert responder_estadisticas("¿Cuántos estudiantes abandonaron?", tablas) == (
+        "En Ecuador 2022, abandonaron 125 estudiantes de un total de 1,000 matriculados."
+    )
+    assert responder_estadisticas("¿Cómo funcionan las becas?", tablas) is None
+
+def test_slot_filtra_las_filas(tablas):
+    respuesta = responder_estadisticas("deserción de mujeres", tablas)
+    assert "MUJER" in respuesta and "HOMBRE" not in respuesta
+    respuesta = responder_estadisticas("deserción en universidades públicas", tablas)
+    assert "PÚBLICA" in respuesta and "COFINANCIADA" not in respuesta
+
+def test_respuesta_memoizada_hasta_que_cambia_el_csv(tablas, tmp_path):
+    llamadas = []
+    def construir(t):
+        llamadas.append(1)
+        return t.indicadores["tasa"]
+
+    assert tablas.respuesta(("prueba",), construir) == 12.5
+    assert tablas.respuesta(("prueba",), construir) == 12.5
+    assert len(llamadas) == 1
+
+    ruta = tmp_path / RESUMEN_CSV
+    ruta.write_text(RESUMEN.replace("12.5", "13"), encoding="utf-8")
+    stat = os.stat(ruta)
+    os.utime(ruta, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert tablas.respuesta(("prueba",), construir) == 13
+    assert len(llamadas) == 2
+
+def test_sin_csvs_no_responde(tmp_path):
+    tablas = TablasEstadisticas(str(tmp_path))
+    assert responder_estadisticas("¿Cuál es la tasa de deserción?", tablas) is None